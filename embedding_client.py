@@ -9,16 +9,18 @@ Cliente dedicado para interagir com a API de embeddings da OpenAI.
 Responsabilidades:
 ------------------
 1. Carregar a chave da API da OpenAI do ambiente.
-2. Fornecer uma função para gerar embeddings de texto.
+2. Fornecer funções para gerar embeddings de texto (um ou vários por chamada,
+   textos longos divididos em trechos e combinados pela média ponderada).
 3. Lidar com erros específicos da API da OpenAI.
 
 Uso:
 ----
-    from embedding_client import get_embedding
+    from embedding_client import get_embedding, get_embeddings
     
     try:
         vector = get_embedding("Este é um texto de exemplo.")
         print(f"Vetor gerado: {len(vector)} dimensões")
+        vectors = get_embeddings(["texto 1", "texto 2", "texto 3"])  # uma requisição
     except Exception as e:
         print(f"Erro ao gerar embedding: {e}")
 
@@ -27,9 +29,18 @@ Data: 24/10/2025
 """
 
 import os
-from openai import OpenAI
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from openai import BadRequestError, OpenAI
 from dotenv import load_dotenv
 
+from utils.embedding_cache import EmbeddingCache
+from utils.tokens import count_tokens, split_tokens
+
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -37,22 +48,65 @@ load_dotenv()
 # CONFIGURAÇÃO DO CLIENTE OPENAI
 # ============================================================================
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    # Tenta carregar novamente para garantir
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("A variável de ambiente OPENAI_API_KEY não foi definida no ambiente ou no arquivo .env.")
+_client: Optional[OpenAI] = None
+
+
+def get_client() -> OpenAI:
+    """Cliente OpenAI criado no primeiro uso (importar o módulo não exige a chave)."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            # Tenta carregar novamente para garantir
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("A variável de ambiente OPENAI_API_KEY não foi definida no ambiente ou no arquivo .env.")
+        try:
+            _client = OpenAI(api_key=api_key)
+        except Exception as e:
+            raise RuntimeError(f"Falha ao inicializar o cliente OpenAI: {e}")
+    return _client
 
-try:
-    client = OpenAI(api_key=api_key)
-except Exception as e:
-    raise RuntimeError(f"Falha ao inicializar o cliente OpenAI: {e}")
 
 # Modelo de embedding recomendado pela OpenAI (custo-benefício)
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+# Limites por requisição de `get_embeddings`. A API aceita até 2048 entradas e
+# ~300k tokens por chamada; ficamos bem abaixo para manter a latência baixa.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "200000"))
+# Novas tentativas de um lote que falhou (além dos retries do próprio SDK).
+EMBEDDING_BATCH_RETRIES = int(os.getenv("EMBEDDING_BATCH_RETRIES", "2"))
+# Textos maiores que isto (o modelo aceita 8191 tokens) são divididos em
+# trechos, embedados no mesmo lote e combinados pela média ponderada.
+EMBEDDING_CHUNK_TOKENS = int(os.getenv("EMBEDDING_CHUNK_TOKENS", "2048"))
+
+_PARAGRAPH = re.compile(r"\n\s*\n")
+
+# Cache de vetores por hash do conteúdo + modelo: LRU em memória e shards
+# float32 em disco (compartilhados entre processos e reinícios).
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "1").strip().lower() in ("1", "true", "yes", "on")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MEMORY = int(os.getenv("EMBEDDING_CACHE_MEMORY", "4096"))
+EMBEDDING_CACHE_MAX_BYTES = int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """Cache compartilhado de embeddings (None com `EMBEDDING_CACHE=0`)."""
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_ENABLED:
+        _cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MEMORY, EMBEDDING_CACHE_MAX_BYTES)
+    return _cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Acertos (memória/disco), falhas e taxa de acerto do cache de embeddings."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
 # ============================================================================
 # FUNÇÃO PRINCIPAL
 # ============================================================================
@@ -73,22 +127,190 @@ def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> list[float]:
     """
     if not isinstance(text, str) or not text.strip():
         raise ValueError("O texto de entrada não pode ser vazio.")
+    return get_embeddings([text], model=model)[0]
 
-    try:
+
+@dataclass
+class ChunkedEmbedding:
+    """Vetor de um texto e, se ele foi dividido, os trechos e seus vetores."""
+
+    vector: List[float]
+    chunks: List[str] = field(default_factory=list)
+    chunk_vectors: List[List[float]] = field(default_factory=list)
+    # Tokens de cada trecho: o peso dele na média
+    weights: List[int] = field(default_factory=list)
+
+
+def split_text(text: str, max_tokens: int = EMBEDDING_CHUNK_TOKENS) -> List[str]:
+    """
+    Divide `text` em trechos de até `max_tokens` tokens: junta parágrafos
+    inteiros enquanto couberem e só corta dentro de um parágrafo (em limites
+    de token) quando ele sozinho passa do limite.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in _PARAGRAPH.split(text):
+        if not paragraph.strip():
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            chunks.extend(piece for piece in split_tokens(paragraph, max_tokens) if piece.strip())
+            continue
+        # +2: o separador entre parágrafos também conta
+        if current and size + tokens + 2 > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += tokens + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def get_embeddings(
+    texts: Sequence[str],
+    model: str = EMBEDDING_MODEL,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    client: Optional[OpenAI] = None,
+) -> List[List[float]]:
+    """
+    Gera embeddings para vários textos, com várias entradas por requisição.
+
+    A ordem da saída é a da entrada; textos repetidos são enviados uma vez só
+    e textos já vistos (mesmo modelo) vêm do cache, sem requisição.
+    Os lotes respeitam `batch_size` entradas e `EMBEDDING_BATCH_TOKENS` tokens;
+    um lote recusado pela API (400) é dividido ao meio, e um lote que falha ou
+    volta incompleto é reenviado (só a parte que faltou) até
+    `EMBEDDING_BATCH_RETRIES` vezes, sem repetir os lotes que já deram certo.
+    Textos longos (acima de `EMBEDDING_CHUNK_TOKENS`) viram a média ponderada
+    dos vetores dos seus trechos; ver `get_chunked_embeddings`.
+
+    Args:
+        texts: Textos de entrada (não vazios).
+        model: O modelo de embedding a ser usado.
+        batch_size: Máximo de entradas por requisição.
+        client: Cliente compatível com a API da OpenAI (padrão: `get_client()`).
+
+    Returns:
+        Uma lista de vetores, um por texto.
+
+    Raises:
+        ValueError: Se algum texto for vazio.
+        Exception: Se a chamada da API falhar após as novas tentativas.
+    """
+    return [item.vector for item in get_chunked_embeddings(texts, model, batch_size, client)]
+
+
+def get_chunked_embeddings(
+    texts: Sequence[str],
+    model: str = EMBEDDING_MODEL,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    client: Optional[OpenAI] = None,
+    max_tokens: int = EMBEDDING_CHUNK_TOKENS,
+) -> List[ChunkedEmbedding]:
+    """
+    Como `get_embeddings`, mas devolve também os trechos de cada texto.
+
+    Textos acima de `max_tokens` são divididos por `split_text`; os trechos de
+    todos os textos vão juntos nos mesmos lotes (o número de requisições só
+    depende do total de trechos) e o vetor do texto é a média dos vetores dos
+    trechos, ponderada pelos tokens de cada um. O texto inteiro é considerado,
+    sem truncamento.
+    """
+    chunked: List[List[str]] = []
+    for i, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"O texto de entrada {i} não pode ser vazio.")
         # Substitui caracteres de nova linha para evitar problemas com a API
-        text = text.replace("\n", " ")
-        
-        response = client.embeddings.create(input=[text], model=model)
-        
-        if response.data and response.data[0].embedding:
-            return response.data[0].embedding
-        else:
-            raise RuntimeError("A resposta da API de embeddings não continha dados válidos.")
-            
+        chunked.append([chunk.replace("\n", " ") for chunk in split_text(text, max_tokens)])
+    if not chunked:
+        return []
+
+    vectors = _embed_unique([chunk for chunks in chunked for chunk in chunks], model, batch_size, client)
+    result = []
+    for chunks in chunked:
+        chunk_vectors = [vectors[chunk] for chunk in chunks]
+        if len(chunks) == 1:
+            result.append(ChunkedEmbedding(chunk_vectors[0], chunks, chunk_vectors, [count_tokens(chunks[0])]))
+            continue
+        weights = [max(1, count_tokens(chunk)) for chunk in chunks]
+        pooled = np.average(np.asarray(chunk_vectors, dtype=np.float64), axis=0, weights=weights)
+        result.append(ChunkedEmbedding(pooled.tolist(), chunks, chunk_vectors, weights))
+    return result
+
+
+def _embed_unique(
+    texts: List[str], model: str, batch_size: int, client: Optional[OpenAI]
+) -> Dict[str, List[float]]:
+    unique = list(dict.fromkeys(texts))
+    cache = get_cache()
+    vectors: Dict[str, List[float]] = {}
+    if cache is not None:
+        for text, cached in zip(unique, cache.get_many(model, unique)):
+            if cached is not None:
+                vectors[text] = cached.tolist()
+        unique = [text for text in unique if text not in vectors]
+    if not unique:
+        return vectors
+
+    client = client or get_client()
+    try:
+        for batch in _batches(unique, max(1, batch_size)):
+            embedded = _embed_batch(client, batch, model)
+            vectors.update(zip(batch, embedded))
+            if cache is not None:
+                cache.put_many(model, batch, embedded)
     except Exception as e:
         # Adiciona mais contexto ao erro antes de relançá-lo
         print(f"Erro na chamada da API OpenAI para o modelo '{model}': {e}")
         raise
+    return vectors
+
+
+def _batches(texts: List[str], batch_size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    tokens = 0
+    for text in texts:
+        size = count_tokens(text)
+        if batch and (len(batch) >= batch_size or tokens + size > EMBEDDING_BATCH_TOKENS):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += size
+    if batch:
+        yield batch
+
+
+def _embed_batch(client: OpenAI, batch: List[str], model: str, attempt: int = 0) -> List[List[float]]:
+    try:
+        response = client.embeddings.create(input=batch, model=model)
+    except BadRequestError:
+        if len(batch) == 1:
+            raise
+        # Lote grande demais para o provedor: divide ao meio
+        middle = len(batch) // 2
+        return _embed_batch(client, batch[:middle], model) + _embed_batch(client, batch[middle:], model)
+    except Exception:
+        if attempt >= EMBEDDING_BATCH_RETRIES:
+            raise
+        time.sleep(min(8.0, 0.5 * 2 ** attempt))
+        return _embed_batch(client, batch, model, attempt + 1)
+
+    found = {item.index: item.embedding for item in (response.data or []) if item.embedding}
+    missing = [i for i in range(len(batch)) if i not in found]
+    if missing:
+        # Resposta parcial: reenviar apenas os textos que ficaram sem vetor
+        if attempt >= EMBEDDING_BATCH_RETRIES:
+            raise RuntimeError("A resposta da API de embeddings não continha dados válidos.")
+        retried = _embed_batch(client, [batch[i] for i in missing], model, attempt + 1)
+        found.update(zip(missing, retried))
+    return [found[i] for i in range(len(batch))]
 
 # ============================================================================
 # EXEMPLO DE USO
@@ -1,7 +1,14 @@
-﻿import os, json, re
+﻿import os, json, re, threading, asyncio, weakref, queue, time, hashlib, contextlib
+import concurrent.futures
+from importlib.util import find_spec
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
 from tenacity import retry, stop_after_attempt, wait_exponential_jitter
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIConnectionError, APITimeoutError
 from dotenv import load_dotenv
+from utils.circuit_breaker import retry_after, status_code
+from utils.json_scanner import find_json_object
+from utils.rate_limiter import RateLimiter, Ticket
+from utils.tokens import count_tokens
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -10,6 +17,15 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 TIMEOUT = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "90"))  # 90s (mais agressivo)
 MAX_RETRIES = int(os.getenv("MAX_RETRIES_PER_CALL", "1"))  # APENAS 1 retry no tenacity
+_TRUTHY = {"1", "true", "t", "yes", "y", "on"}
+POOL_ENABLED = os.getenv("LLM_POOL_ENABLED", "1").strip().lower() in _TRUTHY
+HTTP2_ENABLED = (
+    os.getenv("LLM_HTTP2", "1").strip().lower() in _TRUTHY and find_spec("h2") is not None
+)
+COALESCE_ENABLED = os.getenv("LLM_COALESCE", "1").strip().lower() in _TRUTHY
+RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT", "1").strip().lower() in _TRUTHY
+PROMPT_CACHE_ENABLED = os.getenv("LLM_PROMPT_CACHE", "1").strip().lower() in _TRUTHY
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("LLM_PROMPT_CACHE_MIN_TOKENS", "1024"))
 
 if not OPENROUTER_API_KEY:
     # Tenta carregar novamente para garantir, especialmente em ambientes de servidor
@@ -18,10 +34,388 @@ if not OPENROUTER_API_KEY:
     if not OPENROUTER_API_KEY:
         raise RuntimeError("OPENROUTER_API_KEY ausente no ambiente ou no arquivo .env")
 
-# Client simples - sem customização de httpx
-# O client global foi removido. Uma nova instância é criada em cada chamada de chat/chat_json
-# para garantir que não haja estado compartilhado ou conexões reutilizadas que possam causar hangs.
-# client = OpenAI(...)
+T = TypeVar("T")
+
+# ============================================================================
+# POOL DE CONEXÕES
+# ============================================================================
+# O núcleo do cliente é assíncrono (AsyncOpenAI). Mantemos um cliente por
+# (event loop, base_url, timeout), compartilhado por todas as chamadas daquele loop,
+# com keep-alive (e HTTP/2 quando o pacote `h2` está instalado). O design antigo
+# criava um cliente por chamada para evitar hangs; aqui o mesmo efeito vem do
+# reset-on-hang: qualquer timeout ou erro de conexão descarta o cliente do pool,
+# de modo que o retry seguinte abre conexões novas. `LLM_POOL_ENABLED=0` restaura
+# o cliente por chamada.
+#
+# As funções síncronas (`chat`, `chat_json`) são wrappers finos: executam a
+# corrotina correspondente num event loop de fundo compartilhado pelo processo.
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+_pool_lock = threading.Lock()
+_pool: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, float], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_pool_stats = {"created": 0, "reused": 0, "resets": 0}
+# Requisições em andamento por cliente (id) e clientes removidos do pool que
+# aguardam a última delas terminar para serem fechados.
+_client_users: Dict[int, int] = {}
+_retired: Dict[int, Tuple[asyncio.AbstractEventLoop, AsyncOpenAI]] = {}
+_closing: set = set()
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _Flight]]" = (
+    weakref.WeakKeyDictionary()
+)
+_coalesce_stats = {"upstream": 0, "coalesced": 0}
+
+_bridge_lock = threading.Lock()
+_bridge: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _reset_after_fork():
+    # Conexões e o thread do loop de fundo não sobrevivem a um fork
+    global _pool_lock, _bridge_lock, _bridge, _pool, _limiters, _inflight, _rate_limiter
+    global _client_users, _retired, _closing
+    _pool_lock = threading.Lock()
+    _bridge_lock = threading.Lock()
+    _bridge = None
+    _pool = weakref.WeakKeyDictionary()
+    _limiters = weakref.WeakKeyDictionary()
+    _inflight = weakref.WeakKeyDictionary()
+    _rate_limiter = None
+    _client_users = {}
+    _retired = {}
+    _closing = set()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _bridge_loop() -> asyncio.AbstractEventLoop:
+    """Event loop de fundo que executa as chamadas feitas pela API síncrona."""
+    global _bridge
+    with _bridge_lock:
+        if _bridge is None or _bridge.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+            _bridge = loop
+        return _bridge
+
+
+def _current_loop() -> asyncio.AbstractEventLoop:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return _bridge_loop()
+
+
+# ============================================================================
+# CANCELAMENTO COOPERATIVO
+# ============================================================================
+# Chamadas síncronas feitas com `cancel=scope` ficam registradas no escopo.
+# `scope.cancel()` cancela a corrotina de cada uma no loop de fundo (o que aborta
+# a requisição HTTP) e a thread que esperava o resultado é liberada na hora com
+# `ChatCancelled`; chamadas iniciadas depois do cancelamento nem saem. Escopos
+# podem ser registrados por nome (ex.: o id de um debate) e cancelados de fora
+# com `cancel_scope(nome)`.
+
+
+class ChatCancelled(RuntimeError):
+    """A chamada foi cancelada pelo seu `CancelScope` antes de terminar."""
+
+
+class CancelScope:
+    """Grupo de chamadas em voo que pode ser cancelado de uma vez, de qualquer thread."""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._calls: Dict["concurrent.futures.Future", Tuple[str, int]] = {}  # future -> (modelo, tokens do prompt)
+        self._stats = {"calls": 0, "prompt_tokens": 0}
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> Dict[str, int]:
+        """Aborta as chamadas em voo; devolve quantas foram canceladas e os tokens de prompt delas."""
+        with self._lock:
+            self._cancelled = True
+            calls = list(self._calls.items())
+            self._calls.clear()
+        cancelled = 0
+        tokens = 0
+        for future, (_, prompt_tokens) in calls:
+            if future.cancel():
+                cancelled += 1
+                tokens += prompt_tokens
+        with self._lock:
+            self._stats["calls"] += cancelled
+            self._stats["prompt_tokens"] += tokens
+        return {"calls": cancelled, "prompt_tokens": tokens}
+
+    def stats(self) -> Dict[str, int]:
+        """Chamadas canceladas até agora e os tokens de prompt (estimados) que elas já tinham enviado."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+    def _attach(self, future: "concurrent.futures.Future", model: str, prompt_tokens: int) -> None:
+        with self._lock:
+            if not self._cancelled:
+                self._calls[future] = (model, prompt_tokens)
+                return
+        if future.cancel():
+            with self._lock:
+                self._stats["calls"] += 1
+                self._stats["prompt_tokens"] += prompt_tokens
+
+    def _detach(self, future: "concurrent.futures.Future") -> None:
+        with self._lock:
+            self._calls.pop(future, None)
+
+
+_scopes_lock = threading.Lock()
+_scopes: Dict[str, CancelScope] = {}
+
+
+def open_scope(name: str) -> CancelScope:
+    """Cria e registra um escopo de cancelamento com o nome dado (substitui um anterior)."""
+    scope = CancelScope(name)
+    with _scopes_lock:
+        _scopes[name] = scope
+    return scope
+
+
+def close_scope(scope: CancelScope) -> None:
+    """Remove o registro do escopo (se ainda for o registrado com aquele nome)."""
+    with _scopes_lock:
+        if _scopes.get(scope.name) is scope:
+            del _scopes[scope.name]
+
+
+def cancel_scope(name: str) -> Optional[Dict[str, int]]:
+    """Cancela o escopo registrado como `name`; None se não houver nenhum ativo."""
+    with _scopes_lock:
+        scope = _scopes.get(name)
+    return scope.cancel() if scope is not None else None
+
+
+def run_sync(
+    coro: Awaitable[T],
+    cancel: Optional[CancelScope] = None,
+    model: str = "",
+    prompt_tokens: int = 0,
+) -> T:
+    """Executa `coro` no loop de fundo e bloqueia até o resultado.
+
+    Se a thread chamadora for interrompida (ex.: KeyboardInterrupt) ou o escopo
+    `cancel` for cancelado, a corrotina é cancelada, o que aborta a requisição
+    HTTP em voo. `model`/`prompt_tokens` identificam a chamada nas estatísticas
+    do escopo."""
+    loop = _bridge_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("API síncrona chamada dentro do loop do llm_client; use a versão async")
+    if cancel is not None and cancel.cancelled:
+        coro.close()
+        raise ChatCancelled(f"chamada a {model or 'modelo'} cancelada antes do envio")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    if cancel is not None:
+        cancel._attach(future, model, prompt_tokens)
+    try:
+        return future.result()
+    except concurrent.futures.CancelledError:
+        if cancel is not None and cancel.cancelled:
+            raise ChatCancelled(f"chamada a {model or 'modelo'} cancelada") from None
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        if cancel is not None:
+            cancel._detach(future)
+
+
+def iter_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Consome um gerador assíncrono no loop de fundo, entregando os itens de forma síncrona.
+
+    Se o consumidor parar antes do fim (break/close), o gerador é cancelado."""
+    loop = _bridge_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("API síncrona chamada dentro do loop do llm_client; use a versão async")
+    items: "queue.Queue[Tuple[bool, object]]" = queue.Queue()
+
+    async def _pump():
+        try:
+            async for item in agen:
+                items.put((True, item))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            items.put((False, exc))
+        else:
+            items.put((False, None))
+        finally:
+            await agen.aclose()
+
+    future = asyncio.run_coroutine_threadsafe(_pump(), loop)
+    try:
+        while True:
+            ok, item = items.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        future.cancel()
+
+
+def _new_client(base_url: str, timeout: float, pooled: bool) -> AsyncOpenAI:
+    kwargs = {}
+    if pooled:
+        kwargs["http_client"] = DefaultAsyncHttpxClient(http2=HTTP2_ENABLED, timeout=timeout)
+    return AsyncOpenAI(
+        api_key=OPENROUTER_API_KEY,
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0,  # Desabilitar retry do SDK, usar o do Tenacity
+        **kwargs,
+    )
+
+
+def get_client(base_url: str = None, timeout: float = None) -> AsyncOpenAI:
+    """Retorna o cliente do pool para o loop corrente e (base_url, timeout).
+
+    Fora de um event loop, o cliente pertence ao loop de fundo da API síncrona."""
+    base_url = base_url or BASE_URL
+    timeout = float(timeout or TIMEOUT)
+    if not POOL_ENABLED:
+        return _new_client(base_url, timeout, pooled=False)
+
+    loop = _current_loop()
+    key = (base_url, timeout)
+    with _pool_lock:
+        clients = _pool.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = _new_client(base_url, timeout, pooled=True)
+            clients[key] = client
+            _pool_stats["created"] += 1
+        else:
+            _pool_stats["reused"] += 1
+    return client
+
+
+def _close_later(loop: asyncio.AbstractEventLoop, client: AsyncOpenAI) -> None:
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is running:
+        task = loop.create_task(client.close())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+
+
+@contextlib.contextmanager
+def _in_use(client: AsyncOpenAI) -> Iterator[AsyncOpenAI]:
+    """Conta `client` como em uso; se foi removido do pool, fecha ao sair o último usuário."""
+    with _pool_lock:
+        _client_users[id(client)] = _client_users.get(id(client), 0) + 1
+    try:
+        yield client
+    finally:
+        with _pool_lock:
+            left = _client_users.pop(id(client)) - 1
+            if left:
+                _client_users[id(client)] = left
+            retired = _retired.pop(id(client), None) if not left else None
+        if retired is not None:
+            _close_later(*retired)
+
+
+def reset_client(base_url: str = None, timeout: float = None) -> None:
+    """Descarta (e fecha) o cliente do pool do loop corrente para (base_url, timeout)."""
+    loop = _current_loop()
+    key = (base_url or BASE_URL, float(timeout or TIMEOUT))
+    with _pool_lock:
+        client = _pool.get(loop, {}).pop(key, None)
+        if client is not None:
+            _pool_stats["resets"] += 1
+    if client is not None:
+        _close_later(loop, client)
+
+
+def _evict(client: AsyncOpenAI) -> None:
+    """Remove `client` do pool e o fecha assim que não houver requisições usando-o.
+
+    Só remove se ainda for o cliente corrente da chave, para não descartar um
+    substituto que outra tarefa já tenha criado."""
+    owner = None
+    with _pool_lock:
+        for loop, clients in _pool.items():
+            for key, pooled in list(clients.items()):
+                if pooled is client:
+                    del clients[key]
+                    _pool_stats["resets"] += 1
+                    owner = loop
+        if owner is not None and _client_users.get(id(client)):
+            _retired[id(client)] = (owner, client)
+            owner = None
+    if owner is not None:
+        _close_later(owner, client)
+
+
+def reset_pool() -> None:
+    """Fecha todos os clientes do pool, em todos os loops."""
+    with _pool_lock:
+        entries = [(loop, client) for loop, clients in _pool.items() for client in clients.values()]
+        _pool.clear()
+    for loop, client in entries:
+        _close_later(loop, client)
+
+
+def pool_stats() -> Dict[str, int]:
+    with _pool_lock:
+        return dict(_pool_stats, size=sum(len(clients) for clients in _pool.values()))
+
+
+# ============================================================================
+# LIMITADOR GLOBAL DE CONCORRÊNCIA
+# ============================================================================
+
+def set_max_concurrency(limit: int) -> None:
+    """Altera o número máximo de requisições simultâneas por event loop."""
+    global MAX_CONCURRENCY
+    MAX_CONCURRENCY = max(1, int(limit))
+    with _pool_lock:
+        _limiters.clear()
+
+
+def _limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        sem = _limiters.get(loop)
+        if sem is None:
+            sem = asyncio.Semaphore(MAX_CONCURRENCY)
+            _limiters[loop] = sem
+    return sem
 
 def _headers():
     return {
@@ -29,28 +423,11 @@ def _headers():
         "X-Title": "flashsoft-autobot-mvp"
     }
 
-def _find_json_balanced(s: str):
-    """Encontra o primeiro objeto JSON balanceado."""
-    stack = 0
-    start = None
-    for i, ch in enumerate(s):
-        if ch == "{":
-            if stack == 0:
-                start = i
-            stack += 1
-        elif ch == "}":
-            if stack > 0:
-                stack -= 1
-                if stack == 0 and start is not None:
-                    cand = s[start:i+1]
-                    try:
-                        return json.loads(cand)
-                    except Exception:
-                        pass
-    return None
-
-def safe_json_extract(text: str):
-    """Extrator tolerante: tenta JSON puro, bloco ```json, balanceado, e por fim o maior bloco."""
+def safe_json_extract(text: str, expected_keys: Optional[Sequence[str]] = None):
+    """Extrator tolerante: tenta JSON puro, bloco ```json, varredura balanceada, e por fim o maior bloco.
+
+    A varredura (utils/json_scanner.py) é linear e ignora chaves dentro de strings;
+    com `expected_keys`, prefere o primeiro objeto que contenha todas elas."""
     if not text:
         raise ValueError("Saída vazia")
     t = text.strip()
@@ -69,8 +446,10 @@ def safe_json_extract(text: str):
         except Exception:
             pass
 
-    # 3) balanceado
-    obj = _find_json_balanced(t)
+    # 3) balanceado (string-aware, uma passada)
+    obj = find_json_object(t, expected_keys)
+    if obj is None and expected_keys:
+        obj = find_json_object(t)
     if obj is not None:
         return obj
 
@@ -81,45 +460,439 @@ def safe_json_extract(text: str):
 
     raise ValueError("Saída sem JSON")
 
-@retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_exponential_jitter(1, 2))
-def chat(model: str, system: str, user: str, temperature: float = 0.2, max_tokens: int = 2000) -> str:
-    """Instancia um novo cliente para cada chamada para evitar problemas de conexão."""
-    client = OpenAI(
-        api_key=OPENROUTER_API_KEY, 
-        base_url=BASE_URL,
-        timeout=TIMEOUT,
-        max_retries=0 # Desabilitar retry do SDK, usar o do Tenacity
-    )
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
+# ============================================================================
+# RATE LIMIT POR PROVEDOR/MODELO
+# ============================================================================
+# Token bucket (requisições/min e tokens/min) por escopo `*`, provedor e modelo,
+# compartilhado entre threads e processos do host (ver utils/rate_limiter.py).
+# Configuração em `LLM_RATE_LIMITS`; modelos `:free` têm `LLM_FREE_RPM` por padrão.
+# Um 429 pausa o escopo até o `Retry-After`. `LLM_RATE_LIMIT=0` desliga.
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    global _rate_limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter.from_env()
+    return _rate_limiter
+
+
+def rate_limit_stats() -> Dict[str, float]:
+    limiter = get_rate_limiter()
+    return limiter.snapshot() if limiter else {}
+
+
+async def _throttle(model: str, system: str, user: str, max_tokens: int) -> Optional[Ticket]:
+    """Reserva a cota do modelo e espera o necessário antes de enviar.
+
+    O limitador usa lock de arquivo e I/O síncrono; roda numa thread para não
+    travar as demais requisições do loop compartilhado."""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return None
+    tokens = count_tokens(system) + count_tokens(user) + (max_tokens or 0)
+    ticket = await asyncio.to_thread(limiter.reserve, model, tokens)
+    if ticket.wait > 0:
+        await asyncio.sleep(ticket.wait)
+    return ticket
+
+
+async def _settle_rate(model: str, ticket: Optional[Ticket], usage=None, exc: Optional[BaseException] = None):
+    limiter = get_rate_limiter()
+    if limiter is None or ticket is None:
+        return
+    if exc is not None:
+        if status_code(exc) == 429:
+            await asyncio.to_thread(limiter.penalize, model, retry_after(exc))
+            if ticket.token_buckets:
+                await asyncio.to_thread(limiter.settle, ticket, 0)
+        return
+    if not ticket.token_buckets:
+        return
+    used = _usage_dict(usage)
+    await asyncio.to_thread(limiter.settle, ticket, used["total_tokens"] if used else ticket.tokens)
+
+
+# ============================================================================
+# CACHE DE PREFIXO DO PROMPT
+# ============================================================================
+# As mensagens são montadas como prefixo estável (system + `user`) seguido de um
+# sufixo variável (`suffix`, ex.: o erro da tentativa anterior), para que os
+# retries reaproveitem o cache de prompt do provedor. OpenAI, DeepSeek e Grok
+# fazem cache automático de prefixos idênticos; Anthropic e Gemini precisam de
+# marcações `cache_control`, emitidas quando o prefixo tem ao menos
+# `LLM_PROMPT_CACHE_MIN_TOKENS`. `LLM_PROMPT_CACHE=0` desliga as marcações.
+
+_EXPLICIT_CACHE_PREFIXES = ("anthropic/", "google/gemini")
+
+
+def supports_cache_hints(model: str) -> bool:
+    return model.startswith(_EXPLICIT_CACHE_PREFIXES)
+
+
+def _text_part(text: str, cache: bool) -> dict:
+    part = {"type": "text", "text": text}
+    if cache:
+        part["cache_control"] = {"type": "ephemeral"}
+    return part
+
+
+def _messages(model: str, system: str, user: str, suffix: str = "") -> list:
+    if not (PROMPT_CACHE_ENABLED and supports_cache_hints(model)):
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user + suffix},
+        ]
+    system_tokens = count_tokens(system)
+    prefix_tokens = system_tokens + count_tokens(user)
+    if prefix_tokens < PROMPT_CACHE_MIN_TOKENS:
+        return [
             {"role": "system", "content": system},
-            {"role": "user", "content": user}
-        ],
+            {"role": "user", "content": user + suffix},
+        ]
+    # Breakpoint no system (reaproveitado entre chamadas diferentes do mesmo nó)
+    # e, havendo sufixo, no fim da parte estável do user (reaproveitado nos retries).
+    user_parts = [_text_part(user, cache=bool(suffix))]
+    if suffix:
+        user_parts.append(_text_part(suffix, cache=False))
+    return [
+        {"role": "system", "content": [_text_part(system, cache=system_tokens >= PROMPT_CACHE_MIN_TOKENS)]},
+        {"role": "user", "content": user_parts},
+    ]
+
+
+async def _acreate_completion(model: str, system: str, user: str, suffix: str = "", **kwargs):
+    ticket = await _throttle(model, system, user + suffix, kwargs.get("max_tokens", 0))
+    # Só depois da espera: o cliente pode ter sido removido do pool (e fechado) nesse meio-tempo.
+    client = get_client()
+    with _in_use(client):
+        async with _limiter():
+            try:
+                resp = await client.chat.completions.create(
+                    model=model,
+                    messages=_messages(model, system, user, suffix),
+                    extra_headers=_headers(),
+                    **kwargs
+                )
+            except (APITimeoutError, APIConnectionError) as exc:
+                # Reset-on-hang: a conexão pode estar presa; o próximo retry usa um cliente novo
+                if POOL_ENABLED:
+                    _evict(client)
+                await _settle_rate(model, ticket, exc=exc)
+                raise
+            except Exception as exc:
+                await _settle_rate(model, ticket, exc=exc)
+                raise
+    await _settle_rate(model, ticket, getattr(resp, "usage", None))
+    return resp
+
+# ============================================================================
+# SINGLE-FLIGHT
+# ============================================================================
+# Requisições idênticas (modelo, prompts e parâmetros) em voo ao mesmo tempo no
+# mesmo event loop compartilham uma única chamada upstream. Como a API síncrona
+# roda toda no loop de fundo, isso cobre também threads (ex.: ThreadPoolExecutor
+# do SACI). O consumo real é reportado a quem recebe a resposta primeiro; os
+# demais recebem `usage` zerado com `coalesced=True`. `LLM_COALESCE=0` desliga.
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "usage_reported")
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+        self.usage_reported = False
+
+
+def _flight_key(model: str, system: str, user: str, kwargs: dict) -> str:
+    payload = json.dumps([model, system, user, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def coalesce_stats() -> Dict[str, int]:
+    """Chamadas upstream feitas e requisições atendidas por uma chamada já em voo."""
+    return dict(_coalesce_stats)
+
+
+async def _acompletion(model: str, system: str, user: str, on_usage=None, **kwargs):
+    if not COALESCE_ENABLED:
+        resp = await _acreate_completion(model, system, user, **kwargs)
+        _report_usage(resp, on_usage)
+        return resp
+
+    flights = _inflight.setdefault(asyncio.get_running_loop(), {})
+    key = _flight_key(model, system, user, kwargs)
+    flight = flights.get(key)
+    if flight is None:
+        flight = _Flight(asyncio.ensure_future(_acreate_completion(model, system, user, **kwargs)))
+        flights[key] = flight
+        flight.task.add_done_callback(lambda _task: flights.get(key) is flight and flights.pop(key))
+        _coalesce_stats["upstream"] += 1
+    else:
+        _coalesce_stats["coalesced"] += 1
+
+    flight.waiters += 1
+    try:
+        resp = await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Todos os interessados desistiram: cancela a chamada upstream
+            flight.task.cancel()
+            if flights.get(key) is flight:
+                flights.pop(key)
+
+    if not flight.usage_reported:
+        flight.usage_reported = True
+        _report_usage(resp, on_usage)
+    elif on_usage:
+        on_usage({"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "coalesced": True})
+    return resp
+
+
+def _usage_dict(usage) -> Optional[Dict[str, int]]:
+    """Normaliza o `usage` do provedor; None se a resposta não trouxe contagem."""
+    if usage is None or getattr(usage, "prompt_tokens", None) is None:
+        return None
+    prompt = usage.prompt_tokens or 0
+    completion = getattr(usage, "completion_tokens", None) or 0
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": getattr(usage, "total_tokens", None) or prompt + completion,
+        "cached_tokens": _cached_tokens(usage),
+    }
+
+
+def _cached_tokens(usage) -> int:
+    """Tokens do prompt servidos do cache do provedor (`prompt_tokens_details.cached_tokens`)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return int(details.get("cached_tokens") or 0)
+    return int(getattr(details, "cached_tokens", None) or 0)
+
+def _prompt_tokens(system: str, user: str) -> int:
+    return count_tokens(system) + count_tokens(user)
+
+def _report_usage(resp, on_usage: Optional[Callable[[dict], None]]):
+    if on_usage:
+        usage = _usage_dict(getattr(resp, "usage", None))
+        if usage:
+            on_usage(usage)
+
+@retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_exponential_jitter(1, 2))
+async def achat(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.2,
+    max_tokens: int = 2000,
+    on_usage: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+) -> str:
+    """Chamada de chat assíncrona, limitada por `MAX_CONCURRENCY` e cancelável.
+
+    `on_usage` recebe o consumo real reportado pelo provedor (prompt/completion/total/cached).
+    `suffix` é a parte variável do prompt, enviada após o prefixo estável `user`."""
+    resp = await _acompletion(
+        model,
+        system,
+        user,
+        on_usage=on_usage,
+        suffix=suffix,
         temperature=temperature,
         max_tokens=max_tokens,
-        extra_headers=_headers()
     )
     return resp.choices[0].message.content
 
 @retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_exponential_jitter(1, 2))
-def chat_json(model: str, system: str, user: str, temperature: float = 0.0, max_tokens: int = 2000) -> str:
-    """Pede JSON nativo e também instancia um cliente novo."""
-    client = OpenAI(
-        api_key=OPENROUTER_API_KEY, 
-        base_url=BASE_URL,
-        timeout=TIMEOUT,
-        max_retries=0 # Desabilitar retry do SDK, usar o do Tenacity
-    )
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user}
-        ],
+async def achat_json(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.0,
+    max_tokens: int = 2000,
+    on_usage: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+) -> str:
+    """Versão assíncrona de `chat_json`."""
+    resp = await _acompletion(
+        model,
+        system,
+        user,
+        on_usage=on_usage,
+        suffix=suffix,
         temperature=temperature,
         max_tokens=max_tokens,
         response_format={"type": "json_object"},
-        extra_headers=_headers()
     )
     return resp.choices[0].message.content
+
+def chat(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.2,
+    max_tokens: int = 2000,
+    on_usage: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+    cancel: Optional[CancelScope] = None,
+) -> str:
+    """Wrapper síncrono de `achat`.
+
+    Com `cancel`, a chamada pode ser abortada por `cancel.cancel()` (levanta `ChatCancelled`)."""
+    return run_sync(
+        achat(
+            model,
+            system,
+            user,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            on_usage=on_usage,
+            suffix=suffix,
+        ),
+        cancel=cancel,
+        model=model,
+        prompt_tokens=_prompt_tokens(system, user + suffix) if cancel is not None else 0,
+    )
+
+def chat_json(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.0,
+    max_tokens: int = 2000,
+    on_usage: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+    cancel: Optional[CancelScope] = None,
+) -> str:
+    """Pede JSON nativo; wrapper síncrono de `achat_json` (cancelável como `chat`)."""
+    return run_sync(
+        achat_json(
+            model,
+            system,
+            user,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            on_usage=on_usage,
+            suffix=suffix,
+        ),
+        cancel=cancel,
+        model=model,
+        prompt_tokens=_prompt_tokens(system, user + suffix) if cancel is not None else 0,
+    )
+
+async def achat_stream(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.2,
+    max_tokens: int = 2000,
+    on_metrics: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+) -> AsyncIterator[str]:
+    """Gera os deltas de texto da resposta à medida que chegam.
+
+    Ao final (ou se o consumidor parar antes), `on_metrics` recebe um dict com
+    `ttft_s` (tempo até o primeiro token), `duration_s`, `completion_tokens` e
+    `tokens_per_sec` (taxa de geração após o primeiro token). Sem retry: uma falha
+    no meio do stream é propagada ao consumidor."""
+    started = time.perf_counter()
+    first_token_at = None
+    pieces = 0
+    chars = 0
+    usage = None
+    completed = False
+    ticket = await _throttle(model, system, user + suffix, max_tokens)
+    client = get_client()  # após a espera, como em `_acreate_completion`
+    with _in_use(client):
+        async with _limiter():
+            try:
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=_messages(model, system, user, suffix),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    extra_headers=_headers(),
+                )
+            except (APITimeoutError, APIConnectionError) as exc:
+                if POOL_ENABLED:
+                    _evict(client)
+                await _settle_rate(model, ticket, exc=exc)
+                raise
+            except Exception as exc:
+                await _settle_rate(model, ticket, exc=exc)
+                raise
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    pieces += 1
+                    chars += len(delta)
+                    yield delta
+                completed = True
+            finally:
+                await stream.close()
+                await _settle_rate(model, ticket, usage)
+                if on_metrics:
+                    on_metrics(_stream_metrics(model, started, first_token_at, pieces, chars, usage, completed))
+
+
+def _stream_metrics(model, started, first_token_at, pieces, chars, usage, completed) -> dict:
+    finished = time.perf_counter()
+    prompt_tokens = getattr(usage, "prompt_tokens", None) if usage else None
+    cached_tokens = _cached_tokens(usage) if usage else None
+    completion_tokens = getattr(usage, "completion_tokens", None) if usage else None
+    usage_reported = completion_tokens is not None
+    if not usage_reported:
+        # Sem usage do provedor: cada delta costuma ser ~1 token; len/4 como piso
+        completion_tokens = max(pieces, int(chars / 4))
+    ttft = (first_token_at - started) if first_token_at is not None else None
+    generation = (finished - first_token_at) if first_token_at is not None else 0.0
+    return {
+        "model": model,
+        "ttft_s": round(ttft, 4) if ttft is not None else None,
+        "duration_s": round(finished - started, 4),
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_per_sec": round(completion_tokens / generation, 2) if generation > 0 else None,
+        "usage_reported": usage_reported,
+        "completed": completed,
+    }
+
+
+def chat_stream(
+    model: str,
+    system: str,
+    user: str,
+    temperature: float = 0.2,
+    max_tokens: int = 2000,
+    on_metrics: Optional[Callable[[dict], None]] = None,
+    suffix: str = "",
+) -> Iterator[str]:
+    """Wrapper síncrono de `achat_stream`: um gerador de deltas de texto."""
+    return iter_sync(
+        achat_stream(
+            model,
+            system,
+            user,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            on_metrics=on_metrics,
+            suffix=suffix,
+        )
+    )
@@ -4,10 +4,14 @@ from pathlib import Path
 import yaml
 
 from llm_client import safe_json_extract
-from json_sanitizer import safe_json_extract_v2
+from json_sanitizer import JSONSanitizerAgent
 from router import Router
+from utils.json_repair import UNTERMINATED_CONTAINER, UNTERMINATED_STRING
 
 TOKEN_THRESHOLD_SPEC = 500_000
+# Reparos que indicam resposta cortada (ex.: em `max_completion`): os patches
+# viriam com conteúdo de arquivo truncado, então a resposta é rejeitada.
+TRUNCATION_REPAIRS = (UNTERMINATED_STRING, UNTERMINATED_CONTAINER)
 
 
 def _clean_error_message(error: Exception) -> str:
@@ -63,16 +67,32 @@ def run_planner_coder(
 
     last_error = ''
     for attempt in range(10):  # Aumentado de 3 para 10 tentativas
-        user = base_user
+        # O aviso de erro vai como sufixo: system + base_user ficam estáveis entre
+        # as tentativas e podem ser servidos do cache de prompt do provedor
+        suffix = ''
         if last_error:
-            user += (
+            suffix = (
                 '\n\nATENCAO: a tentativa anterior falhou ao interpretar o JSON. '
                 f'Erro capturado: {last_error}. Garanta que a resposta esteja em JSON valido.'
             )
         try:
-            out = router.call('planner', system, user, max_completion=3000, force_json=False)  # force_json=False para permitir markdown
-            data = safe_json_extract_v2(out, expected_keys=['patches', 'test_plan'])  # Usa novo sanitizer
-            assert 'patches' in data and 'test_plan' in data, 'JSON invalido do PlannerCoder'
+            out = router.call(
+                'planner', system, base_user, max_completion=3000, force_json=False, suffix=suffix
+            )  # force_json=False para permitir markdown
+            sanitizer = JSONSanitizerAgent()
+            try:
+                data = sanitizer.repair(out, expected_keys=['patches', 'test_plan']).value
+                assert 'patches' in data and 'test_plan' in data, 'JSON invalido do PlannerCoder'
+                truncated = [r for r in sanitizer.last_repairs if r in TRUNCATION_REPAIRS]
+                if truncated:  # nunca aplicar patches de uma resposta cortada
+                    raise ValueError(f'JSON truncado do PlannerCoder ({", ".join(truncated)}); responda de forma mais curta')
+            except Exception:
+                router.report_output('planner', valid=False, raw=out)  # alimenta o ranking adaptativo
+                raise
+            # Saídas que precisaram de reparo vão para o log (corpus de benchmark do parser)
+            router.report_output(
+                'planner', valid=True, raw=out if sanitizer.last_repairs else None, repairs=sanitizer.last_repairs
+            )
             return data
         except Exception as exc:
             last_error = _clean_error_message(exc)
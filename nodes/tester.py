@@ -17,15 +17,17 @@ def run_tester(router: Router, patches: list, test_plan: str) -> dict:
     )
     last_error = ""
     for attempt in range(1, 4):
-        user = base_user
+        suffix = ""
         if last_error:
-            user += (
+            suffix = (
                 "\n\nATENCAO: a tentativa anterior nao pôde ser convertida em JSON. "
                 f"Erro capturado: {last_error}. Responda apenas com JSON valido."
             )
         try:
-            out = router.call("tester", system, user, max_completion=2000, force_json=True)
-            data = safe_json_extract(out)
+            out = router.call(
+                "tester", system, base_user, max_completion=2000, force_json=True, suffix=suffix
+            )
+            data = safe_json_extract(out, expected_keys=["patches"])
             assert "patches" in data, "JSON invalido do Tester"
             return data
         except Exception as exc:
@@ -1,12 +1,128 @@
+import asyncio
 import os
-from collections import defaultdict
-from typing import Any, Callable, Dict, List, Optional
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-from llm_client import chat, chat_json
+from llm_client import achat, achat_json, achat_stream, iter_sync, run_sync, safe_json_extract
+from utils.circuit_breaker import CircuitBreaker
+from utils.model_stats import ModelStats
+from utils.response_cache import ResponseCache, cache_key
+from utils.tokens import count_tokens
 
 BUDGET_TOKENS = int(os.getenv("MAX_TOKENS_TOTAL", "220000"))
 _TRUTHY = {"1", "true", "t", "yes", "y", "on"}
 
+# Response cache: "off" (default), "on" (read + write) or "replay" (cache only;
+# a miss raises instead of calling a model, for deterministic test/QA runs).
+CACHE_MODES = ("off", "on", "replay")
+CACHE_MODE = os.getenv("ROUTER_CACHE_MODE", "off").strip().lower()
+CACHE_DIR = os.getenv("ROUTER_CACHE_DIR", ".cache/router")
+CACHE_MAX_BYTES = int(float(os.getenv("ROUTER_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_TEMPERATURE = 0.2
+JSON_TEMPERATURE = 0.0
+
+# Hedging: if the in-flight attempt hasn't answered after the role's latency
+# percentile, the next committee member is fired in parallel. Until enough
+# samples exist, HEDGE_DEFAULT_DELAY seconds is used.
+HEDGE_ENABLED = os.getenv("ROUTER_HEDGE", "1").strip().lower() in _TRUTHY
+HEDGE_PERCENTILE = float(os.getenv("ROUTER_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("ROUTER_HEDGE_MIN_SAMPLES", "5"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", "30"))
+HEDGE_MIN_DELAY = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "1"))
+LATENCY_WINDOW = 50
+
+# Adaptive ranking: committees are ordered by expected seconds to a valid answer
+# (EWMA latency / success rate / JSON-validity rate), persisted across runs.
+ADAPTIVE_RANKING = os.getenv("ROUTER_ADAPTIVE", "1").strip().lower() in _TRUTHY
+STATS_PATH = os.getenv("ROUTER_STATS_PATH", ".cache/router_stats.json")
+STATS_ALPHA = float(os.getenv("ROUTER_STATS_ALPHA", "0.3"))
+
+# Circuit breaker per model: after consecutive failures (or a 429) the model is
+# skipped outright until the cooldown ends, then a single probe is let through.
+CIRCUIT_ENABLED = os.getenv("ROUTER_CIRCUIT", "1").strip().lower() in _TRUTHY
+CIRCUIT_FAILURES = int(os.getenv("ROUTER_CIRCUIT_FAILURES", "3"))
+CIRCUIT_COOLDOWN = float(os.getenv("ROUTER_CIRCUIT_COOLDOWN", "30"))
+
+# Default fan-out of `call_many`.
+BATCH_MAX_PARALLEL = int(os.getenv("ROUTER_BATCH_PARALLEL", "4"))
+
+# Raw answers the caller had to repair or could not parse are logged (truncated)
+# as `router_raw_output`; `scripts/build_json_corpus.py` harvests them.
+RAW_OUTPUT_LOG_CHARS = int(os.getenv("ROUTER_LOG_RAW_OUTPUT_CHARS", "65536"))
+
+
+class InvalidOutputError(ValueError):
+    """A model answered, but the output is unusable (empty or not JSON when required)."""
+
+
+class BudgetExceededError(RuntimeError):
+    """Dispatching the call would exceed the run or node token budget."""
+
+
+@dataclass
+class _Attempt:
+    idx: int
+    model: str
+    started: float
+    hedged: bool
+    reserved: int
+    charged: int = 0
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one `call_many` item: `result` on success, `error` otherwise."""
+
+    index: int
+    result: Optional[str] = None
+    error: Optional[BaseException] = None
+    latency_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# A batch item: (system, user) or a mapping of `acall` keyword arguments.
+BatchRequest = Union[Tuple[str, str], Mapping[str, Any]]
+
+
+def _batch_item(index: int, req: BatchRequest) -> Dict[str, Any]:
+    if isinstance(req, Mapping):
+        return dict(req)
+    if len(req) != 2:
+        raise TypeError(f"call_many item {index}: expected (system, user), got {len(req)} element(s)")
+    system, user = req
+    return {"system": system, "user": user}
+
+
+def _node_budgets() -> Dict[str, int]:
+    """Per-node budgets from `MAX_TOKENS_<NODE>` (e.g. MAX_TOKENS_ARCHITECT=40000)."""
+    budgets = {}
+    for key, raw in os.environ.items():
+        if key.startswith("MAX_TOKENS_") and key != "MAX_TOKENS_TOTAL" and raw.strip():
+            budgets[key[len("MAX_TOKENS_"):].lower()] = int(raw)
+    return budgets
+
 FREE_MODEL_DEFAULTS = {
     "architect": "deepseek/deepseek-chat-v3.1:free",
     "planner": "deepseek/deepseek-chat-v3.1:free",
@@ -54,10 +170,21 @@ class Router:
     Committees may be configured via environment variables like
     `MODEL_PLANNER_COMMITTEE` = "modelA,modelB". The router tries each entry
     in order and promotes the first successful specialist so future calls
-    start with the best performer.
+    start with the best performer. A slow attempt is hedged: once it runs past
+    the role's latency percentile the next member starts in parallel, the first
+    valid answer wins and the rest are cancelled.
+
+    Responses can be cached on disk (`ROUTER_CACHE_MODE=on`) keyed by model,
+    prompts and sampling parameters; `replay` serves exclusively from that cache.
     """
 
-    def __init__(self, event_logger: Optional[Callable[[dict], None]] = None):
+    def __init__(
+        self,
+        event_logger: Optional[Callable[[dict], None]] = None,
+        cache_mode: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        stats_path: Optional[str] = None,
+    ):
         self.models = {
             "architect": os.getenv(
                 "MODEL_ARCHITECT",
@@ -111,14 +238,58 @@ class Router:
             role: defaultdict(int) for role in self.models
         }
         self.tokens_spent = 0
+        self.tokens_reserved = 0
+        self.reserved_per_node = defaultdict(int)
+        self.budget_tokens = BUDGET_TOKENS
+        self.node_budgets = _node_budgets()
+        self.usage_sources = {"provider": 0, "estimated": 0, "coalesced": 0}
         self._log_event = event_logger
 
+        self.cache_mode = (cache_mode or CACHE_MODE).strip().lower()
+        if self.cache_mode not in CACHE_MODES:
+            raise ValueError(f"ROUTER_CACHE_MODE inválido: {self.cache_mode!r} (use {CACHE_MODES})")
+        self.cache = (
+            ResponseCache(cache_dir or CACHE_DIR, CACHE_MAX_BYTES)
+            if self.cache_mode != "off"
+            else None
+        )
+        self.cache_stats = {"hits": 0, "misses": 0, "saved_tokens": 0}
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.hedge_stats = {"hedges": 0, "wins": 0, "cancelled": 0, "extra_tokens": 0}
+        self.adaptive = ADAPTIVE_RANKING
+        self.stats = ModelStats(
+            (stats_path or STATS_PATH) if self.adaptive else None, alpha=STATS_ALPHA
+        )
+        self.last_model: Dict[str, str] = {}
+        # Nodes whose last answer was replayed from the cache (no fresh evidence about the model)
+        self.last_cached: Set[str] = set()
+        self.breaker = (
+            CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_COOLDOWN, on_change=self._on_circuit_change)
+            if CIRCUIT_ENABLED
+            else None
+        )
+        self.circuit_stats = {"skipped": 0}
+        self.prompt_cache: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "cached_calls": 0,
+                "cached_latency_s": 0.0,
+                "uncached_calls": 0,
+                "uncached_latency_s": 0.0,
+            }
+        )
+        if self.adaptive:
+            for role in self.committees:
+                self._rerank(role, reason="persisted_stats")
+
         self._emit(
             {
                 "event": "router_committee",
                 "profile": self.profile,
                 "committees": self.committees,
-                "budget_tokens": BUDGET_TOKENS,
+                "budget_tokens": self.budget_tokens,
+                "node_budgets": self.node_budgets,
             }
         )
 
@@ -175,7 +346,8 @@ class Router:
         return lineup
 
     def estimate_tokens(self, text: str, completion_max: int) -> int:
-        return int(len(text) / 4) + completion_max
+        """Projected cost of a call: local prompt token count plus the completion cap."""
+        return count_tokens(text) + completion_max
 
     def promote_model(self, role: str, model: Optional[str], reason: Optional[str] = None):
         if not model:
@@ -215,47 +387,638 @@ class Router:
         user: str,
         max_completion: int = 2000,
         force_json: bool = False,
+        temperature: Optional[float] = None,
+        suffix: str = "",
+    ) -> str:
+        return run_sync(
+            self.acall(
+                node,
+                system,
+                user,
+                max_completion=max_completion,
+                force_json=force_json,
+                temperature=temperature,
+                suffix=suffix,
+            )
+        )
+
+    async def acall(
+        self,
+        node: str,
+        system: str,
+        user: str,
+        max_completion: int = 2000,
+        force_json: bool = False,
+        temperature: Optional[float] = None,
+        suffix: str = "",
     ) -> str:
-        if self.tokens_spent > BUDGET_TOKENS:
-            raise RuntimeError(f"Budget de tokens excedido: {self.tokens_spent}")
+        """
+        Async core of `call`: same committee failover, cancellable by the caller.
 
+        `user` is the stable part of the prompt and `suffix` the part that
+        changes between retries (e.g. the previous error). They are sent in that
+        order, so providers can serve `system + user` from their prompt cache.
+        """
+        if temperature is None:
+            temperature = JSON_TEMPERATURE if force_json else DEFAULT_TEMPERATURE
         attempts = self.committees.get(node) or [self.models.get(node)]
-        last_error: Optional[str] = None
+        full_user = user + suffix
 
-        for idx, model_to_use in enumerate(attempts):
-            if not model_to_use:
-                continue
+        if self.cache is not None:
+            cached = self._cache_lookup(
+                node, attempts, system, full_user, temperature, max_completion, force_json
+            )
+            if cached is not None:
+                return cached
+            if self.cache_mode == "replay":
+                raise RuntimeError(f"Replay: nenhuma resposta em cache para '{node}'")
 
-            est = self.estimate_tokens(system + user, max_completion)
-            try:
-                if force_json:
-                    out = chat_json(
-                        model_to_use, system, user, max_tokens=max_completion
-                    )
+        lineup = [model for model in attempts if model]
+        prompt_tokens = count_tokens(system) + count_tokens(full_user)
+        projected = prompt_tokens + max_completion
+        blocked = self._check_budget(node, projected)
+        if blocked:
+            self._emit(
+                {"event": "router_budget_blocked", "node": node, "projected": projected, "reason": blocked}
+            )
+            raise BudgetExceededError(f"Budget de tokens excedido: {blocked}")
+
+        hedge_delay = self._hedge_delay(node)
+        pending: Dict[asyncio.Future, _Attempt] = {}
+        next_idx = 0
+        won = False
+        won_latency = 0.0
+        last_error: Optional[str] = None
+        budget_block: Optional[str] = None
+        launched = 0
+
+        def launch(hedged: bool) -> bool:
+            nonlocal next_idx, hedge_delay, budget_block, launched
+            blocked = self._check_budget(node, projected)
+            if blocked:
+                self._emit(
+                    {
+                        "event": "router_budget_blocked",
+                        "node": node,
+                        "projected": projected,
+                        "reason": blocked,
+                        "hedge": hedged,
+                    }
+                )
+                if hedged:
+                    hedge_delay = None
                 else:
-                    out = chat(model_to_use, system, user, max_tokens=max_completion)
-                self.tokens_spent += est
-                self.tokens_per_node[node] += est
-                self.success_count[node] += 1
-                self.model_success[node][model_to_use] += 1
+                    budget_block = blocked
+                return False
+            while next_idx < len(lineup) and not self._circuit_allows(node, lineup[next_idx]):
+                next_idx += 1
+            if next_idx >= len(lineup):
+                return False
+            attempt = _Attempt(
+                idx=next_idx,
+                model=lineup[next_idx],
+                started=time.perf_counter(),
+                hedged=hedged,
+                reserved=projected,
+            )
+            next_idx += 1
+            launched += 1
+            task = asyncio.ensure_future(
+                self._attempt(
+                    attempt.model,
+                    system,
+                    user,
+                    max_completion,
+                    force_json,
+                    temperature,
+                    on_usage=attempt.usage.update,
+                    suffix=suffix,
+                )
+            )
+            pending[task] = attempt
+            # Reserve the projected cost (prompt + max completion) while in flight,
+            # so concurrent calls and hedges can't overshoot the budget together.
+            self._reserve(node, projected)
+            if hedged:
+                self.hedge_stats["hedges"] += 1
                 self._emit(
                     {
-                        "event": "router_model_attempt",
+                        "event": "router_hedge",
                         "node": node,
-                        "model": model_to_use,
-                        "success": True,
-                        "attempt": idx + 1,
-                        "force_json": force_json,
+                        "model": attempt.model,
+                        "attempt": attempt.idx + 1,
+                        "after_s": round(hedge_delay, 3),
+                        "in_flight": [info.model for info in pending.values()],
                         "tokens_spent": self.tokens_spent,
                     }
                 )
-                self.promote_model(node, model_to_use)
-                return out
+            return True
+
+        try:
+            if lineup:
+                launch(hedged=False)
+            while pending:
+                can_hedge = hedge_delay is not None and next_idx < len(lineup)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if not launch(hedged=True):
+                        hedge_delay = None
+                    continue
+
+                winner: Optional[Tuple[str, _Attempt]] = None
+                failed = False
+                for task in done:
+                    attempt = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        out = task.result()
+                        self._settle(node, attempt, prompt_tokens, out)
+                        if winner is not None:
+                            self._circuit_record(attempt.model)
+                        if winner is None:
+                            winner = (out, attempt)
+                        continue
+                    failed = True
+                    self._settle(node, attempt, prompt_tokens)
+                    self._circuit_record(attempt.model, exc)
+                    err_msg = str(exc)
+                    last_error = err_msg
+                    self.err_count[node][attempt.model] += 1
+                    self.stats.record(
+                        node,
+                        attempt.model,
+                        success=False,
+                        latency=time.perf_counter() - attempt.started,
+                        json_valid=False if isinstance(exc, InvalidOutputError) and force_json else None,
+                    )
+                    self._emit(
+                        {
+                            "event": "router_model_attempt",
+                            "node": node,
+                            "model": attempt.model,
+                            "success": False,
+                            "attempt": attempt.idx + 1,
+                            "force_json": force_json,
+                            "error": err_msg[:4000],
+                            "tokens_spent": self.tokens_spent,
+                        }
+                    )
+
+                if winner is not None:
+                    out, attempt = winner
+                    self._circuit_record(attempt.model)
+                    latency = time.perf_counter() - attempt.started
+                    won_latency = latency
+                    self.latencies[node].append(latency)
+                    self.stats.record(
+                        node,
+                        attempt.model,
+                        success=True,
+                        latency=latency,
+                        json_valid=True if force_json else None,
+                    )
+                    self.last_model[node] = attempt.model
+                    self.last_cached.discard(node)
+                    self._record_prompt_cache(node, attempt.usage, latency)
+                    if attempt.hedged:
+                        self.hedge_stats["wins"] += 1
+                    if self.cache is not None:
+                        self.cache.put(
+                            self._cache_key(
+                                attempt.model, system, full_user, temperature, max_completion, force_json
+                            ),
+                            {
+                                "node": node,
+                                "model": attempt.model,
+                                "response": out,
+                                "tokens": attempt.charged,
+                            },
+                        )
+                    self.success_count[node] += 1
+                    self.model_success[node][attempt.model] += 1
+                    self._emit(
+                        {
+                            "event": "router_model_attempt",
+                            "node": node,
+                            "model": attempt.model,
+                            "success": True,
+                            "attempt": attempt.idx + 1,
+                            "force_json": force_json,
+                            "hedged": attempt.hedged,
+                            "usage": attempt.usage or None,
+                            "tokens": attempt.charged,
+                            "tokens_spent": self.tokens_spent,
+                        }
+                    )
+                    won = True
+                    if self.adaptive:
+                        self._rerank(node)
+                    else:
+                        self.promote_model(node, attempt.model)
+                    return out
+
+                if failed and next_idx < len(lineup):
+                    launch(hedged=False)
+        finally:
+            if pending:
+                now = time.perf_counter()
+                for task, attempt in pending.items():
+                    task.cancel()
+                    if self.breaker is not None:
+                        self.breaker.release(attempt.model)
+                    # Cancelled mid-flight: the prompt is assumed billed.
+                    self._settle(node, attempt, prompt_tokens)
+                    self.hedge_stats["extra_tokens"] += attempt.charged
+                    # Lost the race: elapsed time is only a lower bound on its
+                    # latency, and says nothing unless it outlasted the winner.
+                    elapsed = now - attempt.started
+                    if won and elapsed >= won_latency:
+                        self.stats.record_censored(node, attempt.model, elapsed)
+                if won and self.adaptive:
+                    self._rerank(node)
+                self.hedge_stats["cancelled"] += len(pending)
+                self._emit(
+                    {
+                        "event": "router_hedge_cancelled",
+                        "node": node,
+                        "models": [info.model for info in pending.values()],
+                    }
+                )
+
+        if self.adaptive:
+            self._rerank(node)
+        if lineup and not launched:
+            raise RuntimeError(f"Nenhum modelo disponível para '{node}': circuitos abertos para {lineup}")
+        if budget_block:
+            raise BudgetExceededError(
+                f"Budget de tokens excedido: {budget_block} (failover interrompido, último erro: {last_error})"
+            )
+        raise RuntimeError(f"Nenhum modelo disponível para '{node}'. Último erro: {last_error}")
+
+    def _circuit_allows(self, node: str, model: str) -> bool:
+        if self.breaker is None or self.breaker.allow(model):
+            return True
+        self.circuit_stats["skipped"] += 1
+        self._emit({"event": "router_circuit_skip", "node": node, "model": model})
+        return False
+
+    def _circuit_record(self, model: str, exc: Optional[BaseException] = None):
+        if self.breaker is None:
+            return
+        if exc is None or isinstance(exc, InvalidOutputError):
+            # The model answered, even if unusably: it's reachable.
+            self.breaker.record_success(model)
+        else:
+            self.breaker.record_failure(model, exc)
+
+    def _on_circuit_change(self, model: str, state: str, info: dict):
+        event = {"open": "router_circuit_open", "closed": "router_circuit_close"}.get(
+            state, "router_circuit_half_open"
+        )
+        self._emit({"event": event, "model": model, **info})
+
+    def _record_prompt_cache(self, node: str, usage: Dict[str, int], latency: Optional[float]):
+        """Accumulate provider-reported cached vs uncached prompt tokens for `node`."""
+        if not usage or usage.get("coalesced"):
+            return
+        entry = self.prompt_cache[node]
+        cached = int(usage.get("cached_tokens") or 0)
+        entry["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+        entry["cached_tokens"] += cached
+        kind = "cached" if cached else "uncached"
+        entry[f"{kind}_calls"] += 1
+        entry[f"{kind}_latency_s"] += latency or 0.0
+
+    def _prompt_cache_metrics(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for node, entry in self.prompt_cache.items():
+            prompt = entry["prompt_tokens"]
+            report[node] = {
+                "prompt_tokens": prompt,
+                "cached_tokens": entry["cached_tokens"],
+                "uncached_tokens": prompt - entry["cached_tokens"],
+                "hit_rate": round(entry["cached_tokens"] / prompt, 4) if prompt else 0.0,
+                "avg_latency_cached_s": (
+                    round(entry["cached_latency_s"] / entry["cached_calls"], 3)
+                    if entry["cached_calls"]
+                    else None
+                ),
+                "avg_latency_uncached_s": (
+                    round(entry["uncached_latency_s"] / entry["uncached_calls"], 3)
+                    if entry["uncached_calls"]
+                    else None
+                ),
+            }
+        return report
+
+    def _check_budget(self, node: str, projected: int) -> Optional[str]:
+        """Why dispatching `projected` more tokens would break a budget, or None."""
+        run_total = self.tokens_spent + self.tokens_reserved + projected
+        if run_total > self.budget_tokens:
+            return f"run {run_total} > {self.budget_tokens}"
+        limit = self.node_budgets.get(node)
+        if limit is not None:
+            node_total = self.tokens_per_node[node] + self.reserved_per_node[node] + projected
+            if node_total > limit:
+                return f"node '{node}' {node_total} > {limit}"
+        return None
+
+    def _reserve(self, node: str, tokens: int):
+        self.tokens_reserved += tokens
+        self.reserved_per_node[node] += tokens
+
+    def _settle(self, node: str, attempt: "_Attempt", prompt_tokens: int, out: Optional[str] = None):
+        """Release an attempt's reservation and charge its real cost."""
+        self.tokens_reserved -= attempt.reserved
+        self.reserved_per_node[node] -= attempt.reserved
+        attempt.reserved = 0
+        if attempt.usage.get("coalesced"):
+            # Shared an identical in-flight request: no upstream cost of its own.
+            self.usage_sources["coalesced"] += 1
+            attempt.charged = 0
+        elif attempt.usage:
+            self.usage_sources["provider"] += 1
+            attempt.charged = int(attempt.usage["total_tokens"])
+        else:
+            self.usage_sources["estimated"] += 1
+            attempt.charged = prompt_tokens + (count_tokens(out) if out else 0)
+        self.tokens_spent += attempt.charged
+        self.tokens_per_node[node] += attempt.charged
+
+    async def _attempt(
+        self,
+        model: str,
+        system: str,
+        user: str,
+        max_completion: int,
+        force_json: bool,
+        temperature: float,
+        on_usage: Optional[Callable[[dict], None]] = None,
+        suffix: str = "",
+    ) -> str:
+        """One committee attempt; raises if the model fails or returns unusable output."""
+        if force_json:
+            out = await achat_json(
+                model,
+                system,
+                user,
+                temperature=temperature,
+                max_tokens=max_completion,
+                on_usage=on_usage,
+                suffix=suffix,
+            )
+        else:
+            out = await achat(
+                model,
+                system,
+                user,
+                temperature=temperature,
+                max_tokens=max_completion,
+                on_usage=on_usage,
+                suffix=suffix,
+            )
+        if not out or not out.strip():
+            raise InvalidOutputError(f"Resposta vazia de {model}")
+        if force_json:
+            try:
+                safe_json_extract(out)
+            except ValueError as exc:
+                raise InvalidOutputError(f"JSON inválido de {model}: {exc}") from exc
+        return out
+
+    def _rerank(self, node: str, reason: str = "adaptive_stats"):
+        committee = self.committees.get(node)
+        if not committee:
+            return
+        ranked = self.stats.rank(node, committee)
+        if ranked == committee:
+            return
+        committee[:] = ranked
+        self.models[node] = ranked[0]
+        self._emit(
+            {
+                "event": "router_committee_reranked",
+                "node": node,
+                "reason": reason,
+                "committee": list(ranked),
+                "expected_cost_s": {
+                    model: self.stats.expected_cost(node, model) for model in ranked
+                },
+            }
+        )
+
+    def report_output(
+        self,
+        node: str,
+        valid: bool,
+        model: Optional[str] = None,
+        raw: Optional[str] = None,
+        repairs: Optional[List[str]] = None,
+    ):
+        """
+        Feed back whether the caller could parse the last answer for `node`.
+
+        Nodes that parse JSON themselves (e.g. the planner, which calls with
+        `force_json=False`) use this so JSON validity still shapes the ranking.
+        Passing the `raw` answer (for invalid or repaired outputs) logs it for
+        the JSON repair corpus. An answer replayed from the cache was already
+        scored when it was first produced, so it doesn't count again.
+        """
+        replayed = model is None and node in self.last_cached
+        model = model or self.last_model.get(node)
+        if raw and RAW_OUTPUT_LOG_CHARS > 0:
+            self._emit({
+                "event": "router_raw_output",
+                "node": node,
+                "model": model,
+                "valid": valid,
+                "repairs": list(repairs or []),
+                "chars": len(raw),
+                "raw": raw[:RAW_OUTPUT_LOG_CHARS],
+            })
+        if not model or replayed:
+            return
+        self.stats.record_json_validity(node, model, valid)
+        if self.adaptive:
+            self._rerank(node)
+
+    def _hedge_delay(self, node: str) -> Optional[float]:
+        """Seconds to wait on in-flight attempts before hedging with the next member."""
+        if not HEDGE_ENABLED:
+            return None
+        samples = self.latencies.get(node)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(samples)
+        rank = min(len(ordered) - 1, int(round(HEDGE_PERCENTILE / 100 * (len(ordered) - 1))))
+        return max(HEDGE_MIN_DELAY, ordered[rank])
+
+    @staticmethod
+    def _cache_key(
+        model: str,
+        system: str,
+        user: str,
+        temperature: float,
+        max_completion: int,
+        force_json: bool,
+    ) -> str:
+        return cache_key(
+            model=model,
+            system=system,
+            user=user,
+            temperature=temperature,
+            max_tokens=max_completion,
+            force_json=force_json,
+        )
+
+    def _cache_lookup(
+        self,
+        node: str,
+        attempts: List[Optional[str]],
+        system: str,
+        user: str,
+        temperature: float,
+        max_completion: int,
+        force_json: bool,
+    ) -> Optional[str]:
+        for model in attempts:
+            if not model:
+                continue
+            entry = self.cache.get(
+                self._cache_key(model, system, user, temperature, max_completion, force_json)
+            )
+            if entry is None:
+                continue
+            self.cache_stats["hits"] += 1
+            self.cache_stats["saved_tokens"] += int(entry.get("tokens", 0))
+            self.last_model[node] = model
+            self.last_cached.add(node)
+            self._emit(
+                {
+                    "event": "router_cache_hit",
+                    "node": node,
+                    "model": model,
+                    "saved_tokens": entry.get("tokens", 0),
+                }
+            )
+            return entry["response"]
+        self.cache_stats["misses"] += 1
+        return None
+
+    def call_many(
+        self,
+        node: str,
+        requests: Iterable[BatchRequest],
+        max_parallel: Optional[int] = None,
+        **defaults: Any,
+    ) -> List[BatchResult]:
+        return run_sync(self.acall_many(node, requests, max_parallel=max_parallel, **defaults))
+
+    async def acall_many(
+        self,
+        node: str,
+        requests: Iterable[BatchRequest],
+        max_parallel: Optional[int] = None,
+        **defaults: Any,
+    ) -> List[BatchResult]:
+        """
+        Run a batch of calls for `node` with at most `max_parallel` in flight.
+
+        Each request is `(system, user)` or a dict of `acall` arguments;
+        `defaults` (e.g. `max_completion`, `force_json`) fill in what an item
+        leaves out. Every item gets the usual committee failover and draws on
+        the shared token budget. Results come back in input order, one
+        `BatchResult` per item; an item's failure never aborts the others.
+        """
+        items: Sequence[Dict[str, Any]] = [
+            {**defaults, **_batch_item(index, req)} for index, req in enumerate(requests)
+        ]
+        limit = max(1, max_parallel or BATCH_MAX_PARALLEL)
+        gate = asyncio.Semaphore(limit)
+        started = time.perf_counter()
+
+        async def run(index: int, kwargs: Dict[str, Any]) -> BatchResult:
+            async with gate:
+                t0 = time.perf_counter()
+                try:
+                    out = await self.acall(node, **kwargs)
+                except Exception as exc:
+                    return BatchResult(index, error=exc, latency_s=time.perf_counter() - t0)
+                return BatchResult(index, result=out, latency_s=time.perf_counter() - t0)
+
+        results = await asyncio.gather(*(run(i, kwargs) for i, kwargs in enumerate(items)))
+        failed = sum(1 for r in results if not r.ok)
+        self._emit(
+            {
+                "event": "router_batch",
+                "node": node,
+                "size": len(results),
+                "max_parallel": limit,
+                "ok": len(results) - failed,
+                "failed": failed,
+                "duration_s": round(time.perf_counter() - started, 3),
+                "tokens_spent": self.tokens_spent,
+            }
+        )
+        return list(results)
+
+    def stream(
+        self,
+        node: str,
+        system: str,
+        user: str,
+        max_completion: int = 2000,
+    ) -> Iterator[str]:
+        return iter_sync(self.astream(node, system, user, max_completion=max_completion))
+
+    async def astream(
+        self,
+        node: str,
+        system: str,
+        user: str,
+        max_completion: int = 2000,
+    ) -> AsyncIterator[str]:
+        """
+        Stream text deltas from the first committee member that answers.
+
+        Failover only happens before the first delta; once text has been
+        yielded, a mid-stream error is raised to the consumer. Time-to-first-token
+        and tokens/sec are emitted as `router_stream_metrics` events.
+        """
+        attempts = self.committees.get(node) or [self.models.get(node)]
+        last_error: Optional[str] = None
+        prompt_tokens = count_tokens(system) + count_tokens(user)
+
+        for idx, model_to_use in enumerate(attempts):
+            if not model_to_use:
+                continue
+
+            blocked = self._check_budget(node, prompt_tokens + max_completion)
+            if blocked:
+                self._emit({"event": "router_budget_blocked", "node": node, "reason": blocked})
+                raise BudgetExceededError(f"Budget de tokens excedido: {blocked}")
+            if not self._circuit_allows(node, model_to_use):
+                last_error = "circuito aberto"
+                continue
+            stats: Dict[str, Any] = {}
+            started = False
+            try:
+                async with aclosing(
+                    achat_stream(
+                        model_to_use, system, user, max_tokens=max_completion, on_metrics=stats.update
+                    )
+                ) as deltas:
+                    async for delta in deltas:
+                        started = True
+                        yield delta
             except Exception as exc:
-                self.tokens_spent += est
-                self.tokens_per_node[node] += est
-                err_msg = str(exc)
-                last_error = err_msg
+                self._charge_stream(node, prompt_tokens, stats)
+                self._circuit_record(model_to_use, exc)
+                last_error = str(exc)
                 self.err_count[node][model_to_use] += 1
                 self._emit(
                     {
@@ -264,25 +1027,89 @@ class Router:
                         "model": model_to_use,
                         "success": False,
                         "attempt": idx + 1,
-                        "force_json": force_json,
-                        "error": err_msg[:4000],
+                        "stream": True,
+                        "error": last_error[:4000],
                         "tokens_spent": self.tokens_spent,
                     }
                 )
+                if started:
+                    raise
                 continue
+            except BaseException:
+                # Consumer closed the stream early: no verdict on the model.
+                if self.breaker is not None:
+                    self.breaker.release(model_to_use)
+                raise
+            finally:
+                if stats:
+                    self._emit({"event": "router_stream_metrics", "node": node, **stats})
+
+            self._charge_stream(node, prompt_tokens, stats)
+            self._circuit_record(model_to_use)
+            self.success_count[node] += 1
+            self.model_success[node][model_to_use] += 1
+            self._emit(
+                {
+                    "event": "router_model_attempt",
+                    "node": node,
+                    "model": model_to_use,
+                    "success": True,
+                    "attempt": idx + 1,
+                    "stream": True,
+                    "tokens_spent": self.tokens_spent,
+                }
+            )
+            self.promote_model(node, model_to_use)
+            return
 
         raise RuntimeError(f"Nenhum modelo disponível para '{node}'. Último erro: {last_error}")
 
+    def _charge_stream(self, node: str, prompt_tokens: int, stats: Dict[str, Any]):
+        """Charge a streamed attempt from its metrics (provider usage when reported)."""
+        if stats.get("usage_reported"):
+            self.usage_sources["provider"] += 1
+            prompt = stats.get("prompt_tokens") or prompt_tokens
+        else:
+            self.usage_sources["estimated"] += 1
+            prompt = prompt_tokens
+        charged = prompt + int(stats.get("completion_tokens") or 0)
+        self.tokens_spent += charged
+        self.tokens_per_node[node] += charged
+        if stats.get("usage_reported") and stats.get("completed"):
+            self._record_prompt_cache(
+                node,
+                {"prompt_tokens": prompt, "cached_tokens": stats.get("cached_tokens")},
+                stats.get("duration_s"),
+            )
+
+    def close(self):
+        """Flush state that is written lazily (the adaptive model statistics)."""
+        self.stats.flush()
+
     def committee_snapshot(self) -> Dict[str, List[str]]:
         return {k: list(v) for k, v in self.committees.items()}
 
     def metrics(self) -> Dict[str, Any]:
         return {
             "tokens_spent": self.tokens_spent,
+            "tokens_reserved": self.tokens_reserved,
+            "budget": {"run": self.budget_tokens, "nodes": dict(self.node_budgets)},
+            "usage_sources": dict(self.usage_sources),
             "tokens_per_node": {
                 node: self.tokens_per_node.get(node, 0) for node in self.models
             },
             "success_count": {node: self.success_count.get(node, 0) for node in self.models},
             "error_count": {node: dict(errors) for node, errors in self.err_count.items()},
             "model_success": {node: dict(successes) for node, successes in self.model_success.items()},
+            "cache": {"mode": self.cache_mode, **self.cache_stats},
+            "model_stats": self.stats.snapshot(),
+            "hedging": {
+                **self.hedge_stats,
+                "delay_s": {node: self._hedge_delay(node) for node in self.latencies},
+            },
+            "prompt_cache": self._prompt_cache_metrics(),
+            "circuits": {
+                **self.circuit_stats,
+                "models": self.breaker.snapshot() if self.breaker is not None else {},
+            },
         }
@@ -19,8 +19,13 @@ __author__ = "FlashSoft Team (via SACI Consensus)"
 
 from .convergence_metrics import (
     compute_semantic_similarity,
+    compute_similarity_report,
     extract_structured_votes,
-    calculate_convergence_score
+    calculate_convergence_score,
+    EmbeddingBackend,
+    LocalEmbeddingBackend,
+    get_embedding_backend,
+    register_embedding_backend
 )
 
 from .round_manager import (
@@ -56,73 +61,90 @@ def run_saci_debate(
         max_rounds: Máximo de rodadas permitidas
         weights: (peso_semantic, peso_votes) padrão (0.6, 0.4)
     
+    `llm_client.cancel_scope(debate_id)` aborta a chamada em andamento e
+    encerra o debate sem pontuar a rodada interrompida.
+    
     Returns:
         dict com resultado final, tracer, scores, etc.
     """
-    from llm_client import chat
-    import time
+    from llm_client import ChatCancelled, chat, close_scope, open_scope
     
     tracer = TraceLogger()
     all_responses = []
     score_trajectory = []
     converged = False
+    score, votes, round_num = 0.0, {}, 0
+    scope = open_scope(debate_id)
     
-    for round_num in range(1, max_rounds + 1):
-        print(f"\n--- RODADA {round_num} ---")
-        responses = []
+    try:
+        for round_num in range(1, max_rounds + 1):
+            if scope.cancelled:
+                break
+            print(f"\n--- RODADA {round_num} ---")
+            responses = []
         
-        # Coletar respostas dos agentes
-        for agent in agents:
-            try:
-                response = chat(
-                    model=agent["model"],
-                    system=f"You are {agent['name']}. Participate in a technical debate. Vote clearly (VOTE: option) and justify.",
-                    user=f"# ROUND {round_num}\n\n{question}",
-                    temperature=0.3,
-                    max_tokens=agent.get("max_tokens", 4096)
-                )
-                responses.append(response)
-                print(f"  ✓ {agent['name'][:20]}: {response[:80]}...")
-            except Exception as e:
-                print(f"  ✗ {agent['name']}: ERROR - {str(e)[:50]}")
-                responses.append(f"[ERROR: {str(e)}]")
-            
-            time.sleep(2)  # Rate limiting
+            # Coletar respostas dos agentes
+            for agent in agents:
+                try:
+                    response = chat(
+                        model=agent["model"],
+                        system=f"You are {agent['name']}. Participate in a technical debate. Vote clearly (VOTE: option) and justify.",
+                        user=f"# ROUND {round_num}\n\n{question}",
+                        temperature=0.3,
+                        max_tokens=agent.get("max_tokens", 4096),
+                        cancel=scope
+                    )
+                    responses.append(response)
+                    print(f"  ✓ {agent['name'][:20]}: {response[:80]}...")
+                except ChatCancelled:
+                    break
+                except Exception as e:
+                    print(f"  ✗ {agent['name']}: ERROR - {str(e)[:50]}")
+                    responses.append(f"[ERROR: {str(e)}]")
         
-        all_responses.extend(responses)
+            if scope.cancelled:
+                print(f"  🛑 Debate cancelado na rodada {round_num}")
+                break
         
-        # Calcular métricas (função calcula tudo internamente)
-        score, metadata = calculate_convergence_score(responses, weights[0], weights[1])
-        similarity = metadata.get('similarity', 0.0)
-        votes = metadata.get('votes', {})
+            all_responses.extend(responses)
         
-        score_trajectory.append(score)
+            # Calcular métricas (função calcula tudo internamente)
+            score, metadata = calculate_convergence_score(responses, weights[0], weights[1])
+            similarity = metadata.get('similarity', 0.0)
+            votes = metadata.get('votes', {})
         
-        # Log da rodada
-        agent_names = [agent['name'] for agent in agents]
-        tracer.log_round(
-            round_num=round_num,
-            agents=agent_names,
-            responses=responses,
-            convergence_score=score,
-            metadata=metadata
-        )
+            score_trajectory.append(score)
         
-        # Determinar voto majoritário
-        if votes:
-            majority = max(votes.items(), key=lambda x: x[1])
-            print(f"  Rodada {round_num}: Score {score:.3f} | Semantic {similarity:.3f} | Votes {votes.get(majority[0], 0)}/{sum(votes.values())}")
-        else:
-            print(f"  Rodada {round_num}: Score {score:.3f} | Semantic {similarity:.3f} | Votes N/A")
+            # Log da rodada
+            agent_names = [agent['name'] for agent in agents]
+            tracer.log_round(
+                round_num=round_num,
+                agents=agent_names,
+                responses=responses,
+                convergence_score=score,
+                metadata=metadata
+            )
         
-        # Early stopping
-        if should_stop_early(score, round_num, threshold, min_rounds):
-            converged = True
-            print(f"  ✓ Convergência atingida! (score {score:.3f} >= {threshold})")
-            break
+            # Determinar voto majoritário
+            if votes:
+                majority = max(votes.items(), key=lambda x: x[1])
+                print(f"  Rodada {round_num}: Score {score:.3f} | Semantic {similarity:.3f} | Votes {votes.get(majority[0], 0)}/{sum(votes.values())}")
+            else:
+                print(f"  Rodada {round_num}: Score {score:.3f} | Semantic {similarity:.3f} | Votes N/A")
+        
+            # Early stopping
+            if should_stop_early(score, round_num, threshold, min_rounds):
+                converged = True
+                print(f"  ✓ Convergência atingida! (score {score:.3f} >= {threshold})")
+                break
+    finally:
+        close_scope(scope)
+    cancelled_calls = scope.stats()
+    if cancelled_calls["calls"]:
+        print(f"  🛑 {cancelled_calls['calls']} chamada(s) canceladas (~{cancelled_calls['prompt_tokens']} tokens de prompt)")
     
     # Resultado final
-    if not converged:
+    if not converged and not scope.cancelled:
         if round_num >= max_rounds:
             print(f"  ⚠ Máximo de rodadas atingido sem convergência total (score {score:.3f} < {threshold})")
         else:
@@ -137,23 +159,32 @@ def run_saci_debate(
     
     return {
         "debate_id": debate_id,
-        "total_rounds": round_num,
+        "total_rounds": len(score_trajectory),
         "final_score": score,
         "converged": converged,
         "consensual_decision": consensual_decision,
         "score_trajectory": score_trajectory,
         "final_votes": votes,
         "tracer": tracer,
-        "all_responses": all_responses
+        "all_responses": all_responses,
+        "cancelled": scope.cancelled,
+        "cancelled_calls": {"calls": cancelled_calls["calls"], "prompt_tokens": cancelled_calls["prompt_tokens"]}
     }
 
 
 __all__ = [
     # Métricas
     'compute_semantic_similarity',
+    'compute_similarity_report',
     'extract_structured_votes',
     'calculate_convergence_score',
     
+    # Backends de embedding
+    'EmbeddingBackend',
+    'LocalEmbeddingBackend',
+    'get_embedding_backend',
+    'register_embedding_backend',
+    
     # Orquestração
     'DynamicDebate',
     'should_stop_early',
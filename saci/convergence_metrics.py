@@ -6,7 +6,7 @@ SACI EVOLUÍDO - Convergence Metrics (Fase 1)
 Funções puras para calcular métricas de convergência objetivas.
 
 Features:
-- Similaridade semântica via embeddings OpenAI
+- Similaridade semântica via embeddings OpenAI (ou backend local, offline)
 - Extração de votos estruturados (parsing JSON/regex)
 - Score de convergência híbrido (0.6 * similaridade + 0.4 * votos)
 
@@ -22,25 +22,27 @@ import os
 import json
 import re
 import logging
-from typing import List, Dict, Optional, Tuple
+from abc import ABC, abstractmethod
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
 from openai import OpenAI
 
+from embedding_client import cache_stats, get_embeddings
+from saci.similarity import SimilarityReport, similarity_matrix, similarity_report
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 # ============================================================================
-# CACHE SIMPLES (LRU-like) PARA EMBEDDINGS
+# EMBEDDINGS (cache compartilhado em embedding_client: hash do conteúdo + modelo)
 # ============================================================================
 
-_embedding_cache: Dict[str, List[float]] = {}
-MAX_CACHE_SIZE = 100
-
-
 def _get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
     """
-    Obtém embedding do texto via OpenAI (com cache simples).
+    Obtém embedding do texto via OpenAI (com cache persistente).
     
     Args:
         text: Texto para gerar embedding
@@ -52,48 +54,158 @@ def _get_embedding(text: str, model: str = "text-embedding-3-small") -> List[flo
     Raises:
         Exception: Se API falhar (não faz fallback silencioso)
     """
-    # Cache hit
-    cache_key = f"{model}:{text[:100]}"  # Usa primeiros 100 chars como key
-    if cache_key in _embedding_cache:
-        logger.debug(f"Cache HIT para embedding: {text[:50]}...")
-        return _embedding_cache[cache_key]
-    
-    # Cache miss - chamar API
-    logger.info(f"Gerando embedding via API: {text[:50]}...")
+    return _get_embeddings([text], model)[0]
+
+
+def _get_embeddings(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+    """
+    Embeddings de vários textos, na ordem de entrada.
+
+    Vão todos em uma única requisição (`embedding_client.get_embeddings`);
+    textos já vistos saem do cache de embeddings sem chamar a API.
+
+    Raises:
+        Exception: Se API falhar (não faz fallback silencioso)
+    """
+    logger.info(f"Gerando {len(texts)} embedding(s) em lote...")
     
     try:
         client = OpenAI(
             api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1",
+            base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
             timeout=30.0,  # Aumentado de 10s para 30s (consenso)
             max_retries=2   # Retry logic (consenso)
         )
         
-        response = client.embeddings.create(
-            model=model,
-            input=text[:8000]  # Limita tamanho
+        # Textos longos são divididos em trechos e combinados (sem truncar)
+        vectors = get_embeddings(texts, model=model, client=client)
+        logger.info(
+            f"✅ {len(vectors)} embedding(s) prontos: {len(vectors[0]) if vectors else 0} dimensões "
+            f"(cache: {cache_stats().get('hit_rate', 0.0):.0%} de acertos)"
         )
-        
-        embedding = response.data[0].embedding
-        logger.info(f"✅ Embedding gerado com sucesso: {len(embedding)} dimensões")
-        
-        # Adicionar ao cache (FIFO se cheio)
-        if len(_embedding_cache) >= MAX_CACHE_SIZE:
-            # Remove primeiro item (mais antigo)
-            first_key = next(iter(_embedding_cache))
-            del _embedding_cache[first_key]
-        
-        _embedding_cache[cache_key] = embedding
-        return embedding
+        return vectors
         
     except Exception as e:
         # NÃO fazer fallback silencioso (consenso 4/4 modelos)
         logger.critical(f"❌ EMBEDDINGS API FAILURE: {type(e).__name__}: {e}")
-        logger.critical(f"   Texto: {text[:100]}...")
+        logger.critical(f"   Texto: {texts[0][:100] if texts else ''}...")
         logger.critical(f"   API Key configurada: {bool(os.getenv('OPENROUTER_API_KEY'))}")
         raise  # Propaga exceção ao invés de retornar 0.0
 
 
+# ============================================================================
+# BACKENDS DE EMBEDDING (plugáveis, escolhidos por SACI_EMBEDDING_BACKEND)
+# ============================================================================
+
+# "openrouter" (padrão de convergence_metrics), "openai" (embedding_client,
+# padrão do saci_v2) ou "local" (CPU, offline). Vazio = padrão de cada caminho.
+EMBEDDING_BACKEND = os.getenv("SACI_EMBEDDING_BACKEND", "").strip().lower()
+# Dimensões do backend local: buckets do hashing e componentes do LSA.
+LOCAL_EMBEDDING_FEATURES = int(os.getenv("LOCAL_EMBEDDING_FEATURES", str(2 ** 15)))
+LOCAL_EMBEDDING_DIMS = int(os.getenv("LOCAL_EMBEDDING_DIMS", "128"))
+
+_SENTENCE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+class EmbeddingBackend(ABC):
+    """Gera um vetor por texto, na ordem de entrada; vetores de uma mesma chamada são comparáveis."""
+
+    name = "base"
+    # False quando o espaço vetorial depende dos textos da chamada (ex.: backend local)
+    comparable_across_calls = True
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        """Um vetor por texto de `texts`, na mesma ordem."""
+
+
+class OpenRouterEmbeddingBackend(EmbeddingBackend):
+    """Embeddings da API via OpenRouter (`_get_embeddings`, com cache persistente)."""
+
+    name = "openrouter"
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+
+    def embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        return _get_embeddings(texts, self.model)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings da API da OpenAI (`embedding_client.get_embeddings`, com cache persistente)."""
+
+    name = "openai"
+
+    def embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        return get_embeddings(texts)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeddings locais, só CPU e sem rede: hashing de unigramas e bigramas,
+    TF-IDF e LSA (SVD truncado) ajustados sobre as frases dos textos da chamada.
+
+    Como o IDF e o LSA vêm dos próprios textos, os vetores só são comparáveis
+    dentro de uma mesma chamada, que é como a convergência de uma rodada é
+    calculada. Custa milissegundos e serve para CI e uso offline.
+    """
+
+    name = "local"
+    comparable_across_calls = False
+
+    def __init__(self, n_features: int = LOCAL_EMBEDDING_FEATURES, dims: int = LOCAL_EMBEDDING_DIMS):
+        self.n_features = n_features
+        self.dims = dims
+
+    def embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        # scikit-learn só é importado quando o backend local é usado
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectorizer = HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=(1, 2),
+            strip_accents="unicode",
+            alternate_sign=False,
+            norm=None,
+        )
+        sentences = [part for text in texts for part in _SENTENCE.split(text) if part.strip()]
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(vectorizer.transform(sentences or texts))
+        documents = tfidf.transform(vectorizer.transform(texts))
+        components = min(self.dims, len(sentences) - 1)
+        if components < 2:
+            return documents.toarray().astype(np.float32)
+        svd = TruncatedSVD(n_components=components, random_state=0)
+        svd.fit(tfidf.transform(vectorizer.transform(sentences)))
+        return svd.transform(documents).astype(np.float32)
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[[], EmbeddingBackend]] = {
+    OpenRouterEmbeddingBackend.name: OpenRouterEmbeddingBackend,
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    LocalEmbeddingBackend.name: LocalEmbeddingBackend,
+}
+
+
+def register_embedding_backend(name: str, factory: Callable[[], EmbeddingBackend]) -> None:
+    """Registra um backend para uso via `SACI_EMBEDDING_BACKEND=<name>`."""
+    EMBEDDING_BACKENDS[name.strip().lower()] = factory
+
+
+def get_embedding_backend(name: Optional[str] = None, default: str = "openrouter") -> EmbeddingBackend:
+    """Backend `name`, ou o de `SACI_EMBEDDING_BACKEND`, ou `default`."""
+    key = (name or EMBEDDING_BACKEND or default).strip().lower()
+    try:
+        factory = EMBEDDING_BACKENDS[key]
+    except KeyError:
+        raise ValueError(
+            f"Backend de embedding desconhecido: {key!r} (opções: {', '.join(sorted(EMBEDDING_BACKENDS))})"
+        ) from None
+    return factory()
+
+
 def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
     Calcula similaridade de cosseno entre dois vetores.
@@ -104,26 +216,32 @@ def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     Returns:
         Float entre -1 (opostos) e 1 (idênticos), normalmente 0-1
     """
-    import math
-    
-    # Produto escalar
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    
-    # Magnitudes
-    mag1 = math.sqrt(sum(a * a for a in vec1))
-    mag2 = math.sqrt(sum(b * b for b in vec2))
-    
-    # Evitar divisão por zero
-    if mag1 == 0 or mag2 == 0:
-        return 0.0
-    
-    return dot_product / (mag1 * mag2)
+    # Vetor nulo -> linha nula na matriz -> similaridade 0.0
+    return float(similarity_matrix([vec1, vec2])[0, 1])
 
 
 # ============================================================================
 # MÉTRICAS PÚBLICAS
 # ============================================================================
 
+def compute_similarity_report(
+    texts: List[str],
+    labels: Optional[List[str]] = None,
+    backend: Optional[EmbeddingBackend] = None,
+) -> SimilarityReport:
+    """
+    Matriz de similaridade dos textos (um produto matricial sobre os embeddings),
+    com média, centralidade por agente e outliers; ver `saci.similarity`.
+
+    Os embeddings vêm de `backend` (padrão: `get_embedding_backend()`).
+
+    Raises:
+        Exception: Se embeddings falharem (não faz fallback silencioso)
+    """
+    backend = backend or get_embedding_backend()
+    return similarity_report(backend.embed(texts), labels)
+
+
 def compute_semantic_similarity(texts: List[str]) -> float:
     """
     Calcula similaridade semântica média entre todos os pares de textos.
@@ -155,22 +273,15 @@ def compute_semantic_similarity(texts: List[str]) -> float:
     logger.info(f"Calculando similaridade semântica para {len(texts)} textos...")
     
     try:
-        # Gerar embeddings para todos os textos
-        embeddings = [_get_embedding(text) for text in texts]
-        logger.info(f"✅ {len(embeddings)} embeddings gerados com sucesso")
-        
-        # Calcular similaridade para todos os pares
-        similarities = []
-        for i in range(len(embeddings)):
-            for j in range(i + 1, len(embeddings)):
-                sim = _cosine_similarity(embeddings[i], embeddings[j])
-                similarities.append(sim)
+        # Embeddings (uma requisição só) e matriz de similaridade (um matmul)
+        report = compute_similarity_report(texts)
+        logger.info(f"✅ {len(report.labels)} embeddings gerados com sucesso")
         
         # Retornar média
-        if not similarities:
+        if not report.pair_count:
             return 0.5  # Fallback neutro
         
-        avg_similarity = sum(similarities) / len(similarities)
+        avg_similarity = report.mean
         logger.info(f"📊 Similaridade média: {avg_similarity:.3f}")
         
         # Normalizar para 0-1 (cosseno pode ser negativo, embora raro)
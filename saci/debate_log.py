@@ -0,0 +1,145 @@
+"""
+Persistência incremental de um debate SACI: log de eventos + snapshot.
+
+Cada debate grava dois arquivos em `output_dir`:
+
+- `<id>.events.jsonl`: log append-only, uma linha JSON por evento (`rodada`,
+  `atrasado`, `final`), com número de sequência. Cada rodada é escrita uma vez
+  só, então o custo de gravação cresce linearmente com o debate.
+- `<id>.json`: snapshot do estado completo, reescrito a cada
+  `SACI_SNAPSHOT_EVERY` eventos e no fim do debate. A escrita vai para um
+  arquivo temporário e é renomeada por cima do anterior, então quem lê nunca
+  vê um JSON pela metade. O snapshot guarda até que evento (e byte do log) ele
+  cobre, em `log_eventos`.
+
+`load_debate` lê o snapshot e aplica só a cauda do log (os eventos depois do
+offset registrado), ignorando uma última linha incompleta. Debates antigos,
+sem log de eventos, são lidos só pelo snapshot.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Eventos entre dois snapshots (o snapshot final é sempre gravado)
+SNAPSHOT_EVERY = int(os.getenv("SACI_SNAPSHOT_EVERY", "4"))
+
+
+def snapshot_path(output_dir: str | Path, debate_id: str) -> Path:
+    return Path(output_dir) / f"{debate_id}.json"
+
+
+def events_path(output_dir: str | Path, debate_id: str) -> Path:
+    return Path(output_dir) / f"{debate_id}.events.jsonl"
+
+
+def write_json_atomic(path: str | Path, data: Dict[str, Any]) -> None:
+    """Grava `data` num temporário e renomeia por cima de `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    for attempt in range(5):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            # Windows: o snapshot pode estar aberto por um leitor nesse instante
+            if attempt == 4:
+                tmp.unlink(missing_ok=True)
+                raise
+            time.sleep(0.05)
+
+
+def apply_event(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    """Aplica um evento do log ao estado do debate (in place)."""
+    tipo = event.get("tipo")
+    if tipo == "rodada":
+        rodada = event["rodada"]
+        state.setdefault("rodadas", []).append(rodada)
+        state["rodada_atual"] = rodada["numero"]
+    elif tipo == "atrasado":
+        rodadas = state.get("rodadas") or []
+        if 0 < event["rodada"] <= len(rodadas):
+            rodada = rodadas[event["rodada"] - 1]
+            rodada["respostas"][event["agente"]] = event["resposta"]
+            rodada.setdefault("latencias", {})[event["agente"]] = event["resposta"].get("latencia_s")
+    elif tipo == "final":
+        state.update(event["estado"])
+
+
+def load_debate(output_dir: str | Path, debate_id: str) -> Optional[Dict[str, Any]]:
+    """Estado atual do debate: snapshot mais a cauda do log de eventos (None se não existe)."""
+    try:
+        with open(snapshot_path(output_dir, debate_id), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    covered = state.pop("log_eventos", None) or {"seq": 0, "offset": 0}
+    try:
+        with open(events_path(output_dir, debate_id), "rb") as f:
+            f.seek(covered["offset"])
+            tail = f.read()
+    except OSError:
+        return state
+    complete = tail[: tail.rfind(b"\n") + 1]  # linha final pode estar sendo escrita
+    for line in complete.splitlines():
+        event = json.loads(line)
+        if event["seq"] > covered["seq"]:
+            apply_event(state, event)
+    return state
+
+
+class DebateLog:
+    """
+    Escritor do log de eventos e dos snapshots de um debate.
+
+    `state` é o estado inicial (sem rodadas); o log anterior com o mesmo id é
+    descartado e um snapshot inicial é gravado. Um único processo escreve por
+    debate; leitores usam `load_debate`.
+    """
+
+    def __init__(
+        self,
+        output_dir: str | Path,
+        debate_id: str,
+        state: Dict[str, Any],
+        snapshot_every: Optional[int] = None,
+    ):
+        self.snapshot_file = snapshot_path(output_dir, debate_id)
+        self.events_file = events_path(output_dir, debate_id)
+        self.snapshot_every = max(1, snapshot_every or SNAPSHOT_EVERY)
+        self.state: Dict[str, Any] = {"rodadas": [], "rodada_atual": 0, **json.loads(json.dumps(state))}
+        self.seq = 0
+        self.offset = 0
+        self._since_snapshot = 0
+        self.events_file.parent.mkdir(parents=True, exist_ok=True)
+        self.events_file.write_bytes(b"")
+        self.snapshot()
+
+    def append(self, tipo: str, **fields: Any) -> Dict[str, Any]:
+        """Acrescenta um evento ao log (e grava um snapshot a cada `snapshot_every`)."""
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "tipo": tipo, **fields}, ensure_ascii=False) + "\n"
+        data = line.encode("utf-8")
+        with open(self.events_file, "ab") as f:
+            f.write(data)
+        self.offset += len(data)
+        # Cópia via JSON: o estado não compartilha objetos com quem chamou
+        event = json.loads(line)
+        apply_event(self.state, event)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return event
+
+    def snapshot(self) -> None:
+        """Grava atomicamente o estado completo, marcando até onde o log está coberto."""
+        write_json_atomic(self.snapshot_file, {**self.state, "log_eventos": {"seq": self.seq, "offset": self.offset}})
+        self._since_snapshot = 0
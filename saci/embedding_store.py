@@ -0,0 +1,96 @@
+"""
+Embeddings das respostas de um debate SACI, rodada a rodada.
+
+O `DebateEmbeddingStore` guarda o vetor de cada resposta já vista no debate e
+só manda para o backend as respostas novas (uma chamada por rodada). Com os
+vetores da rodada anterior em mãos, mede o drift de cada agente sem chamadas
+extras:
+
+- `rodada_anterior`: distância de cosseno (1 - cos) para a própria resposta
+  na rodada anterior (None na primeira participação)
+- `centroide`: distância de cosseno para o centroide do grupo na rodada
+
+Backends cujos vetores só são comparáveis dentro de uma chamada (o local)
+recebem a rodada anterior junto com a atual; como rodam na CPU, isso não
+custa chamadas de API.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from saci.convergence_metrics import EmbeddingBackend
+from saci.similarity import normalized_matrix
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DebateEmbeddingStore:
+    """Vetores (normalizados) das respostas de um debate, por rodada e agente."""
+
+    def __init__(self, backend: EmbeddingBackend):
+        self.backend = backend
+        self.rounds: List[Dict[str, np.ndarray]] = []
+        self._texts: List[Dict[str, str]] = []
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._previous: Dict[str, np.ndarray] = {}
+        self.embedded = 0
+        self.reused = 0
+        self.last_embedded = 0
+        self.last_reused = 0
+
+    def add_round(self, responses: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """Vetor de cada agente na nova rodada; embeda só as respostas ainda não vistas."""
+        previous_texts = self._texts[-1] if self._texts else {}
+        if self.backend.comparable_across_calls:
+            missing = [text for text in dict.fromkeys(responses.values()) if _text_key(text) not in self._vectors]
+            vectors = self._embed(missing)
+            self._vectors.update((_text_key(text), vector) for text, vector in vectors.items())
+            current = {agent: self._vectors[_text_key(text)] for agent, text in responses.items()}
+            previous = self.rounds[-1] if self.rounds else {}
+            self.last_embedded, self.last_reused = len(missing), len(responses) - len(missing)
+        else:
+            texts = list(dict.fromkeys([*responses.values(), *previous_texts.values()]))
+            vectors = self._embed(texts)
+            current = {agent: vectors[text] for agent, text in responses.items()}
+            previous = {agent: vectors[text] for agent, text in previous_texts.items()}
+            self.last_embedded, self.last_reused = len(texts), 0
+        self.embedded += self.last_embedded
+        self.reused += self.last_reused
+        self.rounds.append(current)
+        self._texts.append(dict(responses))
+        self._previous = previous
+        return current
+
+    def drift(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Drift de cada agente da última rodada: vs. a rodada anterior e vs. o centroide do grupo."""
+        if not self.rounds:
+            return {}
+        current = self.rounds[-1]
+        agents = list(current)
+        matrix = np.stack([current[agent] for agent in agents])
+        valid = np.any(matrix != 0, axis=1)
+        to_centroid = np.full(len(agents), np.nan)
+        if valid.any():
+            centroid = matrix[valid].mean(axis=0)
+            length = np.linalg.norm(centroid)
+            if length > 0:
+                to_centroid = 1.0 - matrix @ (centroid / length)
+        result = {}
+        for i, agent in enumerate(agents):
+            before = self._previous.get(agent)
+            vs_previous = None
+            if before is not None and valid[i] and before.any():
+                vs_previous = round(float(1.0 - before @ current[agent]), 4)
+            vs_centroid = round(float(to_centroid[i]), 4) if valid[i] and not np.isnan(to_centroid[i]) else None
+            result[agent] = {"rodada_anterior": vs_previous, "centroide": vs_centroid}
+        return result
+
+    def _embed(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        if not texts:
+            return {}
+        return dict(zip(texts, normalized_matrix(self.backend.embed(texts))))
@@ -38,20 +38,18 @@ Data: 24/10/2025
 """
 
 import os
-import json
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 # Clientes de LLM
-from llm_client import chat
-from embedding_client import get_embedding
-
-# Utilitários
-from numpy import dot
-from numpy.linalg import norm
-import numpy as np
+from llm_client import CancelScope, ChatCancelled, chat, close_scope, open_scope
+from embedding_client import cache_stats
+from saci.convergence_metrics import get_embedding_backend
+from saci.debate_log import DebateLog
+from saci.embedding_store import DebateEmbeddingStore
+from saci.similarity import SimilarityReport, similarity_report
 
 # ============================================================================
 # CONFIGURAÇÃO DE MODELOS
@@ -97,10 +95,14 @@ SACI_MODELS_FREE = {
     }
 }
 
-DELAY_BETWEEN_CALLS = 2  # segundos
 SEMANTIC_CONVERGENCE_THRESHOLD = 0.92  # Threshold de similaridade de cosseno (92%)
 MIN_ROUNDS_FOR_CONSENSUS = 2  # Rodadas mínimas antes de aceitar consenso
 
+# Modo quórum: a rodada segue assim que K agentes responderem (0 = espera todos)
+SACI_QUORUM = int(os.getenv("SACI_QUORUM", "0"))
+# Prazo por rodada em segundos (0 = sem prazo); quem não respondeu fica como atrasado
+SACI_ROUND_DEADLINE = float(os.getenv("SACI_ROUND_DEADLINE", "0"))
+
 # ============================================================================
 # FUNÇÕES DE CORE
 # ============================================================================
@@ -113,7 +115,9 @@ def debate_saci_v2(
     output_dir: str = "logs",
     verbose: bool = True,
     debug_mode: bool = False,
-    timestamp: Optional[datetime] = None
+    timestamp: Optional[datetime] = None,
+    quorum: Optional[int] = None,
+    round_deadline: Optional[float] = None
 ) -> Dict:
     """
     Executa um debate SACI v2.1 completo com análise semântica.
@@ -125,12 +129,22 @@ def debate_saci_v2(
         output_dir: Diretório para salvar logs.
         verbose: Imprimir progresso no console.
         debug_mode: Se True, usa modelos gratuitos para depuração.
+        quorum: Agentes com resposta para encerrar a rodada (padrão `SACI_QUORUM`;
+            0/None = todos). Os atrasados seguem rodando e a resposta deles é
+            incorporada à rodada de origem quando chega.
+        round_deadline: Prazo de cada rodada em segundos (padrão `SACI_ROUND_DEADLINE`).
+
+    Ao fim do debate (consenso ou `max_rodadas`) as chamadas ainda em andamento
+    são canceladas. `llm_client.cancel_scope(debate_id)` cancela o debate de
+    fora: as chamadas em voo são abortadas e o debate para após a rodada atual.
         
     Returns:
         Dict com o resultado completo do debate.
     """
     
     saci_models = SACI_MODELS_FREE if debug_mode else SACI_MODELS_PROD
+    quorum = SACI_QUORUM if quorum is None else quorum
+    round_deadline = SACI_ROUND_DEADLINE if round_deadline is None else round_deadline
     
     if verbose:
         print("\n" + "="*80)
@@ -143,113 +157,174 @@ def debate_saci_v2(
     os.makedirs(output_dir, exist_ok=True)
     
     historico = []
+    # Vetores das respostas do debate: cada resposta é embedada uma vez só
+    embedding_store = DebateEmbeddingStore(get_embedding_backend(default="openai"))
     consenso_atingido: Optional[bool] = None  # None enquanto em andamento, True/False ao final
     solucao_final = None
 
-    # Nome do arquivo (garante extensão .json)
+    # Snapshot (garante extensão .json) + log de eventos append-only, lidos pela UI via servidor
     log_filename = os.path.join(output_dir, f"{debate_id}.json")
-
-    def _persist_state(final: bool = False):
-        """Salva estado parcial ou final para consumo incremental pela UI."""
-        state = {
-            'consenso': consenso_atingido if final else None,
-            'solucao_final': solucao_final if final else None,
-            'rodadas': historico,
-            'rodada_atual': historico[-1]['numero'] if historico else 0,
+    ts_obj = timestamp if timestamp else datetime.now()
+    try:
+        debate_log = DebateLog(output_dir, debate_id, {
+            'consenso': None,
+            'solucao_final': None,
             'max_rodadas': max_rodadas,
-            'timestamp': (timestamp if timestamp else datetime.now()).timestamp(),
+            'timestamp': ts_obj.timestamp(),
             'versao': '2.1',
             'debug_mode': debug_mode,
             'problema': problema,
             'contexto': contexto
-        }
+        })
+    except Exception as e:
+        debate_log = None
+        if verbose:
+            print(f"⚠️ Falha ao iniciar o log do debate ({debate_id}): {e}")
+
+    def _log_event(tipo: str, **fields):
+        """Registra um evento para consumo incremental pela UI (falhas de disco não param o debate)."""
+        if debate_log is None:
+            return
         try:
-            with open(log_filename, 'w', encoding='utf-8') as f:
-                json.dump(state, f, ensure_ascii=False, indent=2)
+            debate_log.append(tipo, **fields)
         except Exception as e:
             if verbose:
                 print(f"⚠️ Falha ao salvar estado do debate ({debate_id}): {e}")
 
-    # NÃO salva estado inicial aqui pois o servidor já criou ao receber a requisição
+    def _fold_and_log():
+        for rodada, agente, resposta in _fold_late_responses(pool, historico, verbose):
+            _log_event('atrasado', rodada=rodada, agente=agente, resposta=resposta)
+
+    # Chamadas aos agentes sobrevivem à rodada: atrasados são incorporados depois.
+    # O escopo, registrado com o id do debate, permite abortá-las de uma vez.
+    scope = open_scope(debate_id)
+    pool = AgentPool(len(saci_models), cancel=scope)
     
-    for rodada_num in range(1, max_rodadas + 1):
-        if verbose:
-            print(f"\n{'='*80}")
-            print(f"🔄 RODADA {rodada_num}/{max_rodadas}")
-            print(f"{'='*80}\n")
-        
-        # 1. Coletar respostas
-        prompt = _build_prompt(problema, contexto, historico)
+    try:
+        for rodada_num in range(1, max_rodadas + 1):
+            if scope.cancelled:
+                break
+            if verbose:
+                print(f"\n{'='*80}")
+                print(f"🔄 RODADA {rodada_num}/{max_rodadas}")
+                print(f"{'='*80}\n")
         
-        start_time = time.time()
-        respostas = _collect_responses(prompt, verbose, saci_models)
-        end_time = time.time()
+            # 1. Coletar respostas (atrasados da rodada anterior entram no prompt)
+            _fold_and_log()
+            prompt = _build_prompt(problema, contexto, historico)
         
-        if verbose:
-            print(f"\n⏱️  Tempo da rodada de consultas: {end_time - start_time:.2f} segundos (paralelizado)")
+            start_time = time.time()
+            respostas = _collect_responses(
+                prompt, verbose, saci_models,
+                quorum=quorum or None, deadline=round_deadline or None, pool=pool, round_num=rodada_num,
+            )
+            end_time = time.time()
         
-        rodada_data = {
-            'numero': rodada_num,
-            'respostas': respostas,
-            'timestamp': datetime.now().isoformat(),
-            'analise_convergencia': {}
-        }
+            if verbose:
+                print(f"\n⏱️  Tempo da rodada de consultas: {end_time - start_time:.2f} segundos (paralelizado)")
         
-        # 2. Análise de Convergência
-        try:
-            convergence_score, all_embeddings = _calculate_semantic_convergence(respostas)
-            rodada_data['analise_convergencia'] = {
-                'score': convergence_score,
-                'threshold': SEMANTIC_CONVERGENCE_THRESHOLD,
-                'metodo': 'semantico'
+            rodada_data = {
+                'numero': rodada_num,
+                'respostas': respostas,
+                'timestamp': datetime.now().isoformat(),
+                'latencias': {key: resp.get('latencia_s') for key, resp in respostas.items()},
+                'quorum': {
+                    'k': quorum or len(saci_models),
+                    'respondidos': sum(1 for resp in respostas.values() if resp['success']),
+                    'atrasados': [key for key, resp in respostas.items() if resp.get('atrasado')],
+                    'deadline_s': round_deadline or None,
+                    'tempo_s': round(end_time - start_time, 3),
+                },
+                'analise_convergencia': {}
             }
-            if verbose:
-                print(f"\n📈 Convergência Semântica da Rodada: {convergence_score:.2f}")
 
-            # Só aceita consenso se já houver rodadas mínimas de debate
-            if convergence_score >= SEMANTIC_CONVERGENCE_THRESHOLD and rodada_num >= MIN_ROUNDS_FOR_CONSENSUS:
-                consenso_atingido = True
-                solucao_final = _synthesize_solution(respostas, "Consenso Semântico")
-                if verbose:
-                    print(f"✅ CONSENSO SEMÂNTICO ATINGIDO!")
-            elif convergence_score >= SEMANTIC_CONVERGENCE_THRESHOLD:
+            if scope.cancelled:
+                # Rodada interrompida: registra as respostas sem embedar nem pontuar
+                historico.append(rodada_data)
+                _log_event('rodada', rodada=rodada_data)
+                break
+        
+            # 2. Análise de Convergência
+            try:
+                convergence_score, similarity = _calculate_semantic_convergence(respostas, embedding_store)
+                rodada_data['analise_convergencia'] = {
+                    'score': convergence_score,
+                    'threshold': SEMANTIC_CONVERGENCE_THRESHOLD,
+                    'metodo': 'semantico',
+                    'cache_embeddings': cache_stats(),
+                }
+                if similarity is not None:
+                    detalhes = similarity.to_dict()
+                    rodada_data['analise_convergencia'].update(
+                        centralidade=detalhes['centralidade'],
+                        outliers=detalhes['outliers'],
+                        drift=embedding_store.drift(),
+                        embeddings={
+                            'novos': embedding_store.last_embedded,
+                            'reutilizados': embedding_store.last_reused,
+                        },
+                    )
                 if verbose:
-                    print(f"⚠️ Convergência alta ({convergence_score:.2f}), mas ainda na rodada {rodada_num}. Mínimo: {MIN_ROUNDS_FOR_CONSENSUS}")
+                    print(f"\n📈 Convergência Semântica da Rodada: {convergence_score:.2f}")
+
+                # Só aceita consenso se já houver rodadas mínimas de debate
+                if convergence_score >= SEMANTIC_CONVERGENCE_THRESHOLD and rodada_num >= MIN_ROUNDS_FOR_CONSENSUS:
+                    consenso_atingido = True
+                    solucao_final = _synthesize_solution(respostas, "Consenso Semântico")
+                    if verbose:
+                        print(f"✅ CONSENSO SEMÂNTICO ATINGIDO!")
+                elif convergence_score >= SEMANTIC_CONVERGENCE_THRESHOLD:
+                    if verbose:
+                        print(f"⚠️ Convergência alta ({convergence_score:.2f}), mas ainda na rodada {rodada_num}. Mínimo: {MIN_ROUNDS_FOR_CONSENSUS}")
         
-        except Exception as e:
-            if verbose:
-                print(f"\n⚠️ Falha na análise semântica: {e}")
-                print("   Revertendo para análise de votos por keyword (fallback)...")
+            except Exception as e:
+                if verbose:
+                    print(f"\n⚠️ Falha na análise semântica: {e}")
+                    print("   Revertendo para análise de votos por keyword (fallback)...")
             
-            # Fallback para v1.0
-            votos = _extract_votes_fallback(respostas)
-            rodada_data['analise_convergencia'] = {
-                'votos': votos,
-                'metodo': 'keyword_fallback'
-            }
-            # Só aceita consenso por votos após rodadas mínimas
-            if rodada_num >= MIN_ROUNDS_FOR_CONSENSUS:
-                consenso_atingido, solucao_final = _check_consensus_fallback(votos, 0.75, respostas, len(saci_models))
-            else:
-                consenso_atingido = False
-                solucao_final = None
+                # Fallback para v1.0
+                votos = _extract_votes_fallback(respostas)
+                rodada_data['analise_convergencia'] = {
+                    'votos': votos,
+                    'metodo': 'keyword_fallback'
+                }
+                # Só aceita consenso por votos após rodadas mínimas
+                if rodada_num >= MIN_ROUNDS_FOR_CONSENSUS:
+                    consenso_atingido, solucao_final = _check_consensus_fallback(votos, 0.75, respostas, len(saci_models))
+                else:
+                    consenso_atingido = False
+                    solucao_final = None
                 
-            if verbose:
-                print(f"📊 Votos (Fallback): {votos}")
-            if consenso_atingido:
-                 if verbose:
-                    print(f"✅ CONSENSO POR VOTOS (FALLBACK) ATINGIDO!")
-
-        historico.append(rodada_data)
-
-        # Persistir progresso após cada rodada
-        _persist_state(final=False)
-
-        if consenso_atingido:
-            break
+                if verbose:
+                    print(f"📊 Votos (Fallback): {votos}")
+                if consenso_atingido:
+                     if verbose:
+                        print(f"✅ CONSENSO POR VOTOS (FALLBACK) ATINGIDO!")
+
+            historico.append(rodada_data)
+
+            # Persistir progresso após cada rodada (só a rodada nova vai para o disco)
+            _log_event('rodada', rodada=rodada_data)
+
+            if consenso_atingido or scope.cancelled:
+                break
+
+        # Atrasados que já chegaram entram na rodada de origem; os demais são cancelados
+        cancelado = scope.cancelled
+        _fold_and_log()
+    finally:
+        pool.shutdown()
+        close_scope(scope)
+    canceladas = scope.stats()
+    if verbose and cancelado:
+        print(f"🛑 Debate cancelado ({debate_id})")
+    if verbose and canceladas['calls']:
+        print(
+            f"🛑 {canceladas['calls']} chamada(s) de agentes em andamento canceladas "
+            f"(~{canceladas['prompt_tokens']} tokens de prompt já enviados)"
+        )
 
     # Resultado Final
-    ts_obj = timestamp if timestamp else datetime.now()
     # Finaliza consenso_atingido se não houve (fica False explicitamente)    
     if consenso_atingido is None:
         consenso_atingido = False
@@ -264,16 +339,24 @@ def debate_saci_v2(
         'versao': '2.1',
         'debug_mode': debug_mode,
         'problema': problema,
-        'contexto': contexto
+        'contexto': contexto,
+        'cancelado': cancelado,
+        'chamadas_canceladas': {
+            'chamadas': canceladas['calls'],
+            'tokens_prompt': canceladas['prompt_tokens'],
+        }
     }
 
-    # Persistência final
-    try:
-        with open(log_filename, 'w', encoding='utf-8') as f:
-            json.dump(resultado, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        if verbose:
-            print(f"⚠️ Falha ao salvar resultado final ({debate_id}): {e}")
+    # Persistência final: evento de encerramento + snapshot completo
+    _log_event('final', estado={
+        key: resultado[key] for key in ('consenso', 'solucao_final', 'cancelado', 'chamadas_canceladas')
+    })
+    if debate_log is not None:
+        try:
+            debate_log.snapshot()
+        except Exception as e:
+            if verbose:
+                print(f"⚠️ Falha ao salvar resultado final ({debate_id}): {e}")
         
     if verbose:
         print(f"\n{'='*80}")
@@ -288,48 +371,172 @@ def debate_saci_v2(
 # FUNÇÕES DE LÓGICA DE DEBATE
 # ============================================================================
 
-def _collect_responses(prompt: str, verbose: bool, saci_models: Dict) -> Dict:
-    """Coleta respostas de todos os modelos SACI em paralelo."""
+class AgentPool:
+    """
+    Executor das chamadas aos agentes de um debate, que sobrevive às rodadas.
+
+    Uma rodada pode terminar (quórum ou prazo) com chamadas ainda em andamento;
+    elas continuam aqui e, quando terminam, `late()` as devolve para serem
+    incorporadas à rodada de origem. Um agente com chamada pendente não é
+    consultado de novo até ela terminar. Todas as chamadas usam o escopo
+    `cancel`, então `shutdown()` aborta as que ainda estiverem no ar.
+    """
+
+    def __init__(self, n_agents: int, cancel: Optional[CancelScope] = None):
+        # Folga para os atrasados de uma rodada não bloquearem a seguinte
+        self._executor = ThreadPoolExecutor(max_workers=max(1, n_agents) * 2, thread_name_prefix="saci-agent")
+        self._stragglers: Dict[Future, tuple] = {}  # future -> (rodada, agente)
+        self.scope = cancel or CancelScope()
+
+    def busy(self) -> set:
+        return {key for future, (_, key) in self._stragglers.items() if not future.done()}
+
+    def submit(self, model_info: Dict, prompt: str) -> Future:
+        return self._executor.submit(_timed_fetch, model_info['id'], prompt, model_info['name'], self.scope)
+
+    def defer(self, future: Future, round_num: Optional[int], model_key: str) -> None:
+        self._stragglers[future] = (round_num, model_key)
+
+    def late(self) -> List[tuple]:
+        """(rodada, agente, resposta) de cada atrasado que terminou desde a última chamada."""
+        finished = [future for future in self._stragglers if future.done()]
+        result = []
+        for future in finished:
+            round_num, model_key = self._stragglers.pop(future)
+            result.append((round_num, model_key, future.result()))
+        return result
+
+    def shutdown(self) -> int:
+        """Cancela as chamadas em andamento e encerra o executor; devolve quantos atrasados havia."""
+        pending = sum(1 for future in self._stragglers if not future.done())
+        self._stragglers.clear()
+        self.scope.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return pending
+
+
+def _collect_responses(
+    prompt: str,
+    verbose: bool,
+    saci_models: Dict,
+    quorum: Optional[int] = None,
+    deadline: Optional[float] = None,
+    pool: Optional[AgentPool] = None,
+    round_num: Optional[int] = None,
+) -> Dict:
+    """
+    Coleta respostas dos modelos SACI em paralelo.
+
+    Sem `quorum`/`deadline` espera todos. Com `quorum=K`, retorna assim que K
+    agentes responderem com sucesso (ou todos terminarem); com `deadline`,
+    após esse número de segundos. Quem não respondeu volta com
+    `atrasado: True` e continua rodando em `pool`.
+    """
+    own_pool = pool is None
+    pool = pool or AgentPool(len(saci_models))
+    started = time.monotonic()
+    busy = pool.busy()
     respostas = {}
-    with ThreadPoolExecutor(max_workers=len(saci_models)) as executor:
-        future_to_model = {
-            executor.submit(
-                _fetch_single_response, 
-                model_info['id'], 
-                prompt, 
-                model_info['name']
-            ): model_key
-            for model_key, model_info in saci_models.items()
+    for model_key in busy & set(saci_models):
+        respostas[model_key] = {
+            'model_name': saci_models[model_key]['name'],
+            'response': None,
+            'success': False,
+            'atrasado': True,
+            'error': 'ainda respondendo a uma rodada anterior'
         }
-
-        for future in as_completed(future_to_model):
+    future_to_model = {
+        pool.submit(model_info, prompt): model_key
+        for model_key, model_info in saci_models.items() if model_key not in busy
+    }
+    needed = min(quorum or len(future_to_model), len(future_to_model))
+
+    pending = set(future_to_model)
+    answered = 0
+    while pending and answered < needed:
+        timeout = None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break  # prazo da rodada esgotado
+        for future in done:
             model_key = future_to_model[future]
             model_name = saci_models[model_key]['name']
             if verbose:
                 print(f"⏳ Coletando resposta de {model_name}...")
-            try:
-                respostas[model_key] = future.result()
+            respostas[model_key] = future.result()
+            if respostas[model_key]['success']:
+                answered += 1
                 if verbose:
                     print(f"✅ {model_name}: {len(respostas[model_key]['response'])} chars")
-            except Exception as e:
-                if verbose:
-                    print(f"❌ {model_name}: ERROR - {e}")
-                respostas[model_key] = {
-                    'model_name': model_name,
-                    'response': None,
-                    'success': False,
-                    'error': str(e)
-                }
+            elif verbose:
+                print(f"❌ {model_name}: ERROR - {respostas[model_key]['error']}")
+
+    for future in pending:
+        model_key = future_to_model[future]
+        if own_pool:
+            # Sem pool do debate não há rodada seguinte: espera como antes
+            respostas[model_key] = future.result()
+            continue
+        pool.defer(future, round_num, model_key)
+        if verbose:
+            print(f"🐢 {saci_models[model_key]['name']}: atrasado, segue em segundo plano")
+        respostas[model_key] = {
+            'model_name': saci_models[model_key]['name'],
+            'response': None,
+            'success': False,
+            'atrasado': True,
+            'error': 'sem resposta até o fim da rodada'
+        }
+    if own_pool:
+        pool.shutdown()
     return respostas
 
-def _fetch_single_response(model_id: str, prompt: str, model_name: str) -> Dict:
+
+def _fold_late_responses(pool: AgentPool, historico: List[Dict], verbose: bool) -> List[tuple]:
+    """Incorpora à rodada de origem as respostas de atrasados que já chegaram.
+
+    Devolve (rodada, agente, resposta incorporada) de cada uma."""
+    folded = []
+    for round_num, model_key, resposta in pool.late():
+        if not round_num or round_num > len(historico):
+            continue
+        rodada = historico[round_num - 1]
+        rodada['respostas'][model_key] = {**resposta, 'atrasado': True, 'incorporada_em': datetime.now().isoformat()}
+        rodada.setdefault('latencias', {})[model_key] = resposta.get('latencia_s')
+        folded.append((round_num, model_key, rodada['respostas'][model_key]))
+        if verbose:
+            print(f"📥 {resposta['model_name']}: resposta atrasada incorporada à rodada {round_num}")
+    return folded
+
+
+def _timed_fetch(model_id: str, prompt: str, model_name: str, cancel: Optional[CancelScope] = None) -> Dict:
+    """`_fetch_single_response` com a latência do agente e o erro como resultado."""
+    started = time.monotonic()
+    try:
+        resposta = _fetch_single_response(model_id, prompt, model_name, cancel=cancel)
+    except Exception as e:
+        resposta = {
+            'model_name': model_name,
+            'response': None,
+            'success': False,
+            'error': str(e)
+        }
+        if isinstance(e, ChatCancelled):
+            resposta['cancelada'] = True
+    resposta['latencia_s'] = round(time.monotonic() - started, 3)
+    return resposta
+
+def _fetch_single_response(
+    model_id: str, prompt: str, model_name: str, cancel: Optional[CancelScope] = None
+) -> Dict:
     """Função auxiliar para buscar uma única resposta de um modelo."""
     response_text = chat(
         model=model_id,
         system="You are an expert AI participant in a structured debate.",
         user=prompt,
         temperature=0.4,
-        max_tokens=10000
+        max_tokens=10000,
+        cancel=cancel
     )
     return {
         'model_name': model_name,
@@ -337,44 +544,28 @@ def _fetch_single_response(model_id: str, prompt: str, model_name: str) -> Dict:
         'success': True
     }
 
-def _calculate_semantic_convergence(respostas: Dict) -> tuple[float, Dict]:
-    """Gera embeddings e calcula a similaridade de cosseno média."""
-    embeddings = {}
-    valid_responses = [r['response'] for r in respostas.values() if r['success'] and r['response']]
+def _calculate_semantic_convergence(
+    respostas: Dict, store: Optional[DebateEmbeddingStore] = None
+) -> tuple[float, Optional[SimilarityReport]]:
+    """
+    Embeda as respostas novas da rodada (uma requisição) e calcula a similaridade
+    de cosseno média. Com `store`, respostas já vistas no debate não são
+    reenviadas e `store.drift()` passa a valer para esta rodada.
+    """
+    valid = {
+        key: resp_data['response']
+        for key, resp_data in respostas.items() if resp_data['success'] and (resp_data['response'] or '').strip()
+    }
     
-    if len(valid_responses) < 2:
-        return 0.0, {}
-
-    with ThreadPoolExecutor(max_workers=len(valid_responses)) as executor:
-        future_to_key = {
-            executor.submit(get_embedding, resp_data['response']): key
-            for key, resp_data in respostas.items() if resp_data['success'] and resp_data['response']
-        }
-        for future in as_completed(future_to_key):
-            key = future_to_key[future]
-            try:
-                embeddings[key] = future.result()
-            except Exception as e:
-                print(f"Falha ao gerar embedding para {key}: {e}")
-
-
-    # Calcular similaridade de cosseno par a par
-    keys = list(embeddings.keys())
-    scores = []
-    for i in range(len(keys)):
-        for j in range(i + 1, len(keys)):
-            vec1 = np.array(embeddings[keys[i]])
-            vec2 = np.array(embeddings[keys[j]])
-            
-            # Normalizar vetores para evitar divisão por zero
-            if norm(vec1) > 0 and norm(vec2) > 0:
-                cosine_sim = dot(vec1, vec2) / (norm(vec1) * norm(vec2))
-                scores.append(cosine_sim)
-
-    if not scores:
-        return 0.0, embeddings
-
-    return np.mean(scores), embeddings
+    if len(valid) < 2:
+        return 0.0, None
+
+    # Backend de `SACI_EMBEDDING_BACKEND` (padrão: API da OpenAI; "local" roda offline)
+    store = store or DebateEmbeddingStore(get_embedding_backend(default="openai"))
+    vectors = store.add_round(valid)
+    # Matriz de similaridade de todos os pares em um único produto matricial
+    report = similarity_report(list(vectors.values()), labels=list(vectors))
+    return report.mean, report
 
 def _synthesize_solution(respostas: Dict, reason: str) -> str:
     """Cria uma solução final a partir das respostas."""
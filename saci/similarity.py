@@ -0,0 +1,132 @@
+"""
+Motor vetorizado de similaridade para as métricas de convergência.
+
+Empilha os embeddings dos agentes numa matriz float32 normalizada e calcula a
+matriz de cossenos inteira com um único produto matricial, em vez de um laço
+O(n²) de produtos escalares em Python. Além da média usada como score de
+convergência, expõe a centralidade de cada agente (similaridade média com os
+demais) e um score de outlier (quantos desvios-padrão abaixo da centralidade
+média ele está).
+
+Uso:
+    from saci.similarity import similarity_report
+
+    report = similarity_report(vectors, labels=["gpt", "claude", "gemini"])
+    report.mean            # score de convergência (média dos pares)
+    report.centrality      # {"gpt": 0.91, ...}
+    report.outliers()      # agentes que destoam do grupo
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Score de outlier a partir do qual um agente é considerado destoante.
+OUTLIER_THRESHOLD = 1.0
+
+
+def normalized_matrix(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """Vetores empilhados em float32, cada linha com norma 1 (linhas nulas ficam nulas)."""
+    if not len(vectors):
+        return np.zeros((0, 0), dtype=np.float32)
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def similarity_matrix(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """Matriz n×n de similaridade de cosseno (float32)."""
+    return _cosines(normalized_matrix(vectors))
+
+
+def _cosines(matrix: np.ndarray) -> np.ndarray:
+    similarities = matrix @ matrix.T
+    np.clip(similarities, -1.0, 1.0, out=similarities)
+    return similarities
+
+
+@dataclass
+class SimilarityReport:
+    """Matriz de similaridade de uma rodada e as métricas derivadas dela."""
+
+    labels: List[str]
+    matrix: np.ndarray
+    # Agentes com embedding nulo não entram em nenhum par.
+    valid: np.ndarray
+
+    @property
+    def pair_count(self) -> int:
+        n = int(self.valid.sum())
+        return n * (n - 1) // 2
+
+    @property
+    def mean(self) -> float:
+        """Similaridade média entre todos os pares de agentes (0.0 sem pares)."""
+        if not self.pair_count:
+            return 0.0
+        upper = np.triu(self.matrix[np.ix_(self.valid, self.valid)], k=1)
+        return float(upper.sum(dtype=np.float64) / self.pair_count)
+
+    @property
+    def centrality(self) -> Dict[str, float]:
+        """Similaridade média de cada agente com os demais."""
+        return dict(zip(self.labels, self._centrality().tolist()))
+
+    @property
+    def outlier_scores(self) -> Dict[str, float]:
+        """Desvios-padrão abaixo da centralidade média (negativo = mais central que a média)."""
+        centrality = self._centrality()
+        valid = centrality[self.valid]
+        spread = float(valid.std()) if valid.size else 0.0
+        if spread <= 1e-6:
+            scores = np.zeros_like(centrality)
+        else:
+            scores = (float(valid.mean()) - centrality) / spread
+        scores[~self.valid] = 0.0
+        return dict(zip(self.labels, scores.tolist()))
+
+    def outliers(self, threshold: float = OUTLIER_THRESHOLD) -> List[str]:
+        return [label for label, score in self.outlier_scores.items() if score >= threshold]
+
+    def pairs(self) -> Dict[str, float]:
+        """Similaridade de cada par, como `"a|b": score`."""
+        result = {}
+        for i in range(len(self.labels)):
+            for j in range(i + 1, len(self.labels)):
+                if self.valid[i] and self.valid[j]:
+                    result[f"{self.labels[i]}|{self.labels[j]}"] = float(self.matrix[i, j])
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "media": round(self.mean, 4),
+            "centralidade": {label: round(value, 4) for label, value in self.centrality.items()},
+            "outlier_scores": {label: round(value, 3) for label, value in self.outlier_scores.items()},
+            "outliers": self.outliers(),
+        }
+
+    def _centrality(self) -> np.ndarray:
+        others = self.valid.sum() - 1
+        if others <= 0:
+            return np.zeros(len(self.labels), dtype=np.float64)
+        masked = self.matrix * self.valid[np.newaxis, :]
+        totals = masked.sum(axis=1, dtype=np.float64) - np.diagonal(masked)
+        centrality = totals / others
+        centrality[~self.valid] = 0.0
+        return centrality
+
+
+def similarity_report(
+    vectors: Sequence[Sequence[float]], labels: Optional[Sequence[str]] = None
+) -> SimilarityReport:
+    """Matriz de similaridade, média, centralidade e outliers de um conjunto de embeddings."""
+    matrix = normalized_matrix(vectors)
+    if labels is None:
+        labels = [str(i) for i in range(matrix.shape[0])]
+    elif len(labels) != matrix.shape[0]:
+        raise ValueError(f"{len(labels)} rótulos para {matrix.shape[0]} vetores")
+    valid = np.any(matrix != 0, axis=1)
+    return SimilarityReport(list(labels), _cosines(matrix), valid)
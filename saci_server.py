@@ -18,6 +18,8 @@ from fastapi import FastAPI, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from llm_client import cancel_scope
+from saci.debate_log import load_debate, write_json_atomic
 from saci.saci_v2 import debate_saci_v2
 
 # Carrega variáveis do arquivo .env para garantir que as chaves estejam disponíveis
@@ -151,8 +153,7 @@ async def create_debate(request: DebateRequest, background_tasks: BackgroundTask
         'contexto': request.contexto
     }
     try:
-        with open(log_filename, 'w', encoding='utf-8') as f:
-            json.dump(initial_state, f, ensure_ascii=False, indent=2)
+        write_json_atomic(log_filename, initial_state)
         print(f"[API] Estado inicial salvo: {log_filename}")
     except Exception as e:
         print(f"[API] ERRO ao salvar estado inicial: {e}")
@@ -241,6 +242,23 @@ async def get_debates_history():
             continue
     return debates
 
+@app.post("/debates/{debate_id}/cancel")
+async def cancel(debate_id: str):
+    """
+    Cancela um debate em andamento: aborta as chamadas aos agentes ainda no ar
+    e o debate termina após a rodada atual, com `cancelado: true` no log.
+    """
+    result = cancel_scope(debate_id)
+    if result is None:
+        return {"error": "Debate não está em andamento.", "debate_id": debate_id}
+    print(f"[API] Debate {debate_id} cancelado: {result['calls']} chamada(s) abortadas (~{result['prompt_tokens']} tokens de prompt)")
+    return {
+        "debate_id": debate_id,
+        "status": "cancelado",
+        "chamadas_canceladas": result["calls"],
+        "tokens_prompt": result["prompt_tokens"],
+    }
+
 @app.get("/debates/{debate_id}/status")
 async def get_debate_status_endpoint(debate_id: str):
     """
@@ -253,19 +271,18 @@ async def get_debate_status_endpoint(debate_id: str):
 async def get_debate_details(debate_id: str):
     """
     Retorna os detalhes completos de um debate específico.
+
+    Lê o último snapshot (logs/<id>.json) e aplica só os eventos gravados
+    depois dele (logs/<id>.events.jsonl).
     """
     # Sanitize input to prevent directory traversal
     if ".." in debate_id or "/" in debate_id or "\\" in debate_id:
         return {"error": "ID de debate inválido."}
-        
-    log_path = os.path.join("logs", f"{debate_id}.json") # Adiciona a extensão .json
 
-    if not os.path.exists(log_path):
+    data = load_debate("logs", debate_id)
+    if data is None:
         # Se o arquivo não existe, pode ser que o debate esteja em andamento mas ainda não salvou o primeiro estado.
         # Retornamos um status "iniciado" para a UI não quebrar.
         return {"status": "iniciado", "rodada_atual": 0, "rodadas": []}
-
-    with open(log_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
     
     return data
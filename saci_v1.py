@@ -109,7 +109,6 @@ SACI_MODELS_FREE = {
     }
 }
 
-DELAY_BETWEEN_CALLS = 2  # segundos
 
 # ============================================================================
 # FUNÇÕES PRINCIPAIS
@@ -210,10 +209,6 @@ def debate_saci(
                     'success': False,
                     'error': str(e)
                 }
-            
-            # Delay entre chamadas
-            if model_key != list(saci_models.keys())[-1]:
-                time.sleep(DELAY_BETWEEN_CALLS)
         
         historico.append(rodada_data)
         
@@ -0,0 +1,125 @@
+"""Benchmark: extração de JSON de saídas grandes do planner.
+
+Gera respostas no formato do PlannerCoder (prosa + objeto com `patches` contendo
+arquivos inteiros, cheios de chaves e aspas dentro das strings) e compara:
+
+- legacy: a varredura antiga de `_find_json_balanced` (caractere a caractere,
+  ignora strings e tenta `json.loads` a cada fechamento no nível 0)
+- scanner: `utils.json_scanner.find_json_object` (uma passada, string-aware)
+- stream: o mesmo scanner alimentado em deltas de 32 caracteres, como num stream
+
+Uso:
+    python scripts/bench_json_extract.py --sizes 100 300 1000 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from utils.json_scanner import JSONObjectScanner, find_json_object  # noqa: E402
+
+FILE_TEMPLATE = '''import json
+
+
+def handler_{n}(event: dict) -> dict:
+    """Processa o evento {n}."""
+    payload = {{"id": {n}, "tags": ["a", "b"], "meta": {{"nested": True}}}}
+    if event.get("kind") == "}}":
+        return {{"status": "odd brace"}}
+    template = f"{{{{value}}}} -> {{payload['id']}}"
+    text = "aspas \\"internas\\" e barra \\\\ e chave {{"
+    return json.loads(json.dumps({{"ok": True, "template": template, "text": text}}))
+'''
+# Uma chave aberta a mais dentro de string: a varredura antiga perde o balanço.
+UNBALANCED_LINE = 'OPEN_BRACE = "{"\n'
+
+
+def legacy_find_json_balanced(s: str):
+    stack = 0
+    start = None
+    for i, ch in enumerate(s):
+        if ch == "{":
+            if stack == 0:
+                start = i
+            stack += 1
+        elif ch == "}":
+            if stack > 0:
+                stack -= 1
+                if stack == 0 and start is not None:
+                    try:
+                        return json.loads(s[start : i + 1])
+                    except Exception:
+                        pass
+    return None
+
+
+def planner_output(target_kb: int, unbalanced: bool = False) -> tuple[str, dict]:
+    patches = []
+    size = 0
+    n = 0
+    while size < target_kb * 1024:
+        content = "\n".join(FILE_TEMPLATE.format(n=n * 10 + k) for k in range(10))
+        if unbalanced:
+            content += UNBALANCED_LINE
+        patches.append({"path": f"src/module_{n}.py", "content": content})
+        size += len(content)
+        n += 1
+    payload = {"patches": patches, "test_plan": ["pytest -q"]}
+    text = (
+        "Claro! Abaixo está o plano. Use {placeholders} apenas como exemplo.\n\n"
+        + json.dumps(payload, ensure_ascii=False, indent=2)
+        + "\n\nQualquer dúvida, estou à disposição."
+    )
+    return text, payload
+
+
+def feed_stream(text: str) -> dict:
+    scanner = JSONObjectScanner(expected_keys=["patches"])
+    for i in range(0, len(text), 32):
+        if scanner.feed(text[i : i + 32]) is not None:
+            break
+    return scanner.result
+
+
+def timed(fn, text, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000], help="KB de patches")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    methods = {
+        "legacy": legacy_find_json_balanced,
+        "scanner": lambda text: find_json_object(text, expected_keys=["patches"]),
+        "stream": feed_stream,
+    }
+    print(f"{'payload':<11} {'KB':>6} {'método':<8} {'mediana (ms)':>13} {'MB/s':>8}  correto")
+    for unbalanced in (False, True):
+        label = "desbalanc." if unbalanced else "balanceado"
+        for kb in args.sizes:
+            text, expected = planner_output(kb, unbalanced)
+            for name, fn in methods.items():
+                median, result = timed(fn, text, args.repeat)
+                mbps = len(text) / 1e6 / median if median else float("inf")
+                print(
+                    f"{label:<11} {len(text) // 1024:>6} {name:<8} {median * 1000:>13.1f}"
+                    f" {mbps:>8.1f}  {result == expected}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark: reparo de JSON das saídas do planner.
+
+Roda o corpus `scripts/json_corpus/*.txt` (saídas reais coletadas dos logs com
+`scripts/build_json_corpus.py`, mais as amostras iniciais) e compara:
+
+- legacy: as cinco estratégias antigas do `JSONSanitizerAgent` (parse direto,
+  bloco markdown, regex de comentários/vírgulas/aspas, busca do primeiro objeto
+  e reparo estrutural), cada uma repassando o texto inteiro
+- repair: `utils.json_repair.repair_json` (parser tolerante de passada única)
+
+Para cada arquivo mostra a mediana, MB/s, se cada método recuperou um objeto com
+`patches` e `test_plan` e os reparos aplicados. `--inflate N` repete o conteúdo
+de cada string N vezes para simular saídas grandes.
+
+Uso:
+    python scripts/bench_json_repair.py --repeat 50 --inflate 1 20
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from utils.json_repair import repair_json  # noqa: E402
+from utils.json_scanner import find_json_object  # noqa: E402
+
+CORPUS_DIR = ROOT / "scripts" / "json_corpus"
+EXPECTED_KEYS = ["patches", "test_plan"]
+
+
+def _legacy_markdown(text):
+    for match in re.findall(r"```(?:json)?\s*\n(.*?)\n```", text, re.DOTALL | re.IGNORECASE):
+        try:
+            return json.loads(match.strip())
+        except Exception:
+            continue
+    raise ValueError("sem bloco markdown")
+
+
+def _legacy_common_errors(text):
+    text = re.sub(r"//.*?$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    text = re.sub(r",(\s*[}\]])", r"\1", text)
+    text = re.sub(r"'(\w+)'(\s*):", r'"\1"\2:', text)
+    return json.loads(text.strip())
+
+
+def _legacy_fuzzy(text):
+    result = find_json_object(text)
+    if result is None:
+        raise ValueError("sem objeto")
+    return result
+
+
+def _legacy_structural(text):
+    text = re.sub(r"^[^{]*", "", text)
+    text = re.sub(r"[^}]*$", "", text)
+    text += "}" * (text.count("{") - text.count("}"))
+    text += "]" * (text.count("[") - text.count("]"))
+    text = re.sub(r'"\s*\n\s*"', '" "', text)
+    return json.loads(text)
+
+
+def legacy_sanitize(text):
+    strategies = (lambda t: json.loads(t.strip()), _legacy_markdown, _legacy_common_errors, _legacy_fuzzy, _legacy_structural)
+    for strategy in strategies:
+        try:
+            result = strategy(text)
+        except Exception:
+            continue
+        if isinstance(result, dict) and all(key in result for key in EXPECTED_KEYS):
+            return result
+    return None
+
+
+def new_sanitize(text):
+    try:
+        return repair_json(text, EXPECTED_KEYS).value
+    except ValueError:
+        return None
+
+
+def inflate(text: str, factor: int) -> str:
+    """Repete o miolo de cada `"content": "..."` para gerar saídas maiores."""
+    if factor <= 1:
+        return text
+    return re.sub(
+        r'("content":\s*")((?:[^"\\]|\\.)*)',
+        lambda m: m.group(1) + m.group(2) * factor,
+        text,
+    )
+
+
+def timed(fn, text, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--inflate", type=int, nargs="+", default=[1, 20])
+    args = parser.parse_args()
+
+    files = sorted(args.corpus.glob("*.txt"))
+    if not files:
+        sys.exit(f"Corpus vazio: {args.corpus}")
+    methods = {"legacy": legacy_sanitize, "repair": new_sanitize}
+    totals = {name: [0.0, 0, 0] for name in methods}  # segundos, bytes, recuperados
+    print(f"{'arquivo':<28} {'x':>3} {'KB':>6} {'método':<7} {'mediana (ms)':>13} {'MB/s':>8}  ok  reparos")
+    for factor in args.inflate:
+        for path in files:
+            text = inflate(path.read_text(encoding="utf-8"), factor)
+            for name, fn in methods.items():
+                median, result = timed(fn, text, args.repeat)
+                ok = result is not None
+                totals[name][0] += median
+                totals[name][1] += len(text)
+                totals[name][2] += ok
+                repairs = ""
+                if name == "repair" and ok:
+                    repairs = ",".join(repair_json(text, EXPECTED_KEYS).repairs) or "-"
+                mbps = len(text) / 1e6 / median if median else float("inf")
+                print(
+                    f"{path.stem[:28]:<28} {factor:>3} {len(text) / 1024:>6.1f} {name:<7}"
+                    f" {median * 1000:>13.3f} {mbps:>8.1f}  {'sim' if ok else 'não':<3} {repairs}"
+                )
+    runs = len(files) * len(args.inflate)
+    for name, (seconds, size, recovered) in totals.items():
+        print(f"total {name:<7} {size / 1e6 / seconds:>8.1f} MB/s  recuperados {recovered}/{runs}")
+
+
+if __name__ == "__main__":
+    main()
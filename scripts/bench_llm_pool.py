@@ -0,0 +1,111 @@
+"""Micro-benchmark: overhead por chamada de llm_client.chat com e sem pool.
+
+Sobe um stand-in local do endpoint /chat/completions (resposta fixa, sem
+latência de modelo) e mede o tempo por chamada em dois modos:
+
+- cold: `LLM_POOL_ENABLED=0`, um cliente OpenAI novo por chamada (design antigo)
+- warm: cliente do pool reutilizado, conexões keep-alive
+
+Uso:
+    python scripts/bench_llm_pool.py --calls 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CANNED_COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench/model",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "ok"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # evita o atraso de ~40ms (Nagle + delayed ACK)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps(CANNED_COMPLETION).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _measure(llm_client, calls: int) -> list:
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        llm_client.chat("bench/model", "system", "user", max_tokens=1)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list):
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<5} mean={statistics.mean(samples):7.2f}ms "
+        f"p50={statistics.median(samples):7.2f}ms p95={p95:7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = _start_server()
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+
+    import llm_client
+
+    try:
+        llm_client.POOL_ENABLED = False
+        cold = _measure(llm_client, args.calls)
+        llm_client.POOL_ENABLED = True
+        llm_client.chat("bench/model", "system", "user", max_tokens=1)  # aquece o pool
+        warm = _measure(llm_client, args.calls)
+    finally:
+        llm_client.reset_pool()
+        server.shutdown()
+
+    _report("cold", cold)
+    _report("warm", warm)
+    print(f"speedup (mean): {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+    print(f"pool: {llm_client.pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: similaridade de convergência entre os embeddings dos agentes.
+
+Compara, para rodadas de N agentes com embeddings de `--dims` dimensões:
+
+- loop: o laço O(n²) antigo de `convergence_metrics._cosine_similarity`
+  (`sum(a*b)` em Python puro, normas recalculadas a cada par)
+- loop-numpy: o laço antigo do `saci_v2` (`np.array` + `norm()` por par)
+- matrix: `saci.similarity.similarity_report` (matriz float32 normalizada e um
+  único produto matricial, incluindo centralidade e outliers)
+
+Os vetores são os mesmos nos três métodos e o script confere que a média bate.
+
+Uso:
+    python scripts/bench_similarity.py --agents 4 16 64 --dims 1536 --repeat 20
+"""
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from numpy import dot  # noqa: E402
+from numpy.linalg import norm  # noqa: E402
+
+from saci.similarity import similarity_report  # noqa: E402
+
+
+def _legacy_cosine(vec1, vec2):
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    mag1 = math.sqrt(sum(a * a for a in vec1))
+    mag2 = math.sqrt(sum(b * b for b in vec2))
+    if mag1 == 0 or mag2 == 0:
+        return 0.0
+    return dot_product / (mag1 * mag2)
+
+
+def legacy_loop(vectors):
+    similarities = []
+    for i in range(len(vectors)):
+        for j in range(i + 1, len(vectors)):
+            similarities.append(_legacy_cosine(vectors[i], vectors[j]))
+    return sum(similarities) / len(similarities)
+
+
+def legacy_numpy_loop(vectors):
+    scores = []
+    for i in range(len(vectors)):
+        for j in range(i + 1, len(vectors)):
+            vec1 = np.array(vectors[i])
+            vec2 = np.array(vectors[j])
+            if norm(vec1) > 0 and norm(vec2) > 0:
+                scores.append(dot(vec1, vec2) / (norm(vec1) * norm(vec2)))
+    return float(np.mean(scores))
+
+
+def matrix(vectors):
+    report = similarity_report(vectors)
+    report.centrality, report.outlier_scores  # noqa: B018 - entra na medição
+    return report.mean
+
+
+def timed(fn, vectors, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(vectors)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    methods = [("loop", legacy_loop), ("loop-numpy", legacy_numpy_loop), ("matrix", matrix)]
+    print(f"{'agentes':>7} {'pares':>6}  " + "  ".join(f"{name:>12}" for name, _ in methods) + "  speedup")
+    for agents in args.agents:
+        # Embeddings chegam da API como listas de floats
+        vectors = [[rng.gauss(0.0, 1.0) for _ in range(args.dims)] for _ in range(agents)]
+        timings = []
+        means = []
+        for _, fn in methods:
+            # O laço em Python puro é lento demais para repetir muito com 64 agentes
+            repeat = max(1, args.repeat // 10) if fn is legacy_loop and agents > 16 else args.repeat
+            median, mean = timed(fn, vectors, repeat)
+            timings.append(median)
+            means.append(mean)
+        if max(means) - min(means) > 1e-4:
+            raise SystemExit(f"médias divergentes com {agents} agentes: {means}")
+        cells = "  ".join(f"{t * 1000:10.3f}ms" for t in timings)
+        print(f"{agents:>7} {agents * (agents - 1) // 2:>6}  {cells}  {timings[0] / timings[-1]:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
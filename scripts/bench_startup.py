@@ -0,0 +1,66 @@
+"""Benchmark: tempo de importação do CLI do interview assistant.
+
+Roda cada cenário num interpretador novo com `python -X importtime` e mostra o
+menor e o mediano tempo de importação, as dependências pesadas que foram
+carregadas (numpy, sklearn, pdfplumber, python-docx, requests, tkinter,
+faster-whisper, torch, sounddevice) e os módulos mais caros. Sai com código 1
+se o import do CLI passar de `STARTUP_BUDGET_MS`.
+
+Uso:
+    python scripts/bench_startup.py --repeat 5 --top 10
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from utils.importtime import STARTUP_BUDGET_MS, profile_import  # noqa: E402
+
+CLI = "import src.interview_assistant.__main__"
+SCENARIOS = {
+    "cli": CLI,
+    "documents": "import src.interview_assistant.documents.parser as m; m.DocumentParser",
+    "retrieval": "from src.interview_assistant.retrieval.vector_store import VectorStore; "
+    "VectorStore().build_index({'r': ['python async']})",
+    "audio": "from src.interview_assistant.audio.whisper_client import OpenRouterWhisperClient",
+    "ui": "import src.interview_assistant.ui.app",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="módulos mais caros do cenário cli")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{'cenário':<10} {'mín (ms)':>9} {'mediana (ms)':>13}  pesados carregados")
+    cli_profile = None
+    over_budget = False
+    for name in args.scenarios:
+        try:
+            profiles = [profile_import(SCENARIOS[name], cwd=ROOT) for _ in range(args.repeat)]
+        except RuntimeError as exc:
+            print(f"{name:<10} {'-':>9} {'-':>13}  indisponível: {exc}")
+            continue
+        totals = [p.total_ms for p in profiles]
+        best = min(profiles, key=lambda p: p.total_us)
+        print(f"{name:<10} {min(totals):>9.1f} {statistics.median(totals):>13.1f}  {', '.join(best.loaded()) or '-'}")
+        if name == "cli":
+            cli_profile = best
+            over_budget = best.total_ms > STARTUP_BUDGET_MS
+
+    if cli_profile is not None:
+        print(f"\ncli: {cli_profile.total_ms:.1f} ms (orçamento {STARTUP_BUDGET_MS:.0f} ms)")
+        print(f"{'módulo':<55} {'self (ms)':>9}")
+        for module, self_us in cli_profile.heaviest(args.top):
+            print(f"{module:<55} {self_us / 1000:>9.2f}")
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Coleta saídas reais do planner dos logs para o corpus do benchmark de JSON.
+
+Lê os eventos `router_raw_output` (respostas que precisaram de reparo ou não
+puderam ser interpretadas; veja `Router.report_output`) dos logs de execução
+`logs/*.jsonl` e grava cada resposta distinta em `scripts/json_corpus/`,
+nomeada por nó e hash do conteúdo. Respostas cortadas pelo limite do log
+(`ROUTER_LOG_RAW_OUTPUT_CHARS`) são ignoradas.
+
+Uso:
+    python scripts/build_json_corpus.py --logs logs --node planner
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CORPUS_DIR = ROOT / "scripts" / "json_corpus"
+
+
+def iter_raw_outputs(log_dir: Path, node: str = ""):
+    for path in sorted(log_dir.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event") != "router_raw_output" or not event.get("raw"):
+                    continue
+                if node and event.get("node") != node:
+                    continue
+                if event.get("chars", 0) > len(event["raw"]):
+                    continue
+                yield event
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=Path, default=ROOT / "logs")
+    parser.add_argument("--node", default="planner", help="nó do router ('' para todos)")
+    parser.add_argument("--out", type=Path, default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    if not args.logs.is_dir():
+        sys.exit(f"Diretório de logs não encontrado: {args.logs}")
+    args.out.mkdir(parents=True, exist_ok=True)
+    added = seen = 0
+    for event in iter_raw_outputs(args.logs, args.node):
+        seen += 1
+        raw = event["raw"]
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+        target = args.out / f"{event.get('node') or 'output'}_{digest}.txt"
+        if target.exists():
+            continue
+        target.write_text(raw, encoding="utf-8")
+        added += 1
+    print(f"{seen} saídas encontradas, {added} novas em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
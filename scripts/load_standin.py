@@ -0,0 +1,156 @@
+"""Gerador de carga: Router.call e debate_saci_v2 contra o stand-in do OpenRouter.
+
+Sobe `tools.openrouter_standin` no próprio processo (ou usa `--base-url` de um
+stand-in já rodando), aponta `OPENROUTER_BASE_URL`/`OPENAI_BASE_URL` para ele e
+mede, por cenário, vazão e latências p50/p95/p99:
+
+- router: `--calls` chamadas `Router.call` no nó `--node`, `--concurrency` em paralelo
+- saci: `--debates` debates `debate_saci_v2` com `--rounds` rodadas
+
+Nenhum crédito real é gasto. Ao final mostra as contagens do stand-in (200/429/500).
+
+Uso:
+    python scripts/load_standin.py --scenarios router saci --calls 200 --concurrency 16 \\
+        --latency lognormal:300,0.5 --error-rate 0.02 --rate-limit-rate 0.02
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from tools.openrouter_standin import LatencyModel, OpenRouterStandin, StandinConfig  # noqa: E402
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return float("nan")
+    rank = max(1, int(round(p / 100 * len(ordered) + 0.5 - 1e-9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_load(fn, jobs, concurrency):
+    """Run `fn(job)` for every job; returns (latencies of successes, error counts, wall seconds)."""
+    latencies = []
+    errors = Counter()
+
+    def one(job):
+        started = time.perf_counter()
+        try:
+            fn(job)
+        except Exception as exc:  # noqa: BLE001 - contabiliza qualquer falha
+            errors[type(exc).__name__] += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(label, latencies, errors, wall, unit="req"):
+    ordered = sorted(latencies)
+    total = len(ordered) + sum(errors.values())
+    print(
+        f"{label:<7} {total:>5} {unit}  ok={len(ordered):<5} vazão={len(ordered) / wall:7.2f} {unit}/s"
+        f"  p50={percentile(ordered, 50) * 1000:8.1f}ms p95={percentile(ordered, 95) * 1000:8.1f}ms"
+        f" p99={percentile(ordered, 99) * 1000:8.1f}ms"
+        + (f"  média={statistics.mean(ordered) * 1000:.1f}ms" if ordered else "")
+    )
+    if errors:
+        print(f"        erros: {dict(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=["router", "saci"], choices=["router", "saci"])
+    parser.add_argument("--base-url", help="stand-in já em execução (senão sobe um local)")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--node", default="planner")
+    parser.add_argument("--debates", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", default="lognormal:300,0.5")
+    parser.add_argument("--embedding-latency", default="lognormal:80,0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    standin = None
+    base_url = args.base_url
+    if not base_url:
+        config = StandinConfig(
+            latency=LatencyModel.parse(args.latency),
+            embedding_latency=LatencyModel.parse(args.embedding_latency),
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            rpm=args.rpm,
+            retry_after=0.2,
+            seed=args.seed,
+        )
+        standin = OpenRouterStandin(config).start()
+        base_url = standin.base_url
+    workdir = tempfile.mkdtemp(prefix="flashsoft-load-")
+    os.environ.update({
+        "OPENROUTER_BASE_URL": base_url,
+        "OPENAI_BASE_URL": base_url,
+        "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY") or "standin-key",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "standin-key",
+        "LLM_RATE_LIMIT_DIR": os.path.join(workdir, "ratelimit"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+    })
+    print(f"stand-in: {base_url}  (logs em {workdir})")
+    logging.basicConfig(level=logging.WARNING)
+    for name in ("httpx", "httpx2", "openai"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    try:
+        if "router" in args.scenarios:
+            from router import Router
+
+            router = Router(stats_path=os.path.join(workdir, "router_stats.json"))
+            jobs = [f"Tarefa de carga #{i}: descreva o plano." for i in range(args.calls)]
+            latencies, errors, wall = run_load(
+                lambda user: router.call(args.node, "Você é um planner.", user, max_completion=200),
+                jobs,
+                args.concurrency,
+            )
+            report("router", latencies, errors, wall)
+        if "saci" in args.scenarios:
+            from saci.saci_v2 import debate_saci_v2
+
+            def debate(i):
+                debate_saci_v2(
+                    f"load-{i}",
+                    f"Problema de carga #{i}: monolito ou microsserviços?",
+                    max_rodadas=args.rounds,
+                    output_dir=os.path.join(workdir, "saci"),
+                    verbose=False,
+                )
+
+            # debate_saci_v2 imprime o caminho do log mesmo com verbose=False
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies, errors, wall = run_load(debate, range(args.debates), min(args.concurrency, args.debates))
+            report("saci", latencies, errors, wall, unit="debates")
+    finally:
+        if standin is not None:
+            standin.stop()
+            print(f"stand-in: {standin.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
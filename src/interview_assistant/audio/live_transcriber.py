@@ -4,14 +4,18 @@ import queue
 import threading
 import time
 from dataclasses import dataclass
-from typing import Callable, Optional, Protocol
+from functools import lru_cache
+from typing import Any, Callable, Optional, Protocol
 
-import numpy as np
 
-try:
-    import sounddevice as sd
-except ImportError:  # pragma: no cover - dependerá do ambiente
-    sd = None
+@lru_cache(maxsize=1)
+def _sounddevice():
+    """sounddevice carregado só ao abrir o microfone (sem PortAudio levanta OSError)."""
+    try:
+        import sounddevice
+    except (ImportError, OSError):  # pragma: no cover - dependerá do ambiente
+        return None
+    return sounddevice
 
 
 class WhisperClient(Protocol):
@@ -43,7 +47,8 @@ class MicrophoneSource:
     """
 
     def __init__(self, sample_rate: int = 16_000, channels: int = 1, chunk_duration: float = 1.0):
-        if sd is None:
+        self._sd = _sounddevice()
+        if self._sd is None:
             raise RuntimeError(
                 "sounddevice não está disponível. Instale o pacote ou forneça um AudioSource customizado."
             )
@@ -51,11 +56,12 @@ class MicrophoneSource:
         self.channels = channels
         self.chunk_duration = chunk_duration
         self.frames_per_chunk = int(sample_rate * chunk_duration)
-        self._queue: "queue.Queue[np.ndarray]" = queue.Queue(maxsize=5)
-        self._stream: Optional[sd.InputStream] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=5)
+        self._stream: Optional[Any] = None
         self._device_index: Optional[int] = None
 
     def _resolve_wasapi_device(self) -> int:
+        sd = self._sd
         hostapi_index = None
         for idx, api in enumerate(sd.query_hostapis()):
             if "windows wasapi" in api["name"].lower():
@@ -91,7 +97,7 @@ class MicrophoneSource:
         except Exception as exc:
             raise RuntimeError(f"Erro ao localizar dispositivo WASAPI: {exc}") from exc
 
-        self._stream = sd.InputStream(
+        self._stream = self._sd.InputStream(
             samplerate=self.sample_rate,
             channels=self.channels,
             dtype="int16",
@@ -111,6 +117,8 @@ class MicrophoneSource:
             self._queue.get_nowait()
 
     def read_chunk(self, timeout: float | None = None) -> bytes:
+        import numpy as np
+
         data = self._queue.get(timeout=timeout)
         return (data.astype(np.int16)).tobytes()
 
@@ -4,8 +4,6 @@ import wave
 from pathlib import Path
 from typing import Optional
 
-import numpy as np
-
 from .live_transcriber import AudioSource
 
 
@@ -40,5 +38,4 @@ class FileAudioSource(AudioSource):
         frames = self._wave.readframes(self._frames_per_chunk)
         if not frames:
             raise EOFError
-        data = np.frombuffer(frames, dtype=np.int16)
-        return data.tobytes()
+        return bytes(frames)
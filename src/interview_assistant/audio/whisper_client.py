@@ -3,12 +3,11 @@ from __future__ import annotations
 import io
 import os
 import wave
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
-import requests
-
-from .local_whisper import LocalWhisperClient, LocalWhisperConfig
+if TYPE_CHECKING:  # faster-whisper (e torch) só carregam se o fallback local for usado
+    from .local_whisper import LocalWhisperClient
 
 
 class WhisperError(Exception):
@@ -23,7 +22,10 @@ class OpenRouterWhisperClient:
     """
 
     model: str = "openai/whisper-large-v3"
-    base_url: str = "https://openrouter.ai/api/v1/audio/transcriptions"
+    base_url: str = field(
+        default_factory=lambda: os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+        + "/audio/transcriptions"
+    )
     timeout: float = 45.0
     api_key: Optional[str] = None
     _fallback: Optional[LocalWhisperClient] = None
@@ -52,6 +54,8 @@ class OpenRouterWhisperClient:
         return buffer.getvalue()
 
     def _call_remote(self, wav_payload: bytes, sample_rate: int) -> str:
+        import requests
+
         files = {
             "file": ("chunk.wav", wav_payload, "audio/wav"),
         }
@@ -74,6 +78,8 @@ class OpenRouterWhisperClient:
 
     def _ensure_fallback(self) -> LocalWhisperClient:
         if self._fallback is None:
+            from .local_whisper import LocalWhisperClient, LocalWhisperConfig
+
             self._fallback = LocalWhisperClient(
                 LocalWhisperConfig(
                     max_history_seconds=12.0,
@@ -5,9 +5,6 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List
 
-import pdfplumber
-import docx
-
 
 @dataclass
 class ParsedDocument:
@@ -35,6 +32,8 @@ class DocumentParser:
         return cleaned
 
     def parse_pdf(self, path: Path) -> ParsedDocument:
+        import pdfplumber
+
         sections: Dict[str, List[str]] = {}
         try:
             with pdfplumber.open(str(path)) as pdf:
@@ -45,6 +44,8 @@ class DocumentParser:
         return ParsedDocument(sections=sections)
 
     def parse_docx(self, path: Path) -> ParsedDocument:
+        import docx
+
         document = docx.Document(str(path))
         sections: Dict[str, List[str]] = {}
         current_heading = "content"
@@ -5,8 +5,6 @@ import os
 from dataclasses import dataclass
 from typing import Iterable, Sequence
 
-import requests
-
 
 class GenerationError(Exception):
     pass
@@ -64,6 +62,8 @@ class InterviewResponseGenerator:
         jd_chunks: Sequence[str],
         transcript: Iterable[str],
     ) -> dict:
+        import requests
+
         prompt = self.build_prompt(question, resume_chunks, jd_chunks, transcript)
         payload = {
             "model": self.config.model,
@@ -75,8 +75,9 @@ class InterviewResponseGenerator:
             "temperature": self.config.temperature,
             "response_format": {"type": "json_object"},
         }
+        base_url = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
         response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
+            f"{base_url}/chat/completions",
             headers=self._headers(),
             json=payload,
             timeout=60,
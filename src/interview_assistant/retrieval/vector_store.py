@@ -1,11 +1,11 @@
 ﻿from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
 
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+if TYPE_CHECKING:  # sklearn só é importado ao construir o índice
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.neighbors import NearestNeighbors
 
 
 @dataclass
@@ -18,7 +18,7 @@ class RetrievedChunk:
 class VectorStore:
     def __init__(self, top_k: int = 5) -> None:
         self.top_k = top_k
-        self._vectorizer = TfidfVectorizer(stop_words="english")
+        self._vectorizer: Optional[TfidfVectorizer] = None
         self._index: Optional[NearestNeighbors] = None
         self._docs: List[str] = []
         self._metadata: List[str] = []
@@ -34,6 +34,10 @@ class VectorStore:
                     meta.append(source)
         if not texts:
             raise ValueError("Corpus vazio")
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.neighbors import NearestNeighbors
+
+        self._vectorizer = TfidfVectorizer(stop_words="english")
         vectors = self._vectorizer.fit_transform(texts)
         n_neighbors = min(self.top_k, len(texts))
         self._index = NearestNeighbors(n_neighbors=n_neighbors, metric="cosine")
@@ -43,7 +47,7 @@ class VectorStore:
         self._fitted = True
 
     def query(self, question: str) -> List[RetrievedChunk]:
-        if not self._fitted or self._index is None:
+        if not self._fitted or self._index is None or self._vectorizer is None:
             raise RuntimeError("Index ainda nao foi construido")
         query_vec = self._vectorizer.transform([question])
         distances, indices = self._index.kneighbors(query_vec, return_distance=True)
@@ -5,12 +5,16 @@ import threading
 from dataclasses import dataclass
 from pathlib import Path
 from string import Template
-from typing import Iterable, Optional
+from typing import Any, Iterable, Optional
 
-try:
-    import tkinter as tk
-except ImportError:  # pragma: no cover
-    tk = None
+
+def _tkinter() -> Optional[Any]:
+    """tkinter só é carregado quando a janela de overlay é habilitada."""
+    try:
+        import tkinter
+    except ImportError:  # pragma: no cover
+        return None
+    return tkinter
 
 
 OVERLAY_TEMPLATE = Template("""
@@ -97,7 +101,8 @@ class OverlayWindow:
         self.hotkey_toggle = hotkey_toggle
         self.hotkey_ack = hotkey_ack
         self._visible = True
-        self._enable_gui = enable_gui and tk is not None
+        self._tk = _tkinter() if enable_gui else None
+        self._enable_gui = self._tk is not None
         self._lock = threading.Lock()
         self._latest: Optional[OverlayContent] = None
         self._queue: "queue.Queue[tuple[str, Optional[OverlayContent]]]" = queue.Queue()
@@ -125,6 +130,7 @@ class OverlayWindow:
         self._queue.put(("ack", OverlayContent("", [], [])))
 
     def _run_loop(self) -> None:  # pragma: no cover - GUI thread
+        tk = self._tk
         root = tk.Tk()
         root.title("FlashSoft Overlay")
         root.attributes("-topmost", True)
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def make_breaker(**kwargs):
+    changes = []
+    clock = Clock()
+    breaker = CircuitBreaker(
+        failure_threshold=2,
+        cooldown=10,
+        on_change=lambda model, state, info: changes.append((model, state)),
+        clock=clock,
+        **kwargs,
+    )
+    return breaker, clock, changes
+
+
+def test_opens_after_consecutive_failures():
+    breaker, _, changes = make_breaker()
+
+    breaker.record_failure("m", RuntimeError("down"))
+    assert breaker.allow("m")
+    breaker.record_failure("m", RuntimeError("down"))
+
+    assert breaker.state("m") == OPEN
+    assert not breaker.allow("m")
+    assert changes == [("m", OPEN)]
+
+
+def test_success_resets_consecutive_count():
+    breaker, _, _ = make_breaker()
+
+    breaker.record_failure("m", RuntimeError("down"))
+    breaker.record_success("m")
+    breaker.record_failure("m", RuntimeError("down"))
+
+    assert breaker.state("m") == CLOSED
+
+
+def test_rate_limit_opens_immediately_for_retry_after():
+    breaker, clock, _ = make_breaker()
+
+    breaker.record_failure("m", HTTPError(429, {"retry-after": "60"}))
+
+    assert breaker.state("m") == OPEN
+    clock.now = 30
+    assert not breaker.allow("m")
+    clock.now = 61
+    assert breaker.allow("m")
+
+
+def test_client_errors_do_not_trip():
+    breaker, _, _ = make_breaker()
+
+    for _ in range(5):
+        breaker.record_failure("m", HTTPError(400))
+
+    assert breaker.state("m") == CLOSED
+
+
+def test_half_open_admits_single_probe_then_closes():
+    breaker, clock, changes = make_breaker()
+    breaker.record_failure("m", HTTPError(503))
+    breaker.record_failure("m", HTTPError(503))
+    clock.now = 11
+
+    assert breaker.allow("m")
+    assert not breaker.allow("m")  # probe already in flight
+    breaker.record_success("m")
+
+    assert breaker.state("m") == CLOSED
+    assert changes == [("m", OPEN), ("m", HALF_OPEN), ("m", CLOSED)]
+
+
+def test_failed_probe_reopens():
+    breaker, clock, _ = make_breaker()
+    breaker.record_failure("m", HTTPError(503))
+    breaker.record_failure("m", HTTPError(503))
+    clock.now = 11
+
+    assert breaker.allow("m")
+    breaker.record_failure("m", HTTPError(503))
+
+    assert breaker.state("m") == OPEN
+    assert not breaker.allow("m")
+
+
+def test_released_probe_lets_next_one_through():
+    breaker, clock, _ = make_breaker()
+    breaker.record_failure("m", HTTPError(503))
+    breaker.record_failure("m", HTTPError(503))
+    clock.now = 11
+
+    assert breaker.allow("m")
+    breaker.release("m")
+    assert breaker.allow("m")
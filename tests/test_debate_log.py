@@ -0,0 +1,106 @@
+import json
+import threading
+
+from saci.debate_log import DebateLog, events_path, load_debate, snapshot_path, write_json_atomic
+
+
+def rodada(numero, **respostas):
+    return {
+        "numero": numero,
+        "respostas": {key: {"model_name": key, "response": text, "success": True} for key, text in respostas.items()},
+    }
+
+
+def test_snapshot_plus_tail_rebuilds_the_state(tmp_path):
+    log = DebateLog(tmp_path, "d1", {"problema": "p", "consenso": None}, snapshot_every=2)
+    for numero in (1, 2, 3):
+        log.append("rodada", rodada=rodada(numero, a=f"a{numero}", b=f"b{numero}"))
+
+    snapshot = json.loads(snapshot_path(tmp_path, "d1").read_text(encoding="utf-8"))
+    assert [r["numero"] for r in snapshot["rodadas"]] == [1, 2]
+    assert snapshot["log_eventos"]["seq"] == 2
+
+    state = load_debate(tmp_path, "d1")
+    assert [r["numero"] for r in state["rodadas"]] == [1, 2, 3]
+    assert state["rodada_atual"] == 3
+    assert "log_eventos" not in state
+    assert state == {key: value for key, value in log.state.items()}
+
+
+def test_events_are_appended_once(tmp_path):
+    log = DebateLog(tmp_path, "d2", {}, snapshot_every=10)
+    log.append("rodada", rodada=rodada(1, a="x" * 1000))
+    log.append("rodada", rodada=rodada(2, a="y" * 1000))
+    lines = events_path(tmp_path, "d2").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["seq"] for line in lines] == [1, 2]
+    assert sum(line.count("x" * 1000) for line in lines) == 1
+
+
+def test_late_answer_and_final_events(tmp_path):
+    log = DebateLog(tmp_path, "d3", {"consenso": None}, snapshot_every=10)
+    log.append("rodada", rodada=rodada(1, a="a1"))
+    late = {"model_name": "slow", "response": "tarde", "success": True, "atrasado": True, "latencia_s": 9.5}
+    log.append("atrasado", rodada=1, agente="slow", resposta=late)
+    log.append("final", estado={"consenso": False, "solucao_final": None})
+
+    state = load_debate(tmp_path, "d3")
+    assert state["rodadas"][0]["respostas"]["slow"] == late
+    assert state["rodadas"][0]["latencias"] == {"slow": 9.5}
+    assert state["consenso"] is False
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    log = DebateLog(tmp_path, "d4", {}, snapshot_every=10)
+    log.append("rodada", rodada=rodada(1, a="a1"))
+    with open(events_path(tmp_path, "d4"), "ab") as f:
+        f.write(b'{"seq": 2, "tipo": "rodada", "rodada": {"num')
+    assert [r["numero"] for r in load_debate(tmp_path, "d4")["rodadas"]] == [1]
+
+
+def test_legacy_snapshot_without_events(tmp_path):
+    write_json_atomic(snapshot_path(tmp_path, "old"), {"rodadas": [rodada(1, a="a")], "consenso": True})
+    assert load_debate(tmp_path, "old")["consenso"] is True
+    assert load_debate(tmp_path, "missing") is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_readers_never_see_a_partial_snapshot(tmp_path):
+    log = DebateLog(tmp_path, "d5", {}, snapshot_every=1)
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                load_debate(tmp_path, "d5")
+            except ValueError as exc:  # pragma: no cover - só falha se a escrita não for atômica
+                errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for numero in range(1, 30):
+        log.append("rodada", rodada=rodada(numero, a="z" * 5000))
+    stop.set()
+    reader.join()
+    assert errors == []
+    assert len(load_debate(tmp_path, "d5")["rodadas"]) == 29
+
+
+def test_debate_persists_through_the_event_log(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    from saci import saci_v2
+
+    def fetch(model_id, prompt, model_name, cancel=None):
+        return {"model_name": model_name, "response": f"{model_name}: use SQL", "success": True}
+
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fetch)
+    monkeypatch.setattr("saci.convergence_metrics.EMBEDDING_BACKEND", "local")
+    monkeypatch.setattr(saci_v2, "SEMANTIC_CONVERGENCE_THRESHOLD", 2.0)  # nunca converge
+    result = saci_v2.debate_saci_v2("logged", "SQL ou NoSQL?", max_rodadas=3, output_dir=str(tmp_path), verbose=False)
+
+    kinds = [json.loads(line)["tipo"] for line in events_path(tmp_path, "logged").read_text(encoding="utf-8").splitlines()]
+    assert kinds == ["rodada", "rodada", "rodada", "final"]
+    assert load_debate(tmp_path, "logged") == json.loads(json.dumps(result))
+    snapshot = json.loads(snapshot_path(tmp_path, "logged").read_text(encoding="utf-8"))
+    assert snapshot["log_eventos"]["seq"] == 4
+    assert snapshot["consenso"] is False
@@ -0,0 +1,84 @@
+import pytest
+
+from saci import convergence_metrics
+from saci.convergence_metrics import (
+    EmbeddingBackend,
+    LocalEmbeddingBackend,
+    compute_similarity_report,
+    get_embedding_backend,
+    register_embedding_backend,
+)
+
+SIMILAR_A = "Recomendo microsserviços com Kubernetes, pois escalam melhor. O deploy independente reduz riscos."
+SIMILAR_B = "Microsserviços em Kubernetes são a melhor escolha: escalam melhor e o deploy é independente."
+DIFFERENT = "Prefiro um monolito modular em Django. É mais simples de operar para uma equipe pequena."
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(convergence_metrics, "EMBEDDING_BACKEND", "")
+
+
+def test_local_backend_ranks_paraphrases_above_other_answers():
+    report = compute_similarity_report([SIMILAR_A, SIMILAR_B, DIFFERENT], ["a", "b", "c"], LocalEmbeddingBackend())
+    pairs = report.pairs()
+    assert pairs["a|b"] > 0.3
+    assert pairs["a|b"] > pairs["a|c"] and pairs["a|b"] > pairs["b|c"]
+    assert report.outliers() == ["c"]
+
+
+def test_local_backend_handles_short_and_identical_texts():
+    backend = LocalEmbeddingBackend()
+    vectors = backend.embed(["use sql", "use sql"])
+    report = compute_similarity_report(["use sql", "use sql"], backend=backend)
+    assert len(vectors) == 2
+    assert report.mean == pytest.approx(1.0, abs=1e-5)
+    assert len(backend.embed([])) == 0
+
+
+def test_env_var_selects_the_backend(monkeypatch):
+    assert get_embedding_backend().name == "openrouter"
+    assert get_embedding_backend(default="openai").name == "openai"
+    monkeypatch.setattr(convergence_metrics, "EMBEDDING_BACKEND", "local")
+    assert isinstance(get_embedding_backend(default="openai"), LocalEmbeddingBackend)
+    # sem rede e sem chave de API
+    assert 0.0 <= convergence_metrics.compute_semantic_similarity([SIMILAR_A, SIMILAR_B]) <= 1.0
+    with pytest.raises(ValueError):
+        get_embedding_backend("nope")
+
+
+def test_custom_backend_can_be_registered(monkeypatch):
+    class Constant(EmbeddingBackend):
+        name = "constant"
+
+        def embed(self, texts):
+            return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setitem(convergence_metrics.EMBEDDING_BACKENDS, "constant", Constant)
+    register_embedding_backend("Constant", Constant)
+    assert compute_similarity_report(["x", "y"], backend=get_embedding_backend("constant")).mean == pytest.approx(1.0)
+
+
+def test_saci_round_converges_offline_with_local_backend(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")  # llm_client exige a chave na importação
+    from saci import saci_v2
+
+    monkeypatch.setattr(convergence_metrics, "EMBEDDING_BACKEND", "local")
+    respostas = {
+        "a": {"success": True, "response": SIMILAR_A},
+        "b": {"success": True, "response": SIMILAR_B},
+        "c": {"success": True, "response": DIFFERENT},
+    }
+    score, report = saci_v2._calculate_semantic_convergence(respostas)
+    assert 0.0 < score < 1.0
+    assert report.outliers() == ["c"]
+
+
+def test_backend_without_embed_fails_on_creation():
+    class Incomplete(EmbeddingBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
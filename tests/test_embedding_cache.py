@@ -0,0 +1,68 @@
+import numpy as np
+
+from utils.embedding_cache import EmbeddingCache, embedding_key
+
+MODEL = "text-embedding-3-small"
+
+
+def vec(*values):
+    return [float(v) for v in values]
+
+
+def test_texts_sharing_a_prefix_do_not_collide(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    prefix = "x" * 100
+    cache.put_many(MODEL, [prefix + "a", prefix + "b"], [vec(1, 0), vec(0, 1)])
+    assert cache.get(MODEL, prefix + "a").tolist() == [1.0, 0.0]
+    assert cache.get(MODEL, prefix + "b").tolist() == [0.0, 1.0]
+    assert embedding_key(MODEL, "t") != embedding_key("other-model", "t")
+    assert cache.get("other-model", prefix + "a") is None
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path, memory_entries=2)
+    cache.put_many(MODEL, ["a", "b"], [vec(1), vec(2)])
+    cache.get(MODEL, "a")
+    cache.put_many(MODEL, ["c"], [vec(3)])
+    assert list(cache._memory) == [embedding_key(MODEL, "a"), embedding_key(MODEL, "c")]
+    # "b" left memory but is still on disk
+    assert cache.get(MODEL, "b").tolist() == [2.0]
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_survives_restart_and_is_shared(tmp_path):
+    writer = EmbeddingCache(tmp_path)
+    reader = EmbeddingCache(tmp_path)
+    assert reader.get(MODEL, "a") is None
+    writer.put_many(MODEL, ["a", "b"], [vec(1, 2, 3), vec(4, 5, 6)])
+    writer.put_many(MODEL, ["c"], [vec(7, 8, 9)])
+    assert reader.get(MODEL, "c").tolist() == [7.0, 8.0, 9.0]
+    restarted = EmbeddingCache(tmp_path)
+    vectors = restarted.get_many(MODEL, ["b", "a", "z"])
+    assert [v.tolist() if v is not None else None for v in vectors] == [vec(4, 5, 6), vec(1, 2, 3), None]
+    assert vectors[0].dtype == np.float32
+    stats = restarted.stats()
+    assert (stats["disk_hits"], stats["misses"], stats["hit_rate"]) == (2, 1, round(2 / 3, 4))
+
+
+def test_oversized_shard_is_compacted_to_recent_rows(tmp_path):
+    cache = EmbeddingCache(tmp_path, memory_entries=1, max_bytes=4 * 2 * 8)
+    texts = [f"t{i}" for i in range(10)]
+    cache.put_many(MODEL, texts, [vec(i, i) for i in range(10)])
+    other = EmbeddingCache(tmp_path)
+    assert other.get(MODEL, "t9").tolist() == [9.0, 9.0]
+    assert other.get(MODEL, "t0") is None
+    assert sorted(p.name for p in tmp_path.glob("2-*")) == ["2-1.f32", "2-1.idx"]
+    cache.put_many(MODEL, ["new"], [vec(-1, -1)])
+    assert EmbeddingCache(tmp_path).get(MODEL, "new").tolist() == [-1.0, -1.0]
+
+
+def test_compaction_keeps_recently_read_rows(tmp_path):
+    cache = EmbeddingCache(tmp_path, memory_entries=1, max_bytes=4 * 2 * 8)
+    cache.put_many(MODEL, [f"t{i}" for i in range(8)], [vec(i, i) for i in range(8)])
+    assert cache.get(MODEL, "t0").tolist() == [0.0, 0.0]
+    cache.put_many(MODEL, ["t8"], [vec(8, 8)])  # 9 rows > 8: compacts
+    other = EmbeddingCache(tmp_path)
+    assert other.get(MODEL, "t0").tolist() == [0.0, 0.0]
+    assert other.get(MODEL, "t1") is None
+    assert other.get(MODEL, "t8").tolist() == [8.0, 8.0]
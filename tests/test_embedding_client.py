@@ -0,0 +1,162 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError
+
+import embedding_client
+from embedding_client import get_embeddings
+from utils.embedding_cache import EmbeddingCache
+
+
+def bad_request():
+    request = httpx.Request("POST", "https://example.test/embeddings")
+    return BadRequestError("too many tokens", response=httpx.Response(400, request=request), body=None)
+
+
+class FakeEmbeddings:
+    """Vector = [len(text)]; `script` supplies an exception or "partial" per call."""
+
+    def __init__(self, script=()):
+        self.calls = []
+        self.script = list(script)
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        step = self.script.pop(0) if self.script else None
+        if isinstance(step, BaseException):
+            raise step
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        if step == "partial":
+            data = data[::2]
+        return SimpleNamespace(data=data)
+
+
+def fake_client(script=()):
+    return SimpleNamespace(embeddings=FakeEmbeddings(script))
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(embedding_client.time, "sleep", lambda s: None)
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings", memory_entries=16)
+    monkeypatch.setattr(embedding_client, "_cache", cache)
+    return cache
+
+
+def test_one_request_keeps_order_and_dedupes():
+    client = fake_client()
+    texts = ["a", "bbb", "a", "cc\ncc"]
+    assert get_embeddings(texts, client=client) == [[1.0], [3.0], [1.0], [5.0]]
+    assert client.embeddings.calls == [["a", "bbb", "cc cc"]]
+
+
+def test_seen_texts_come_from_the_cache(cache):
+    client = fake_client()
+    get_embeddings(["a", "bb"], client=client)
+    assert get_embeddings(["bb", "ccc", "a"], client=client) == [[2.0], [3.0], [1.0]]
+    assert client.embeddings.calls == [["a", "bb"], ["ccc"]]
+    assert cache.stats()["memory_hits"] == 2
+
+
+def test_splits_by_batch_size():
+    client = fake_client()
+    texts = [f"text {i}" for i in range(5)]
+    assert get_embeddings(texts, batch_size=2, client=client) == [[6.0]] * 5
+    assert [len(call) for call in client.embeddings.calls] == [2, 2, 1]
+
+
+def test_splits_by_token_budget(monkeypatch):
+    monkeypatch.setattr(embedding_client, "EMBEDDING_BATCH_TOKENS", 3)
+    client = fake_client()
+    get_embeddings(["one two", "three four", "five"], client=client)
+    assert len(client.embeddings.calls) > 1
+
+
+def test_bad_request_bisects_the_batch():
+    client = fake_client([bad_request()])
+    assert get_embeddings(["a", "bb", "ccc", "dddd"], client=client) == [[1.0], [2.0], [3.0], [4.0]]
+    assert client.embeddings.calls == [["a", "bb", "ccc", "dddd"], ["a", "bb"], ["ccc", "dddd"]]
+
+
+def test_failed_batch_is_retried_without_redoing_the_others():
+    client = fake_client([None, ConnectionError("reset")])
+    assert get_embeddings(["a", "bb", "ccc"], batch_size=2, client=client) == [[1.0], [2.0], [3.0]]
+    assert client.embeddings.calls == [["a", "bb"], ["ccc"], ["ccc"]]
+
+
+def test_partial_response_resends_only_missing_inputs():
+    client = fake_client(["partial"])
+    assert get_embeddings(["a", "bb", "ccc", "dddd"], client=client) == [[1.0], [2.0], [3.0], [4.0]]
+    assert client.embeddings.calls[1] == ["bb", "dddd"]
+
+
+def test_gives_up_after_retries():
+    client = fake_client([ConnectionError("down")] * (embedding_client.EMBEDDING_BATCH_RETRIES + 1))
+    with pytest.raises(ConnectionError):
+        get_embeddings(["a"], client=client)
+
+
+def test_rejects_empty_text():
+    with pytest.raises(ValueError):
+        get_embeddings(["ok", "  "], client=fake_client())
+
+
+def test_saci_round_is_one_embeddings_request(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    from saci import saci_v2
+
+    calls = []
+
+    def fake_get_embeddings(texts):
+        calls.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr("saci.convergence_metrics.EMBEDDING_BACKEND", "")
+    monkeypatch.setattr("saci.convergence_metrics.get_embeddings", fake_get_embeddings)
+    respostas = {
+        "a": {"success": True, "response": "x"},
+        "b": {"success": True, "response": "y"},
+        "c": {"success": True, "response": "z"},
+        "d": {"success": False, "response": ""},
+    }
+    score, report = saci_v2._calculate_semantic_convergence(respostas)
+    assert calls == [["x", "y", "z"]]
+    assert score == pytest.approx(1.0)
+    assert report.labels == ["a", "b", "c"]
+
+
+def test_split_text_packs_paragraphs_under_the_budget():
+    paragraphs = [" ".join(f"p{i}w{j}" for j in range(40)) for i in range(6)]
+    text = "\n\n".join(paragraphs)
+    chunks = embedding_client.split_text(text, max_tokens=150)
+    assert 1 < len(chunks) < len(paragraphs)
+    assert all(embedding_client.count_tokens(chunk) <= 150 for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+    assert embedding_client.split_text("short", max_tokens=150) == ["short"]
+
+
+def test_split_text_cuts_oversized_paragraph_on_token_boundaries():
+    text = "intro\n\n" + " ".join(f"w{j}" for j in range(1000))
+    chunks = embedding_client.split_text(text, max_tokens=100)
+    assert chunks[0] == "intro"
+    assert all(embedding_client.count_tokens(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks[1:]).split() == text.split()[1:]
+
+
+def test_long_text_is_chunked_pooled_and_sent_in_one_request():
+    client = fake_client()
+    long_text = "\n\n".join(["aaaa " * 60, "bb " * 60])
+    items = embedding_client.get_chunked_embeddings(["x", long_text], client=client, max_tokens=100)
+    assert len(client.embeddings.calls) == 1
+    short, pooled = items
+    assert short.vector == [1.0] and short.chunks == ["x"]
+    assert len(pooled.chunks) == 2
+    lengths = [len(chunk) for chunk in pooled.chunks]
+    expected = sum(w * n for w, n in zip(pooled.weights, lengths)) / sum(pooled.weights)
+    assert pooled.chunk_vectors == [[float(n)] for n in lengths]
+    assert pooled.vector == [pytest.approx(expected)]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from saci import convergence_metrics
+from saci.convergence_metrics import EmbeddingBackend, LocalEmbeddingBackend
+from saci.embedding_store import DebateEmbeddingStore
+
+VECTORS = {
+    "sql": [1.0, 0.0, 0.0],
+    "sql!": [0.9, 0.1, 0.0],
+    "nosql": [0.0, 1.0, 0.0],
+    "graph": [0.0, 0.0, 1.0],
+}
+
+
+class Fixed(EmbeddingBackend):
+    name = "fixed"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [VECTORS[text] for text in texts]
+
+
+def test_only_new_responses_are_embedded():
+    backend = Fixed()
+    store = DebateEmbeddingStore(backend)
+    store.add_round({"a": "sql", "b": "sql", "c": "nosql"})
+    store.add_round({"a": "sql", "b": "sql!", "c": "nosql"})
+    assert backend.calls == [["sql", "nosql"], ["sql!"]]
+    assert (store.last_embedded, store.last_reused) == (1, 2)
+    assert (store.embedded, store.reused) == (3, 3)
+
+
+def test_drift_against_previous_round_and_centroid():
+    store = DebateEmbeddingStore(Fixed())
+    store.add_round({"a": "sql", "b": "nosql"})
+    first = store.drift()
+    assert first["a"]["rodada_anterior"] is None
+    assert first["a"]["centroide"] == pytest.approx(first["b"]["centroide"])
+
+    store.add_round({"a": "sql", "b": "graph", "c": "sql!"})
+    drift = store.drift()
+    assert drift["a"]["rodada_anterior"] == pytest.approx(0.0)
+    assert drift["b"]["rodada_anterior"] == pytest.approx(1.0)
+    assert drift["c"]["rodada_anterior"] is None
+    # "graph" is the one holding out from the group
+    assert drift["b"]["centroide"] > max(drift["a"]["centroide"], drift["c"]["centroide"])
+
+
+def test_local_backend_embeds_previous_round_in_the_same_call():
+    store = DebateEmbeddingStore(LocalEmbeddingBackend())
+    store.add_round({"a": "Use PostgreSQL para os pedidos.", "b": "Use MongoDB para tudo."})
+    store.add_round({"a": "Use PostgreSQL para os pedidos.", "b": "Use PostgreSQL com réplicas de leitura."})
+    drift = store.drift()
+    assert drift["a"]["rodada_anterior"] == pytest.approx(0.0, abs=1e-5)
+    assert drift["b"]["rodada_anterior"] > 0.1
+    assert store.last_reused == 0
+
+
+def test_debate_records_drift_per_round(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    from saci import saci_v2
+
+    answers = iter([
+        {"a": "sql", "b": "nosql", "c": "graph"},
+        {"a": "sql", "b": "sql!", "c": "graph"},
+    ])
+
+    def collect(prompt, verbose, models, **quorum):
+        return {
+            agent: {"model_name": agent, "response": text, "success": True}
+            for agent, text in next(answers).items()
+        }
+
+    backend = Fixed()
+    monkeypatch.setattr(saci_v2, "_collect_responses", collect)
+    monkeypatch.setitem(convergence_metrics.EMBEDDING_BACKENDS, "fixed", lambda: backend)
+    monkeypatch.setattr(convergence_metrics, "EMBEDDING_BACKEND", "fixed")
+    saci_v2.debate_saci_v2("drift", "SQL ou NoSQL?", max_rodadas=2, output_dir=str(tmp_path), verbose=False)
+
+    rounds = json.loads((tmp_path / "drift.json").read_text(encoding="utf-8"))["rodadas"]
+    second = rounds[1]["analise_convergencia"]
+    assert second["embeddings"] == {"novos": 1, "reutilizados": 2}
+    assert second["drift"]["a"]["rodada_anterior"] == pytest.approx(0.0)
+    assert second["drift"]["b"]["rodada_anterior"] > 0.5
+    assert backend.calls == [["sql", "nosql", "graph"], ["sql!"]]
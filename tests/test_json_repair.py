@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from json_sanitizer import JSONSanitizerAgent, safe_json_extract_v2
+from utils.json_repair import repair_json
+
+CORPUS_DIR = Path(__file__).resolve().parents[1] / "scripts" / "json_corpus"
+KEYS = ["patches", "test_plan"]
+
+
+def test_valid_json_needs_no_repairs():
+    payload = {"patches": [{"path": "a.py", "content": "x = {'a': 1}\n"}], "test_plan": ["pytest"]}
+
+    result = repair_json(json.dumps(payload), KEYS)
+
+    assert result.value == payload
+    assert result.repairs == []
+
+
+def test_markdown_fence_and_prose():
+    text = 'Aqui está:\n```json\n{"patches": [], "test_plan": []}\n```\nQualquer dúvida, avise.'
+
+    result = repair_json(text, KEYS)
+
+    assert result.value == {"patches": [], "test_plan": []}
+    assert result.repairs == ["markdown_fence", "surrounding_text"]
+
+
+def test_trailing_and_missing_commas():
+    result = repair_json('{"patches": [1 2,], "test_plan": [],}', KEYS)
+
+    assert result.value == {"patches": [1, 2], "test_plan": []}
+    assert set(result.repairs) == {"missing_comma", "trailing_comma"}
+
+
+def test_comments_outside_strings_only():
+    text = '{\n  // novo\n  "patches": ["http://a/b /* x */"], /* fim */\n  "test_plan": []\n}'
+
+    result = repair_json(text, KEYS)
+
+    assert result.value["patches"] == ["http://a/b /* x */"]
+    assert result.repairs == ["comments"]
+
+
+def test_single_quotes_unquoted_keys_and_python_literals():
+    result = repair_json("{'patches': [], test_plan: ['it''s'], 'ok': True, 'x': None}", KEYS)
+
+    assert result.value["ok"] is True and result.value["x"] is None
+    assert {"single_quotes", "unquoted_key", "python_literal"} <= set(result.repairs)
+
+
+def test_raw_newlines_inside_strings():
+    result = repair_json('{"patches": [{"content": "a\n\tb"}], "test_plan": []}', KEYS)
+
+    assert result.value["patches"][0]["content"] == "a\n\tb"
+    assert result.repairs == ["control_character"]
+
+
+def test_truncated_output_is_closed():
+    text = '{"patches": [{"path": "a.py", "content": "print(1)\\n'
+
+    result = repair_json(text, ["patches"])
+
+    assert result.value == {"patches": [{"path": "a.py", "content": "print(1)\n"}]}
+    assert result.repairs == ["unterminated_string", "unterminated_container"]
+
+
+def test_skips_prose_braces_and_objects_without_expected_keys():
+    text = 'Use {placeholders} e {"other": 1} antes de {"patches": [], "test_plan": []}'
+
+    assert repair_json(text, KEYS).value == {"patches": [], "test_plan": []}
+
+
+def test_raises_when_nothing_is_recoverable():
+    with pytest.raises(ValueError):
+        repair_json("sem json aqui", KEYS)
+    with pytest.raises(ValueError):
+        repair_json('{"other": 1}', KEYS)
+
+
+def test_sanitizer_reports_repairs():
+    agent = JSONSanitizerAgent()
+
+    assert agent.sanitize('{"patches": [], "test_plan": [],}', KEYS) == {"patches": [], "test_plan": []}
+    assert agent.last_repairs == ["trailing_comma"]
+    assert agent.sanitize("nada", KEYS) is None
+    with pytest.raises(ValueError):
+        safe_json_extract_v2("nada", KEYS)
+
+
+@pytest.mark.parametrize("path", sorted(CORPUS_DIR.glob("*.txt")), ids=lambda p: p.stem)
+def test_corpus_is_recoverable(path):
+    result = repair_json(path.read_text(encoding="utf-8"), KEYS)
+
+    assert isinstance(result.value["patches"], list)
+    assert path.stem == "planner_valid" or result.repairs
+
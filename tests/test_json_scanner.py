@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from utils.json_scanner import JSONObjectScanner, find_json_object, scan_stream
+
+
+def test_ignores_braces_inside_strings():
+    payload = {"patches": [{"path": "a.py", "content": "def f():\n    return {'x': '}'}\n"}]}
+    text = "Segue o plano:\n" + json.dumps(payload) + "\nfim"
+
+    assert find_json_object(text) == payload
+
+
+def test_handles_escaped_quotes_and_backslashes():
+    payload = {"content": 'print("{") \\ "}" \\\\', "n": 1}
+
+    assert find_json_object("x " + json.dumps(payload)) == payload
+
+
+def test_skips_objects_without_expected_keys():
+    text = 'Exemplo: {"example": true}. Resposta: {"patches": [], "test_plan": []}'
+
+    assert find_json_object(text, expected_keys=["patches"]) == {"patches": [], "test_plan": []}
+    assert find_json_object(text) == {"example": True}
+
+
+def test_skips_invalid_candidates():
+    text = 'use {placeholder} e depois {"ok": 1}'
+
+    assert find_json_object(text) == {"ok": 1}
+
+
+def test_recovers_from_unclosed_brace_in_prose():
+    text = 'o caractere { abre blocos. JSON: {"ok": 1}'
+
+    assert find_json_object(text) == {"ok": 1}
+
+
+def test_returns_none_without_object():
+    assert find_json_object("sem json aqui") is None
+    assert find_json_object('{"truncado": ') is None
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_incremental_feed_matches_one_shot(size):
+    payload = {"patches": [{"path": "x.py", "content": 'a = "\\"{"\nb = "}\\\\"'}], "test_plan": ["t"]}
+    text = "prefixo {nao json} " + json.dumps(payload) + " sufixo"
+    scanner = JSONObjectScanner(expected_keys=["patches"])
+
+    results = [scanner.feed(text[i : i + size]) for i in range(0, len(text), size)]
+
+    assert scanner.result == payload
+    assert results[-1] == payload
+
+
+def test_scan_stream_stops_consuming_after_object():
+    consumed = []
+
+    def deltas():
+        for piece in ['{"a": ', "1}", " trailing", " text"]:
+            consumed.append(piece)
+            yield piece
+
+    assert scan_stream(deltas()) == {"a": 1}
+    assert consumed == ['{"a": ', "1}"]
+
+
+def test_parses_each_top_level_candidate_once():
+    text = "".join("{bad %d}" % i for i in range(50)) + '{"ok": true}'
+    scanner = JSONObjectScanner()
+
+    assert scanner.feed(text) == {"ok": True}
+    assert scanner.candidates == 51
+
+
+def test_safe_json_extract_prefers_object_with_expected_keys(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    from llm_client import safe_json_extract
+
+    text = 'Exemplo {"x": 1}\n{"patches": [{"content": "if a {"}]}'
+
+    assert safe_json_extract(text, expected_keys=["patches"]) == {"patches": [{"content": "if a {"}]}
+    assert safe_json_extract(text) == {"x": 1}
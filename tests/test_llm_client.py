@@ -0,0 +1,485 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.rate_limiter import RateLimit, RateLimiter
+
+with pytest.MonkeyPatch.context() as _mp:  # llm_client exige a chave na importação
+    _mp.setenv("OPENROUTER_API_KEY", "test-key")
+    import llm_client
+
+
+@pytest.fixture(autouse=True)
+def _clean_pool(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "POOL_ENABLED", True)
+    monkeypatch.setattr(llm_client, "_rate_limiter", RateLimiter({}, state_dir=tmp_path / "rate"))
+    llm_client.reset_pool()
+    yield
+    llm_client.reset_pool()
+
+
+def _completion(content: str, usage=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage
+    )
+
+
+class FakeStream:
+    def __init__(self, pieces, completion_tokens=None, delay: float = 0.0):
+        self.pieces = pieces
+        self.completion_tokens = completion_tokens
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for piece in self.pieces:
+            await asyncio.sleep(self.delay)
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        if self.completion_tokens is not None:
+            usage = SimpleNamespace(completion_tokens=self.completion_tokens)
+            yield SimpleNamespace(choices=[], usage=usage)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """Substitui `client.chat.completions` registrando a concorrência observada."""
+
+    def __init__(self, delay: float = 0.0, content: str = "ok"):
+        self.delay = delay
+        self.content = content
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = []
+        self.stream = None
+        self.stream_tokens = None
+        self.usage = None
+        self.error = None
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        if kwargs.get("stream"):
+            self.stream = FakeStream(
+                self.content.split(" "), completion_tokens=self.stream_tokens, delay=self.delay
+            )
+            return self.stream
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return _completion(self.content, self.usage)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_completions(monkeypatch):
+    fake = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+    monkeypatch.setattr(llm_client, "get_client", lambda: client)
+    return fake
+
+
+def test_get_client_reuses_pooled_instance():
+    first = llm_client.get_client()
+    second = llm_client.get_client()
+    assert first is second
+    assert llm_client.pool_stats()["size"] == 1
+
+
+def test_pool_is_keyed_by_base_url_and_timeout():
+    default = llm_client.get_client()
+    other_timeout = llm_client.get_client(timeout=5)
+    other_url = llm_client.get_client(base_url="http://127.0.0.1:9/v1")
+    assert default is not other_timeout
+    assert default is not other_url
+    assert llm_client.pool_stats()["size"] == 3
+
+
+def test_pool_is_keyed_by_event_loop():
+    async def _client():
+        return llm_client.get_client()
+
+    assert asyncio.run(_client()) is not llm_client.get_client()
+
+
+def test_pool_disabled_creates_client_per_call(monkeypatch):
+    monkeypatch.setattr(llm_client, "POOL_ENABLED", False)
+    assert llm_client.get_client() is not llm_client.get_client()
+    assert llm_client.pool_stats()["size"] == 0
+
+
+def test_timeout_evicts_client_from_pool(monkeypatch):
+    async def _hang(**kwargs):
+        raise llm_client.APITimeoutError(request=None)
+
+    async def scenario():
+        first = llm_client.get_client()
+        monkeypatch.setattr(first.chat.completions, "create", _hang)
+        with pytest.raises(llm_client.APITimeoutError):
+            await llm_client._acreate_completion("m", "s", "u", max_tokens=1)
+        await asyncio.sleep(0.01)  # lets the scheduled close run
+        return first, llm_client.get_client()
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+    assert first.is_closed()
+
+
+def test_evicted_client_closes_after_in_flight_requests(monkeypatch):
+    async def scenario():
+        client = llm_client.get_client()
+        closed = asyncio.Event()
+
+        async def _close():
+            closed.set()
+
+        monkeypatch.setattr(client, "close", _close)
+        with llm_client._in_use(client):
+            llm_client._evict(client)
+            await asyncio.sleep(0.01)
+            assert not closed.is_set()
+        await asyncio.wait_for(closed.wait(), 1)
+
+    asyncio.run(scenario())
+
+
+def test_client_evicted_while_throttled_is_not_used(monkeypatch):
+    class ClosableClient:
+        def __init__(self):
+            self.closed = False
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+        async def create(self, **kwargs):
+            if self.closed:
+                raise RuntimeError("client closed")
+            return _completion("ok")
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(llm_client, "_new_client", lambda *args, **kwargs: ClosableClient())
+
+    async def slow_throttle(*args):
+        stale = llm_client.get_client()
+        llm_client._evict(stale)  # another request hit a hang meanwhile
+        await asyncio.sleep(0.01)
+        assert stale.closed
+        return None
+
+    monkeypatch.setattr(llm_client, "_throttle", slow_throttle)
+
+    async def scenario():
+        return await llm_client._acreate_completion("m", "s", "u", max_tokens=1)
+
+    assert asyncio.run(scenario()).choices[0].message.content == "ok"
+
+
+def test_evict_keeps_replacement_client():
+    stale = llm_client.get_client()
+    llm_client._evict(stale)
+    fresh = llm_client.get_client()
+    llm_client._evict(stale)
+    assert llm_client.get_client() is fresh
+
+
+def test_sync_chat_wraps_async_core(fake_completions):
+    assert llm_client.chat("m", "s", "u") == "ok"
+    assert fake_completions.calls[0]["model"] == "m"
+    assert "response_format" not in fake_completions.calls[0]
+
+    llm_client.chat_json("m", "s", "u")
+    assert fake_completions.calls[1]["response_format"] == {"type": "json_object"}
+
+
+def test_concurrency_limiter_bounds_in_flight_requests(fake_completions, monkeypatch):
+    fake_completions.delay = 0.02
+    monkeypatch.setattr(llm_client, "MAX_CONCURRENCY", llm_client.MAX_CONCURRENCY)
+    llm_client.set_max_concurrency(2)
+
+    async def scenario():
+        return await asyncio.gather(*(llm_client.achat("m", "s", f"u{i}") for i in range(6)))
+
+    assert asyncio.run(scenario()) == ["ok"] * 6
+    assert fake_completions.peak == 2
+
+
+def test_cancelled_achat_releases_limiter(fake_completions, monkeypatch):
+    fake_completions.delay = 10
+    monkeypatch.setattr(llm_client, "MAX_CONCURRENCY", llm_client.MAX_CONCURRENCY)
+    llm_client.set_max_concurrency(1)
+
+    async def scenario():
+        task = asyncio.create_task(llm_client.achat("m", "s", "u"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        fake_completions.delay = 0
+        return await asyncio.wait_for(llm_client.achat("m", "s", "u"), timeout=1)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert fake_completions.in_flight == 0
+
+
+def test_chat_stream_yields_deltas_and_reports_metrics(fake_completions):
+    fake_completions.content = "a b c"
+    fake_completions.stream_tokens = 3
+    metrics = {}
+
+    deltas = list(llm_client.chat_stream("m", "s", "u", on_metrics=metrics.update))
+
+    assert deltas == ["a", "b", "c"]
+    assert fake_completions.calls[0]["stream_options"] == {"include_usage": True}
+    assert fake_completions.stream.closed
+    assert metrics["model"] == "m"
+    assert metrics["completion_tokens"] == 3
+    assert metrics["usage_reported"] is True
+    assert metrics["completed"] is True
+    assert metrics["ttft_s"] is not None and metrics["ttft_s"] >= 0
+
+
+def test_chat_stream_estimates_tokens_without_usage(fake_completions):
+    fake_completions.content = "x y"
+    metrics = {}
+
+    "".join(llm_client.chat_stream("m", "s", "u", on_metrics=metrics.update))
+
+    assert metrics["usage_reported"] is False
+    assert metrics["completion_tokens"] == 2
+
+
+def test_chat_stream_early_close_closes_upstream(fake_completions):
+    fake_completions.content = "a b c d"
+    fake_completions.delay = 0.05
+    metrics = {}
+
+    stream = llm_client.chat_stream("m", "s", "u", on_metrics=metrics.update)
+    assert next(stream) == "a"
+    stream.close()
+
+    for _ in range(100):
+        if metrics:
+            break
+        llm_client.run_sync(asyncio.sleep(0.01))
+    assert fake_completions.stream.closed
+    assert metrics["completed"] is False
+
+
+def test_identical_concurrent_requests_share_one_upstream_call(fake_completions):
+    fake_completions.delay = 0.05
+    fake_completions.usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    before = llm_client.coalesce_stats()
+    usages = []
+
+    async def scenario():
+        return await asyncio.gather(
+            *(llm_client.achat("m", "s", "u", on_usage=usages.append) for _ in range(4))
+        )
+
+    assert asyncio.run(scenario()) == ["ok"] * 4
+    assert len(fake_completions.calls) == 1
+    after = llm_client.coalesce_stats()
+    assert after["coalesced"] - before["coalesced"] == 3
+    assert sorted(u["total_tokens"] for u in usages) == [0, 0, 0, 15]
+    assert sum(1 for u in usages if u.get("coalesced")) == 3
+
+
+def test_different_parameters_are_not_coalesced(fake_completions):
+    fake_completions.delay = 0.02
+
+    async def scenario():
+        return await asyncio.gather(
+            llm_client.achat("m", "s", "u"),
+            llm_client.achat("m", "s", "u", temperature=0.7),
+            llm_client.achat_json("m", "s", "u"),
+        )
+
+    asyncio.run(scenario())
+    assert len(fake_completions.calls) == 3
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call(fake_completions):
+    fake_completions.delay = 0.05
+
+    async def scenario():
+        first = asyncio.create_task(llm_client.achat("m", "s", "u"))
+        second = asyncio.create_task(llm_client.achat("m", "s", "u"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "ok"
+    assert len(fake_completions.calls) == 1
+
+
+def test_shared_call_is_cancelled_when_every_waiter_leaves(fake_completions):
+    fake_completions.delay = 10
+
+    async def scenario():
+        tasks = [asyncio.create_task(llm_client.achat("m", "s", "u")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        return fake_completions.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_coalescing_can_be_disabled(fake_completions, monkeypatch):
+    monkeypatch.setattr(llm_client, "COALESCE_ENABLED", False)
+    fake_completions.delay = 0.02
+
+    async def scenario():
+        return await asyncio.gather(*(llm_client.achat("m", "s", "u") for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert len(fake_completions.calls) == 3
+
+
+def test_cancel_scope_aborts_in_flight_sync_call(fake_completions):
+    import threading
+
+    fake_completions.delay = 10
+    scope = llm_client.CancelScope()
+    errors = []
+
+    def call():
+        try:
+            llm_client.chat("m", "system prompt", "user prompt", cancel=scope)
+        except llm_client.ChatCancelled as exc:
+            errors.append(exc)
+
+    worker = threading.Thread(target=call)
+    worker.start()
+    for _ in range(100):
+        if fake_completions.in_flight:
+            break
+        llm_client.run_sync(asyncio.sleep(0.01))
+    result = scope.cancel()
+    worker.join(timeout=1)
+
+    assert not worker.is_alive()
+    assert len(errors) == 1
+    assert result["calls"] == 1 and result["prompt_tokens"] > 0
+    for _ in range(100):
+        if not fake_completions.in_flight:
+            break
+        llm_client.run_sync(asyncio.sleep(0.01))
+    assert fake_completions.in_flight == 0
+    assert scope.stats() == {"calls": 1, "prompt_tokens": result["prompt_tokens"], "in_flight": 0}
+
+
+def test_cancelled_scope_does_not_send_new_calls(fake_completions):
+    scope = llm_client.CancelScope()
+    scope.cancel()
+    with pytest.raises(llm_client.ChatCancelled):
+        llm_client.chat_json("m", "s", "u", cancel=scope)
+    assert fake_completions.calls == []
+
+
+def test_named_scopes_can_be_cancelled_from_outside():
+    assert llm_client.cancel_scope("missing") is None
+    scope = llm_client.open_scope("debate_x")
+    assert llm_client.cancel_scope("debate_x") == {"calls": 0, "prompt_tokens": 0}
+    assert scope.cancelled
+    llm_client.close_scope(scope)
+    assert llm_client.cancel_scope("debate_x") is None
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("429")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+
+def test_rate_limit_delays_calls_beyond_allowance(fake_completions, monkeypatch, tmp_path):
+    # Frozen clock: the bucket can't refill while it is being drained.
+    limiter = RateLimiter(
+        {"m": RateLimit(rpm=600)}, state_dir=tmp_path / "rpm", clock=lambda: 1000.0
+    )  # 1 every 0.1s
+    monkeypatch.setattr(llm_client, "_rate_limiter", limiter)
+    for _ in range(600):
+        limiter.reserve("m")  # drain the bucket
+
+    llm_client.chat("m", "s", "u")
+
+    assert limiter.snapshot()["throttled"] >= 1
+    assert len(fake_completions.calls) == 1
+
+
+def test_429_pauses_model_for_retry_after(fake_completions, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 1)
+    fake_completions.error = RateLimited(retry_after=30)
+
+    with pytest.raises(Exception):
+        llm_client.chat("m", "s", "u")
+
+    limiter = llm_client.get_rate_limiter()
+    assert limiter.snapshot()["rate_limited"] == 1
+    assert limiter.reserve("m").wait == pytest.approx(30, abs=1)
+
+
+def test_cache_hints_mark_stable_prefix_for_explicit_providers(fake_completions, monkeypatch):
+    monkeypatch.setattr(llm_client, "PROMPT_CACHE_MIN_TOKENS", 5)
+    system = "static instructions " * 10
+
+    llm_client.chat("anthropic/claude-sonnet-4.5", system, "spec", suffix=" retry: bad json")
+
+    system_msg, user_msg = fake_completions.calls[0]["messages"]
+    assert system_msg["content"] == [
+        {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
+    ]
+    assert user_msg["content"] == [
+        {"type": "text", "text": "spec", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": " retry: bad json"},
+    ]
+
+
+def test_automatic_cache_providers_get_plain_messages(fake_completions, monkeypatch):
+    monkeypatch.setattr(llm_client, "PROMPT_CACHE_MIN_TOKENS", 5)
+
+    llm_client.chat("openai/gpt-4o", "static " * 50, "spec", suffix=" retry")
+
+    _, user_msg = fake_completions.calls[0]["messages"]
+    assert user_msg == {"role": "user", "content": "spec retry"}
+
+
+def test_sync_stream_passes_suffix_through(fake_completions):
+    assert "".join(llm_client.chat_stream("openai/gpt-4o", "sys", "spec", suffix=" retry"))
+
+    _, user_msg = fake_completions.calls[0]["messages"]
+    assert user_msg == {"role": "user", "content": "spec retry"}
+
+
+def test_short_prompts_get_no_cache_hints(fake_completions):
+    llm_client.chat("anthropic/claude-sonnet-4.5", "short", "spec")
+
+    assert fake_completions.calls[0]["messages"][0] == {"role": "system", "content": "short"}
+
+
+def test_usage_reports_cached_prompt_tokens(fake_completions):
+    fake_completions.usage = SimpleNamespace(
+        prompt_tokens=1200,
+        completion_tokens=10,
+        total_tokens=1210,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    usages = []
+
+    llm_client.chat("m", "s", "u", on_usage=usages.append)
+
+    assert usages[0]["cached_tokens"] == 1024
@@ -0,0 +1,116 @@
+import json
+import random
+
+import openai
+import pytest
+import requests
+
+from tools.openrouter_standin import LatencyModel, OpenRouterStandin, StandinConfig, embed_text
+
+
+def _client(standin):
+    return openai.OpenAI(api_key="test-key", base_url=standin.base_url, max_retries=0)
+
+
+@pytest.fixture
+def standin():
+    config = StandinConfig(
+        latency=LatencyModel.parse("fixed:0"),
+        embedding_latency=LatencyModel.parse("fixed:0"),
+        audio_latency=LatencyModel.parse("fixed:0"),
+        stream_chunk_ms=0,
+        embedding_dimensions=64,
+        responses={"chat": {"canned/model": "resposta fixa"}, "transcription": "hello there"},
+        seed=1,
+    )
+    with OpenRouterStandin(config) as server:
+        yield server
+
+
+def test_latency_specs():
+    rng = random.Random(0)
+    assert LatencyModel.parse("fixed:250").sample(rng) == 0.25
+    assert 0.1 <= LatencyModel.parse("uniform:100,200").sample(rng) <= 0.2
+    assert all(LatencyModel.parse("normal:10,100").sample(rng) >= 0 for _ in range(50))
+    with pytest.raises(ValueError):
+        LatencyModel.parse("lognormal:300")
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1,2")
+
+
+def test_chat_completion_with_canned_and_json_answers(standin):
+    client = _client(standin)
+
+    canned = client.chat.completions.create(model="canned/model", messages=[{"role": "user", "content": "oi"}])
+    as_json = client.chat.completions.create(
+        model="other/model",
+        messages=[{"role": "user", "content": "plano"}],
+        response_format={"type": "json_object"},
+    )
+
+    assert canned.choices[0].message.content == "resposta fixa"
+    assert canned.usage.total_tokens > 0
+    assert json.loads(as_json.choices[0].message.content)["model"] == "other/model"
+
+
+def test_streaming_sends_chunks_and_usage(standin):
+    stream = _client(standin).chat.completions.create(
+        model="canned/model",
+        messages=[{"role": "user", "content": "oi"}],
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    chunks = list(stream)
+
+    text = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+    assert text == "resposta fixa"
+    assert chunks[-1].usage.completion_tokens > 0
+
+
+def test_embeddings_follow_shared_words(standin):
+    response = _client(standin).embeddings.create(
+        model="openai/text-embedding-3-small",
+        input=["refatoração incremental do monolito", "refatoração incremental do sistema", "receita de bolo"],
+    )
+    a, b, c = (item.embedding for item in response.data)
+
+    def cosine(x, y):
+        return sum(i * j for i, j in zip(x, y))
+
+    assert len(a) == 64
+    assert cosine(a, b) > cosine(a, c)
+    assert embed_text("x y", 64) == embed_text("x y", 64)
+
+
+def test_transcription_text_format(standin):
+    response = requests.post(
+        standin.base_url + "/audio/transcriptions",
+        data={"model": "openai/whisper-large-v3", "response_format": "text"},
+        files={"file": ("chunk.wav", b"RIFF....", "audio/wav")},
+        timeout=5,
+    )
+
+    assert response.status_code == 200
+    assert response.text == "hello there"
+
+
+def test_injected_429_and_rpm_limit():
+    config = StandinConfig(latency=LatencyModel.parse("fixed:0"), rpm=2, retry_after=7)
+    with OpenRouterStandin(config) as server:
+        client = _client(server)
+        for _ in range(2):
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": "x"}])
+        with pytest.raises(openai.RateLimitError) as exc_info:
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": "x"}])
+        # Outro modelo tem sua própria janela de RPM
+        client.chat.completions.create(model="n", messages=[{"role": "user", "content": "x"}])
+
+    assert exc_info.value.response.headers["retry-after"] == "7"
+    assert server.snapshot() == {"chat 200": 3, "chat 429": 1}
+
+
+def test_error_rate_returns_500():
+    config = StandinConfig(latency=LatencyModel.parse("fixed:0"), error_rate=1.0)
+    with OpenRouterStandin(config) as server:
+        with pytest.raises(openai.InternalServerError):
+            _client(server).chat.completions.create(model="m", messages=[{"role": "user", "content": "x"}])
@@ -0,0 +1,69 @@
+import pytest
+
+from utils.rate_limiter import RateLimit, RateLimiter, parse_limits
+
+
+def test_parse_limits_accepts_provider_and_model_scopes():
+    limits = parse_limits("*=120, deepseek=20/40000, google/gemma-2-9b-it:free=10")
+
+    assert limits == {
+        "*": RateLimit(120, 0),
+        "deepseek": RateLimit(20, 40000),
+        "google/gemma-2-9b-it:free": RateLimit(10, 0),
+    }
+    with pytest.raises(ValueError):
+        parse_limits("=10")
+
+
+def test_requests_beyond_allowance_must_wait(tmp_path):
+    limiter = RateLimiter({"deepseek": RateLimit(rpm=3)}, state_dir=tmp_path)
+
+    waits = [limiter.reserve("deepseek/deepseek-chat").wait for _ in range(5)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(20, abs=0.5)  # 3 rpm -> one slot every 20s
+    assert waits[4] == pytest.approx(40, abs=0.5)
+    assert limiter.snapshot()["throttled"] == 2
+
+
+def test_unlimited_models_never_wait(tmp_path):
+    limiter = RateLimiter({"deepseek": RateLimit(rpm=1)}, state_dir=tmp_path, free_rpm=0)
+
+    assert all(limiter.reserve("openai/gpt-4o").wait == 0 for _ in range(10))
+
+
+def test_free_models_get_default_rpm(tmp_path):
+    limiter = RateLimiter({}, state_dir=tmp_path, free_rpm=2)
+
+    waits = [limiter.reserve("x/model:free").wait for _ in range(3)]
+
+    assert waits[:2] == [0, 0] and waits[2] > 0
+
+
+def test_unused_tokens_are_refunded(tmp_path):
+    limiter = RateLimiter({"*": RateLimit(tpm=1000)}, state_dir=tmp_path)
+
+    ticket = limiter.reserve("a/model", tokens=900)
+    limiter.settle(ticket, used_tokens=100)
+
+    assert limiter.reserve("a/model", tokens=800).wait == 0
+    assert limiter.reserve("a/model", tokens=500).wait > 0
+
+
+def test_retry_after_pauses_model(tmp_path):
+    limiter = RateLimiter({}, state_dir=tmp_path, free_rpm=0)
+
+    limiter.penalize("a/model", retry_after=30)
+
+    assert limiter.reserve("a/model").wait == pytest.approx(30, abs=0.5)
+    assert limiter.reserve("b/model").wait == 0
+
+
+def test_state_is_shared_between_limiter_instances(tmp_path):
+    # Each process builds its own limiter; the bucket files are the shared state.
+    first = RateLimiter({"*": RateLimit(rpm=2)}, state_dir=tmp_path)
+    second = RateLimiter({"*": RateLimit(rpm=2)}, state_dir=tmp_path)
+
+    assert first.reserve("a/model").wait == 0
+    assert second.reserve("a/model").wait == 0
+    assert first.reserve("a/model").wait > 0
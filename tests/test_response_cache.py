@@ -0,0 +1,51 @@
+import os
+import time
+
+from utils.response_cache import ResponseCache, cache_key
+
+
+def test_cache_key_is_stable_and_content_addressed():
+    a = cache_key(model="m", system="s", user="u", temperature=0.2)
+    b = cache_key(temperature=0.2, user="u", system="s", model="m")
+    c = cache_key(model="m", system="s", user="u!", temperature=0.2)
+    assert a == b
+    assert a != c
+
+
+def test_put_then_get_roundtrip(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=1_000_000)
+    key = cache_key(model="m", user="hello")
+    assert cache.get(key) is None
+
+    cache.put(key, {"response": "olá", "tokens": 12})
+
+    assert cache.get(key) == {"response": "olá", "tokens": 12}
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=250)
+    keys = [cache_key(n=i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, {"response": "x" * 60})
+        past = time.time() - 100 + i
+        os.utime(cache._path(key), (past, past))
+
+    cache.get(keys[0])  # refresh the oldest entry
+    cache.put(cache_key(n=3), {"response": "x" * 60})
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.json")) <= 250
+
+
+def test_overwriting_a_key_does_not_inflate_size(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=250)
+    first, second = cache_key(n=0), cache_key(n=1)
+    cache.put(first, {"response": "x" * 60})
+    cache.put(second, {"response": "x" * 60})
+    for _ in range(5):
+        cache.put(second, {"response": "y" * 60})
+
+    assert cache.get(first) is not None
+    assert cache._size == cache._scan_size()
@@ -0,0 +1,523 @@
+import asyncio
+import json
+
+import pytest
+
+from utils.tokens import count_tokens
+
+with pytest.MonkeyPatch.context() as _mp:  # llm_client exige a chave na importação
+    _mp.setenv("OPENROUTER_API_KEY", "test-key")
+    import router as router_module
+    from router import BatchResult, BudgetExceededError, Router
+
+
+@pytest.fixture(autouse=True)
+def _api_key(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+
+
+def answer(model):
+    return json.dumps({"answer": model})
+
+
+class FakeLLM:
+    """Stand-in for `achat`/`achat_json` with per-model scripted behaviour."""
+
+    def __init__(self, failing=(), delay: float = 0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.delays = {}
+        self.outputs = {}
+        self.calls = []
+        self.cancelled = []
+        self.usage = None
+        self.in_flight = 0
+        self.peak = 0
+        self.suffixes = []
+
+    async def __call__(
+        self, model, system, user, temperature=None, max_tokens=2000, on_usage=None, suffix=""
+    ):
+        self.calls.append(model)
+        self.suffixes.append(suffix)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(model, self.delay))
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        finally:
+            self.in_flight -= 1
+        if "fail" in user:
+            raise RuntimeError(f"{model} rejected {user}")
+        if model in self.failing:
+            raise RuntimeError(f"{model} down")
+        if self.usage and on_usage:
+            on_usage(dict(self.usage))
+        return self.outputs.get(model, answer(model))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(router_module, "achat", fake)
+    monkeypatch.setattr(router_module, "achat_json", fake)
+    return fake
+
+
+class FakeStreamLLM:
+    """Stand-in for `achat_stream`: yields words, optionally failing per model."""
+
+    def __init__(self, failing_before=(), failing_after=()):
+        self.failing_before = set(failing_before)
+        self.failing_after = set(failing_after)
+        self.calls = []
+
+    async def __call__(self, model, system, user, max_tokens=2000, on_metrics=None):
+        self.calls.append(model)
+        if model in self.failing_before:
+            raise RuntimeError(f"{model} down")
+        try:
+            for word in ("hello", " world"):
+                yield word
+                if model in self.failing_after:
+                    raise RuntimeError(f"{model} dropped")
+        finally:
+            if on_metrics:
+                on_metrics({"model": model, "ttft_s": 0.01, "tokens_per_sec": 50.0})
+
+
+@pytest.fixture
+def router(monkeypatch, tmp_path):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", False)
+    monkeypatch.setenv("USE_FREE_MODELS", "0")
+    monkeypatch.setenv("MODEL_PLANNER", "primary/model")
+    monkeypatch.setenv("MODEL_FALLBACK_PLANNER", "fallback/model")
+    monkeypatch.delenv("MODEL_PLANNER_COMMITTEE", raising=False)
+    events = []
+    r = Router(event_logger=events.append, stats_path=str(tmp_path / "router_stats.json"))
+    r.events = events
+    return r
+
+
+def test_call_fails_over_to_next_committee_member(router, fake_llm):
+    fake_llm.failing.add("primary/model")
+    fake_llm.delay = 0.01
+
+    assert router.call("planner", "sys", "user") == answer("fallback/model")
+    assert fake_llm.calls == ["primary/model", "fallback/model"]
+    assert router.committees["planner"][0] == "fallback/model"
+    assert router.err_count["planner"]["primary/model"] == 1
+
+
+def test_call_raises_when_whole_committee_fails(router, fake_llm):
+    fake_llm.failing.update({"primary/model", "fallback/model"})
+
+    with pytest.raises(RuntimeError, match="Nenhum modelo"):
+        router.call("planner", "sys", "user")
+
+
+def test_acall_runs_in_callers_event_loop(router, fake_llm):
+    async def scenario():
+        return await asyncio.gather(
+            *(router.acall("planner", "sys", f"user {i}") for i in range(5))
+        )
+
+    assert asyncio.run(scenario()) == [answer("primary/model")] * 5
+    assert router.success_count["planner"] == 5
+
+
+def test_stream_fails_over_before_first_delta(router, monkeypatch):
+    fake = FakeStreamLLM(failing_before={"primary/model"})
+    monkeypatch.setattr(router_module, "achat_stream", fake)
+
+    assert "".join(router.stream("planner", "sys", "user")) == "hello world"
+    assert fake.calls == ["primary/model", "fallback/model"]
+    metrics = [e for e in router.events if e["event"] == "router_stream_metrics"]
+    assert metrics == [
+        {
+            "event": "router_stream_metrics",
+            "node": "planner",
+            "model": "fallback/model",
+            "ttft_s": 0.01,
+            "tokens_per_sec": 50.0,
+        }
+    ]
+
+
+def test_stream_does_not_fail_over_mid_stream(router, monkeypatch):
+    fake = FakeStreamLLM(failing_after={"primary/model"})
+    monkeypatch.setattr(router_module, "achat_stream", fake)
+
+    received = []
+    with pytest.raises(RuntimeError, match="dropped"):
+        for delta in router.stream("planner", "sys", "user"):
+            received.append(delta)
+    assert received == ["hello"]
+    assert fake.calls == ["primary/model"]
+
+
+def test_cache_serves_repeated_call_without_model(router, fake_llm, tmp_path):
+    router.cache_mode = "on"
+    router.cache = router_module.ResponseCache(tmp_path, max_bytes=1_000_000)
+
+    first = router.call("planner", "sys", "user")
+    second = router.call("planner", "sys", "user")
+
+    assert first == second == answer("primary/model")
+    assert fake_llm.calls == ["primary/model"]
+    cache = router.metrics()["cache"]
+    assert cache["hits"] == 1 and cache["misses"] == 1
+    assert cache["saved_tokens"] == router.tokens_spent
+
+
+def test_cache_key_includes_sampling_parameters(router, fake_llm, tmp_path):
+    router.cache_mode = "on"
+    router.cache = router_module.ResponseCache(tmp_path, max_bytes=1_000_000)
+
+    router.call("planner", "sys", "user")
+    router.call("planner", "sys", "user", force_json=True)
+    router.call("planner", "sys", "user", max_completion=10)
+
+    assert len(fake_llm.calls) == 3
+
+
+def test_replay_mode_never_calls_models(router, fake_llm, tmp_path):
+    router.cache_mode = "on"
+    router.cache = router_module.ResponseCache(tmp_path, max_bytes=1_000_000)
+    router.call("planner", "sys", "recorded")
+
+    router.cache_mode = "replay"
+    assert router.call("planner", "sys", "recorded") == answer("primary/model")
+    with pytest.raises(RuntimeError, match="Replay"):
+        router.call("planner", "sys", "never recorded")
+    assert fake_llm.calls == ["primary/model"]
+
+
+def test_report_output_ignores_cached_answers(router, fake_llm, tmp_path):
+    router.cache_mode = "on"
+    router.cache = router_module.ResponseCache(tmp_path, max_bytes=1_000_000)
+    router.call("planner", "sys", "cached")
+    fake_llm.failing.add("primary/model")
+    router.call("planner", "sys", "live")  # answered by the fallback
+
+    router.call("planner", "sys", "cached")
+    router.report_output("planner", valid=False)
+
+    stats = router.stats.snapshot()["planner"]
+    assert "json_valid_rate" not in stats["fallback/model"]
+    assert "json_valid_rate" not in stats["primary/model"]
+
+
+def test_invalid_cache_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Router(cache_mode="sometimes")
+
+
+def test_slow_primary_is_hedged_and_cancelled(router, fake_llm, monkeypatch):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "HEDGE_DEFAULT_DELAY", 0.05)
+    fake_llm.delays["primary/model"] = 5
+
+    assert router.call("planner", "sys", "user") == answer("fallback/model")
+    assert fake_llm.calls == ["primary/model", "fallback/model"]
+    router.call("planner", "sys", "warm")  # lets the cancellation settle on the loop
+    assert "primary/model" in fake_llm.cancelled
+
+    hedging = router.metrics()["hedging"]
+    assert hedging["hedges"] == 1 and hedging["wins"] == 1 and hedging["cancelled"] == 1
+    prompt = count_tokens("sys") + count_tokens("user")
+    assert hedging["extra_tokens"] == prompt
+    assert router.tokens_reserved == 0
+    assert any(e["event"] == "router_hedge" for e in router.events)
+
+
+def test_hedge_loser_never_ranks_ahead_of_winner(router, fake_llm, monkeypatch):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "HEDGE_DEFAULT_DELAY", 0.2)
+    fake_llm.delays = {"primary/model": 0.3, "fallback/model": 5}
+
+    assert router.call("planner", "sys", "user") == answer("primary/model")
+
+    assert router.hedge_stats["cancelled"] == 1
+    assert router.committees["planner"] == ["primary/model", "fallback/model"]
+    assert "latency_s" not in router.stats.snapshot()["planner"].get("fallback/model", {})
+
+
+def test_censored_latency_never_lowers_the_estimate(router):
+    router.stats.record("planner", "primary/model", success=True, latency=1.0)
+
+    router.stats.record_censored("planner", "primary/model", 0.1)
+    assert router.stats.snapshot()["planner"]["primary/model"]["latency_s"] == 1.0
+
+    router.stats.record_censored("planner", "primary/model", 2.0)
+    assert router.stats.snapshot()["planner"]["primary/model"]["latency_s"] > 1.0
+
+
+def test_fast_primary_is_not_hedged(router, fake_llm, monkeypatch):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "HEDGE_DEFAULT_DELAY", 1)
+
+    assert router.call("planner", "sys", "user") == answer("primary/model")
+    assert fake_llm.calls == ["primary/model"]
+    assert router.hedge_stats["hedges"] == 0
+
+
+def test_hedge_delay_follows_latency_percentile(router, monkeypatch):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "HEDGE_MIN_DELAY", 0)
+    monkeypatch.setattr(router_module, "HEDGE_PERCENTILE", 50)
+    router.latencies["planner"].extend([1.0, 2.0, 3.0, 4.0, 100.0])
+
+    assert router._hedge_delay("planner") == 3.0
+
+
+def test_invalid_json_output_fails_over(router, fake_llm):
+    fake_llm.outputs["primary/model"] = "not json at all"
+
+    out = router.call("planner", "sys", "user", force_json=True)
+
+    assert out == answer("fallback/model")
+    assert router.err_count["planner"]["primary/model"] == 1
+
+
+def test_adaptive_ranking_prefers_fast_reliable_model(router, fake_llm):
+    fake_llm.delays = {"primary/model": 0.05, "fallback/model": 0.0}
+    router.stats.record("planner", "fallback/model", success=True, latency=0.001)
+
+    router.call("planner", "sys", "user")
+
+    assert router.committees["planner"] == ["fallback/model", "primary/model"]
+    assert router.models["planner"] == "fallback/model"
+    reranked = [e for e in router.events if e["event"] == "router_committee_reranked"]
+    assert reranked and reranked[-1]["committee"][0] == "fallback/model"
+
+
+def test_stats_persist_between_router_instances(router, fake_llm, tmp_path, monkeypatch):
+    fake_llm.failing.add("primary/model")
+    fake_llm.delay = 0.01
+    router.call("planner", "sys", "user")
+    router.close()
+
+    reloaded = Router(stats_path=str(tmp_path / "router_stats.json"))
+
+    assert reloaded.committees["planner"][0] == "fallback/model"
+    stats = reloaded.metrics()["model_stats"]["planner"]
+    assert stats["primary/model"]["success_rate"] == 0.0
+    assert stats["fallback/model"]["success_rate"] == 1.0
+
+
+def test_stats_writes_are_debounced_until_flush(tmp_path):
+    from utils.model_stats import ModelStats
+
+    path = tmp_path / "stats.json"
+    stats = ModelStats(path, save_interval=60)
+    stats.record("planner", "a", success=True, latency=1.0)
+    stats.record("planner", "b", success=True, latency=1.0)
+
+    assert set(json.loads(path.read_text())["planner"]) == {"a"}
+    stats.flush()
+    assert set(json.loads(path.read_text())["planner"]) == {"a", "b"}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_report_output_penalises_invalid_json(router, fake_llm):
+    fake_llm.delay = 0.01
+    router.call("planner", "sys", "user")
+    router.stats.record("planner", "fallback/model", success=True, latency=0.02)
+
+    for _ in range(3):
+        router.report_output("planner", valid=False)
+
+    assert router.stats.snapshot()["planner"]["primary/model"]["json_valid_rate"] < 0.5
+    assert router.committees["planner"][0] == "fallback/model"
+
+
+def test_report_output_logs_raw_answer(router):
+    router.report_output("planner", valid=False, model="m", raw="{oops")
+    router.report_output("planner", valid=True, model="m")
+
+    logged = [e for e in router.events if e["event"] == "router_raw_output"]
+    assert logged == [
+        {"event": "router_raw_output", "node": "planner", "model": "m", "valid": False,
+         "repairs": [], "chars": 5, "raw": "{oops"}
+    ]
+
+
+def test_provider_usage_is_charged_instead_of_estimate(router, fake_llm):
+    fake_llm.usage = {"prompt_tokens": 11, "completion_tokens": 7, "total_tokens": 18}
+
+    router.call("planner", "sys", "user")
+
+    assert router.tokens_spent == 18
+    assert router.tokens_reserved == 0
+    assert router.metrics()["usage_sources"] == {"provider": 1, "estimated": 0, "coalesced": 0}
+
+
+def test_missing_usage_falls_back_to_local_count(router, fake_llm):
+    router.call("planner", "sys", "user")
+
+    expected = count_tokens("sys") + count_tokens("user") + count_tokens(answer("primary/model"))
+    assert router.tokens_spent == expected
+    assert router.metrics()["usage_sources"]["estimated"] == 1
+
+
+def test_run_budget_rejects_call_before_dispatch(router, fake_llm):
+    router.budget_tokens = 1000
+
+    with pytest.raises(BudgetExceededError, match="Budget de tokens excedido"):
+        router.call("planner", "sys", "user", max_completion=2000)
+    assert fake_llm.calls == []
+    assert router.events[-1]["event"] == "router_budget_blocked"
+
+
+def test_node_budget_rejects_call_before_dispatch(router, fake_llm):
+    router.node_budgets["planner"] = 500
+    fake_llm.usage = {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300}
+    router.call("planner", "sys", "user", max_completion=400)
+
+    with pytest.raises(BudgetExceededError, match="node 'planner'"):
+        router.call("planner", "sys", "user", max_completion=400)
+    assert fake_llm.calls == ["primary/model"]
+
+
+def test_node_budgets_are_read_from_env(monkeypatch):
+    monkeypatch.setenv("MAX_TOKENS_ARCHITECT", "40000")
+
+    assert Router().node_budgets["architect"] == 40000
+
+
+def test_hedge_is_skipped_when_it_would_exceed_budget(router, fake_llm, monkeypatch):
+    monkeypatch.setattr(router_module, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "HEDGE_DEFAULT_DELAY", 0.01)
+    fake_llm.delays["primary/model"] = 0.1
+    router.budget_tokens = 3000
+
+    assert router.call("planner", "sys", "user", max_completion=2000) == answer("primary/model")
+    assert fake_llm.calls == ["primary/model"]
+    assert router.hedge_stats["hedges"] == 0
+
+
+def test_open_circuit_is_skipped_without_calling_model(router, fake_llm, monkeypatch):
+    fake_llm.failing.add("primary/model")
+    router.breaker.failure_threshold = 1
+
+    router.call("planner", "sys", "first")
+    router.committees["planner"] = ["primary/model", "fallback/model"]
+    router.call("planner", "sys", "second")
+
+    assert fake_llm.calls == ["primary/model", "fallback/model", "fallback/model"]
+    assert any(e["event"] == "router_circuit_open" for e in router.events)
+    assert router.metrics()["circuits"]["skipped"] == 1
+
+
+def test_all_circuits_open_fails_fast(router, fake_llm):
+    fake_llm.failing.update({"primary/model", "fallback/model"})
+    router.breaker.failure_threshold = 1
+    with pytest.raises(RuntimeError):
+        router.call("planner", "sys", "user")
+
+    with pytest.raises(RuntimeError, match="circuitos abertos"):
+        router.call("planner", "sys", "user")
+    assert len(fake_llm.calls) == 2
+
+
+def test_half_open_probe_closes_circuit(router, fake_llm):
+    fake_llm.failing.add("primary/model")
+    router.breaker.failure_threshold = 1
+    router.call("planner", "sys", "user")
+
+    fake_llm.failing.clear()
+    router.breaker.clock = lambda: float("inf")  # cooldown elapsed
+    router.committees["planner"] = ["primary/model", "fallback/model"]
+    assert router.call("planner", "sys", "again") == answer("primary/model")
+
+    events = [e["event"] for e in router.events if e["event"].startswith("router_circuit")]
+    assert events == ["router_circuit_open", "router_circuit_half_open", "router_circuit_close"]
+
+
+def test_coalesced_attempt_is_not_charged(router, fake_llm):
+    fake_llm.usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "coalesced": True}
+
+    router.call("planner", "sys", "user")
+
+    assert router.tokens_spent == 0
+    assert router.metrics()["usage_sources"]["coalesced"] == 1
+
+
+def test_call_many_preserves_order_and_bounds_parallelism(router, fake_llm):
+    fake_llm.delays = {}
+    fake_llm.delay = 0.02
+    fake_llm.outputs = {}
+
+    results = router.call_many("planner", [("sys", f"user {i}") for i in range(8)], max_parallel=3)
+
+    assert [r.index for r in results] == list(range(8))
+    assert all(r.ok and r.result == answer("primary/model") for r in results)
+    assert fake_llm.peak == 3
+    batch = [e for e in router.events if e["event"] == "router_batch"]
+    assert batch[-1]["size"] == 8 and batch[-1]["failed"] == 0
+
+
+def test_call_many_reports_per_item_errors(router, fake_llm):
+    requests = [
+        {"system": "sys", "user": "first"},
+        {"system": "sys", "user": "please fail"},
+        ("sys", "third"),
+    ]
+
+    results = router.call_many("planner", requests, max_completion=100)
+
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1], BatchResult)
+    assert "Nenhum modelo" in str(results[1].error)
+    # failover ran for the failing item: both committee members were tried
+    assert fake_llm.calls.count("fallback/model") == 1
+
+
+def test_call_many_rejects_malformed_tuples(router, fake_llm):
+    with pytest.raises(TypeError, match="item 1"):
+        router.call_many("planner", [("sys", "ok"), ("only user",)])
+    with pytest.raises(TypeError, match="item 0"):
+        router.call_many("planner", [("sys", "user", "extra")])
+    assert fake_llm.calls == []
+
+
+def test_call_many_shares_the_token_budget(router, fake_llm):
+    fake_llm.usage = {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300}
+    router.budget_tokens = 1000
+
+    results = router.call_many(
+        "planner", [("sys", f"user {i}") for i in range(6)], max_parallel=1, max_completion=100
+    )
+
+    assert sum(r.ok for r in results) == 3
+    assert all(isinstance(r.error, BudgetExceededError) for r in results[3:])
+    assert router.tokens_spent <= router.budget_tokens
+
+
+def test_suffix_is_passed_separately_and_keys_the_cache(router, fake_llm, tmp_path):
+    router.cache_mode = "on"
+    router.cache = router_module.ResponseCache(tmp_path, max_bytes=1_000_000)
+
+    router.call("planner", "sys", "user", suffix="retry 1")
+    router.call("planner", "sys", "user", suffix="retry 2")
+    router.call("planner", "sys", "user", suffix="retry 1")
+
+    assert fake_llm.suffixes == ["retry 1", "retry 2"]
+
+
+def test_prompt_cache_metrics_split_cached_and_uncached_tokens(router, fake_llm):
+    fake_llm.usage = {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010, "cached_tokens": 0}
+    router.call("planner", "sys", "user")
+    fake_llm.usage = {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010, "cached_tokens": 800}
+    router.call("planner", "sys", "user", suffix="retry")
+
+    report = router.metrics()["prompt_cache"]["planner"]
+    assert report["prompt_tokens"] == 2000
+    assert report["cached_tokens"] == 800
+    assert report["uncached_tokens"] == 1200
+    assert report["hit_rate"] == 0.4
+    assert report["avg_latency_cached_s"] is not None
+    assert report["avg_latency_uncached_s"] is not None
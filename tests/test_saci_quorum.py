@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def saci_v2(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    from saci import saci_v2
+
+    return saci_v2
+
+
+MODELS = {
+    "fast1": {"id": "m/fast1", "name": "Fast 1"},
+    "fast2": {"id": "m/fast2", "name": "Fast 2"},
+    "fast3": {"id": "m/fast3", "name": "Fast 3"},
+    "slow": {"id": "m/slow", "name": "Slow"},
+}
+
+
+def fake_fetch(release):
+    def fetch(model_id, prompt, model_name, cancel=None):
+        if model_id == "m/slow":
+            release.wait(5)
+        elif model_id == "m/broken":
+            raise RuntimeError("boom")
+        return {"model_name": model_name, "response": f"{model_name} diz: use SQL", "success": True}
+
+    return fetch
+
+
+def test_default_waits_for_every_agent(saci_v2, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fake_fetch(release))
+    threading.Timer(0.2, release.set).start()
+    respostas = saci_v2._collect_responses("p", False, MODELS)
+    assert all(r["success"] for r in respostas.values())
+    assert respostas["slow"]["latencia_s"] >= 0.15
+
+
+def test_quorum_returns_early_and_folds_the_straggler(saci_v2, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fake_fetch(release))
+    pool = saci_v2.AgentPool(len(MODELS))
+    started = time.monotonic()
+    respostas = saci_v2._collect_responses("p", False, MODELS, quorum=3, pool=pool, round_num=1)
+    assert time.monotonic() - started < 2
+    assert respostas["slow"]["atrasado"] and not respostas["slow"]["success"]
+    assert sum(r["success"] for r in respostas.values()) == 3
+
+    # Ainda ocupado: não é consultado de novo na rodada seguinte
+    second = saci_v2._collect_responses("p2", False, MODELS, quorum=3, pool=pool, round_num=2)
+    assert second["slow"]["error"].startswith("ainda respondendo")
+
+    release.set()
+    historico = [{"respostas": dict(respostas), "latencias": {}}, {"respostas": second}]
+    for _ in range(50):
+        if not pool.busy():
+            break
+        time.sleep(0.02)
+    saci_v2._fold_late_responses(pool, historico, False)
+    folded = historico[0]["respostas"]["slow"]
+    assert folded["success"] and folded["atrasado"]
+    assert historico[0]["latencias"]["slow"] == folded["latencia_s"]
+    assert pool.shutdown() == 0
+
+
+def test_deadline_ends_the_round(saci_v2, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fake_fetch(release))
+    pool = saci_v2.AgentPool(len(MODELS))
+    respostas = saci_v2._collect_responses("p", False, MODELS, deadline=0.3, pool=pool, round_num=1)
+    assert [k for k, r in respostas.items() if r.get("atrasado")] == ["slow"]
+    assert pool.shutdown() == 1
+    release.set()
+
+
+def test_failures_do_not_count_towards_quorum(saci_v2, monkeypatch):
+    release = threading.Event()
+    release.set()
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fake_fetch(release))
+    models = {**MODELS, "broken": {"id": "m/broken", "name": "Broken"}}
+    respostas = saci_v2._collect_responses("p", False, models, quorum=5)
+    assert respostas["broken"] == {
+        "model_name": "Broken", "response": None, "success": False, "error": "boom",
+        "latencia_s": respostas["broken"]["latencia_s"],
+    }
+    assert sum(r["success"] for r in respostas.values()) == 4
+
+
+def test_debate_records_quorum_and_latencies(saci_v2, monkeypatch, tmp_path):
+    release = threading.Event()
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", fake_fetch(release))
+    monkeypatch.setattr(saci_v2, "SACI_MODELS_PROD", MODELS)
+    monkeypatch.setattr("saci.convergence_metrics.EMBEDDING_BACKEND", "local")
+    result = saci_v2.debate_saci_v2(
+        "quorum", "SQL ou NoSQL?", max_rodadas=1, output_dir=str(tmp_path), verbose=False, quorum=3,
+    )
+    release.set()
+    rodada = result["rodadas"][0]
+    assert rodada["quorum"]["k"] == 3
+    assert rodada["quorum"]["respondidos"] >= 3
+    assert set(rodada["latencias"]) == set(MODELS)
+    saved = json.loads((tmp_path / "quorum.json").read_text(encoding="utf-8"))
+    assert saved["rodadas"][0]["quorum"]["k"] == 3
+
+
+def blocking_fetch(slow_ids, outcomes):
+    """Agentes em `slow_ids` ficam presos numa chamada real do llm_client até serem cancelados."""
+    import asyncio
+
+    import llm_client
+
+    def fetch(model_id, prompt, model_name, cancel=None):
+        if model_id in slow_ids:
+            try:
+                llm_client.run_sync(asyncio.sleep(30), cancel=cancel, model=model_id, prompt_tokens=100)
+            except llm_client.ChatCancelled:
+                outcomes.append(model_id)
+                raise
+        return {"model_name": model_name, "response": f"{model_name} diz: use SQL", "success": True}
+
+    return fetch
+
+
+def test_debate_end_cancels_stragglers(saci_v2, monkeypatch, tmp_path):
+    outcomes = []
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", blocking_fetch({"m/slow"}, outcomes))
+    monkeypatch.setattr(saci_v2, "SACI_MODELS_PROD", MODELS)
+    monkeypatch.setattr("saci.convergence_metrics.EMBEDDING_BACKEND", "local")
+    result = saci_v2.debate_saci_v2(
+        "cancel_end", "SQL ou NoSQL?", max_rodadas=1, output_dir=str(tmp_path), verbose=False, quorum=3,
+    )
+    for _ in range(100):
+        if outcomes:
+            break
+        time.sleep(0.01)
+    assert outcomes == ["m/slow"]
+    assert result["cancelado"] is False
+    assert result["chamadas_canceladas"] == {"chamadas": 1, "tokens_prompt": 100}
+
+
+def test_debate_can_be_cancelled_by_id(saci_v2, monkeypatch, tmp_path):
+    import llm_client
+
+    outcomes = []
+    monkeypatch.setattr(saci_v2, "_fetch_single_response", blocking_fetch({m["id"] for m in MODELS.values()}, outcomes))
+    monkeypatch.setattr(saci_v2, "SACI_MODELS_PROD", MODELS)
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.append(
+            saci_v2.debate_saci_v2("cancel_me", "SQL ou NoSQL?", max_rodadas=3, output_dir=str(tmp_path), verbose=False)
+        )
+    )
+    worker.start()
+    for _ in range(200):
+        scope = llm_client._scopes.get("cancel_me")
+        if scope is not None and scope.stats()["in_flight"] == len(MODELS):
+            break
+        time.sleep(0.01)
+    assert llm_client.cancel_scope("cancel_me")["calls"] == len(MODELS)
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    result = results[0]
+    assert result["cancelado"] is True
+    assert len(result["rodadas"]) == 1
+    assert all(r.get("cancelada") for r in result["rodadas"][0]["respostas"].values())
+    assert llm_client.cancel_scope("cancel_me") is None
+    assert result["rodadas"][0]["analise_convergencia"] == {}
+
+
+def test_failed_debate_releases_its_scope(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    import llm_client
+    import saci
+
+    def broken_score(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(llm_client, "chat", lambda **kwargs: "VOTE: SQL")
+    monkeypatch.setattr(saci, "calculate_convergence_score", broken_score)
+    with pytest.raises(RuntimeError, match="boom"):
+        saci.run_saci_debate("broken", "SQL?", [{"name": "a", "model": "m/a"}], max_rounds=1)
+
+    assert llm_client.cancel_scope("broken") is None
@@ -0,0 +1,54 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from saci.similarity import normalized_matrix, similarity_matrix, similarity_report
+
+
+def loop_cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+def test_matrix_matches_pairwise_loop():
+    rng = random.Random(7)
+    vectors = [[rng.gauss(0, 1) for _ in range(64)] for _ in range(6)]
+    matrix = similarity_matrix(vectors)
+    assert matrix.dtype == np.float32
+    for i in range(6):
+        assert matrix[i, i] == pytest.approx(1.0, abs=1e-5)
+        for j in range(6):
+            assert matrix[i, j] == pytest.approx(loop_cosine(vectors[i], vectors[j]), abs=1e-5)
+    expected = [loop_cosine(vectors[i], vectors[j]) for i in range(6) for j in range(i + 1, 6)]
+    assert similarity_report(vectors).mean == pytest.approx(sum(expected) / len(expected), abs=1e-5)
+
+
+def test_centrality_and_outliers():
+    report = similarity_report([[1, 0], [1, 0.1], [0.9, 0.05], [0, 1]], labels=["a", "b", "c", "d"])
+    centrality = report.centrality
+    assert centrality["d"] < min(centrality["a"], centrality["b"], centrality["c"])
+    assert report.outliers() == ["d"]
+    assert report.outlier_scores["d"] > 1.0
+    assert set(report.pairs()) == {"a|b", "a|c", "a|d", "b|c", "b|d", "c|d"}
+    assert report.to_dict()["outliers"] == ["d"]
+
+
+def test_zero_vectors_are_left_out_of_pairs():
+    report = similarity_report([[1, 0], [1, 0], [0, 0]], labels=["a", "b", "z"])
+    assert report.pair_count == 1
+    assert report.mean == pytest.approx(1.0)
+    assert report.centrality["z"] == 0.0
+    assert report.outliers() == []
+    assert not normalized_matrix([[0.0, 0.0]]).any()
+
+
+def test_degenerate_inputs():
+    assert similarity_report([]).mean == 0.0
+    single = similarity_report([[3, 4]], labels=["only"])
+    assert single.mean == 0.0 and single.centrality == {"only": 0.0}
+    with pytest.raises(ValueError):
+        similarity_report([[1, 0]], labels=["a", "b"])
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.importtime import HEAVY_MODULES, STARTUP_BUDGET_MS, parse_importtime, profile_import
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_parse_importtime_counts_only_the_statement():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |   encodings.aliases",
+            "import time:       500 |        600 | encodings",
+            "import time:       900 |        900 | site",
+            "import time:        40 |         40 |   json.decoder",
+            "import time:        60 |        100 | json",
+            "import time:        30 |         30 | mypkg",
+        ]
+    )
+
+    profile = parse_importtime(stderr)
+
+    assert profile.total_us == 130
+    assert set(profile.modules) == {"json.decoder", "json", "mypkg"}
+    assert profile.heaviest(1) == [("json", 60)]
+
+
+def test_cli_import_is_light_and_within_budget():
+    # Melhor de três execuções para não depender de ruído da máquina
+    profiles = [profile_import("import src.interview_assistant.__main__", cwd=ROOT) for _ in range(3)]
+    best = min(profiles, key=lambda p: p.total_us)
+
+    assert best.loaded() == []
+    assert best.total_ms < STARTUP_BUDGET_MS, best.heaviest(10)
+
+
+def test_headless_cli_run_skips_audio_and_gui(tmp_path):
+    from docx import Document
+
+    resume = tmp_path / "resume.pdf"
+    resume.write_text("Fake PDF content", encoding="utf-8")
+    jd = tmp_path / "jd.docx"
+    document = Document()
+    document.add_paragraph("Experiencia com entrevistas ao vivo.")
+    document.save(jd)
+
+    code = f"""
+import sys
+from pathlib import Path
+import src.interview_assistant.orchestration.pipeline as pipeline
+
+class Dummy:
+    def generate(self, question, resume_chunks, jd_chunks, transcript):
+        return {{"final_answer": "ok", "talking_points": [], "sources": []}}
+
+pipeline.InterviewResponseGenerator = lambda config: Dummy()
+pipeline.main(["--resume", {str(resume)!r}, "--jd", {str(jd)!r}, "--question", "q?",
+               "--output-dir", {str(tmp_path / "out")!r}, "--logs-dir", {str(tmp_path / "logs")!r},
+               "--no-audio", "--headless-overlay"])
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "OPENROUTER_API_KEY": "test-key"},
+        capture_output=True,
+        text=True,
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    loaded = set(proc.stdout.strip().splitlines()[-1].split(","))
+    assert {"sklearn", "pdfplumber", "docx"} <= loaded
+    assert not loaded & {"tkinter", "faster_whisper", "torch", "sounddevice", "requests"}
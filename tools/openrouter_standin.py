@@ -0,0 +1,414 @@
+"""Stand-in local compatível com a API do OpenRouter, para testes de carga e latência.
+
+Implementa `/chat/completions` (JSON e streaming SSE), `/embeddings` e
+`/audio/transcriptions` com latência sorteada de distribuições configuráveis,
+taxa de erros 5xx, 429 (aleatórios ou por limite de RPM, com `Retry-After`) e
+respostas fixas. Aponte os clientes para ele com `OPENROUTER_BASE_URL`:
+
+    python -m tools.openrouter_standin --port 8099 --latency lognormal:300,0.5 \\
+        --error-rate 0.02 --rate-limit-rate 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8099/api/v1 python run.py ...
+
+`GET /stats` devolve as contagens de requisições por endpoint e status.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """
+    Latency distribution in milliseconds, parsed from `kind:params`:
+    `fixed:200`, `uniform:100,500`, `normal:300,50` (mean, stddev),
+    `lognormal:300,0.5` (median, sigma) or `exp:200` (mean).
+    """
+
+    kind: str = "fixed"
+    params: Tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, values = spec.strip().partition(":")
+        kind = kind.lower()
+        arity = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if kind not in arity:
+            raise ValueError(f"Distribuição de latência desconhecida: {spec!r}")
+        try:
+            params = tuple(float(v) for v in values.split(",")) if values else ()
+        except ValueError:
+            raise ValueError(f"Parâmetros inválidos em {spec!r}") from None
+        if len(params) != arity[kind]:
+            raise ValueError(f"{kind} espera {arity[kind]} parâmetro(s): {spec!r}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        """One draw, in seconds (never negative)."""
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            ms = p[0] * math.exp(rng.gauss(0.0, p[1])) if p[0] > 0 else 0.0
+        else:
+            ms = rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, ms) / 1000.0
+
+
+@dataclass
+class StandinConfig:
+    latency: LatencyModel = field(default_factory=lambda: LatencyModel.parse("lognormal:300,0.5"))
+    # Overrides per model id (e.g. a slow member to exercise hedging).
+    model_latency: Dict[str, LatencyModel] = field(default_factory=dict)
+    embedding_latency: LatencyModel = field(default_factory=lambda: LatencyModel.parse("lognormal:80,0.4"))
+    audio_latency: LatencyModel = field(default_factory=lambda: LatencyModel.parse("lognormal:500,0.3"))
+    # Delay between streamed chunks, after the first one.
+    stream_chunk_ms: float = 15.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Requests per minute per model before answering 429 (0 = unlimited).
+    rpm: float = 0.0
+    retry_after: float = 1.0
+    embedding_dimensions: int = 1536
+    # Canned answers: {"chat": {model or "*": text}, "chat_json": {model or "*": obj}, "transcription": text}
+    responses: Dict[str, Any] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(messages: List[dict]) -> str:
+    parts = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):  # partes com cache_control
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+        elif content:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def embed_text(text: str, dimensions: int) -> List[float]:
+    """
+    Deterministic bag-of-words vector: texts sharing words get similar vectors,
+    so convergence scores computed on the stand-in still move with the content.
+    """
+    vector = [0.0] * dimensions
+    for word in _WORD.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if not norm:
+        vector[0] = norm = 1.0
+    return [v / norm for v in vector]
+
+
+class OpenRouterStandin:
+    """
+    Threaded HTTP server speaking the subset of the OpenRouter API the repo uses.
+
+    Use as a context manager or call `start()`/`stop()`; `base_url` is what
+    `OPENROUTER_BASE_URL` should point to.
+    """
+
+    def __init__(self, config: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StandinConfig()
+        self.rng = random.Random(self.config.seed)
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._recent: Dict[str, Deque[float]] = defaultdict(deque)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self) -> "OpenRouterStandin":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="openrouter-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "OpenRouterStandin":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {f"{endpoint} {status}": n for (endpoint, status), n in sorted(self.stats.items())}
+
+    # ------------------------------------------------------------------
+    def record(self, endpoint: str, status: int) -> None:
+        with self._lock:
+            self.stats[(endpoint, status)] += 1
+
+    def fault(self, model: str) -> Optional[Tuple[int, str]]:
+        """An injected failure for this request, if any: (status, message)."""
+        config = self.config
+        with self._lock:
+            roll = self.rng.random()
+            if config.rpm:
+                window = self._recent[model]
+                now = time.monotonic()
+                while window and now - window[0] >= 60.0:
+                    window.popleft()
+                if len(window) >= config.rpm:
+                    return 429, f"Rate limit exceeded for {model} ({config.rpm:g} rpm)"
+                window.append(now)
+        if roll < config.rate_limit_rate:
+            return 429, f"Rate limit exceeded for {model}"
+        if roll < config.rate_limit_rate + config.error_rate:
+            return 500, "Upstream provider error (simulated)"
+        return None
+
+    def delay(self, latency: LatencyModel) -> float:
+        with self._lock:
+            return latency.sample(self.rng)
+
+    def chat_content(self, model: str, prompt: str, json_mode: bool) -> str:
+        canned = self.config.responses
+        if json_mode:
+            table = canned.get("chat_json") or {}
+            obj = table.get(model, table.get("*"))
+            if obj is not None:
+                return json.dumps(obj, ensure_ascii=False)
+        table = canned.get("chat") or {}
+        text = table.get(model, table.get("*"))
+        if text is None:
+            words = _WORD.findall(prompt)[-40:]
+            text = f"Análise simulada de {model}: {' '.join(words)}. **Voto: A**"
+        if json_mode:
+            return json.dumps({"resposta": text, "model": model}, ensure_ascii=False)
+        return text
+
+
+def _make_handler(standin: OpenRouterStandin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._json(200, standin.snapshot(), endpoint="stats")
+            elif self.path.rstrip("/").endswith("/models"):
+                self._json(200, {"data": [{"id": "standin/model"}]}, endpoint="models")
+            else:
+                self._json(404, {"error": {"message": f"Unknown path {self.path}"}}, endpoint="unknown")
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            path = self.path.split("?", 1)[0].rstrip("/")
+            try:
+                if path.endswith("/chat/completions"):
+                    self._chat(json.loads(body or b"{}"))
+                elif path.endswith("/embeddings"):
+                    self._embeddings(json.loads(body or b"{}"))
+                elif path.endswith("/audio/transcriptions"):
+                    self._transcription(body)
+                else:
+                    self._json(404, {"error": {"message": f"Unknown path {self.path}"}}, endpoint="unknown")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # cliente desistiu (timeout, hedge cancelado)
+
+        # --------------------------------------------------------------
+        def _json(self, status: int, payload: Any, endpoint: str, headers: Optional[dict] = None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            standin.record(endpoint, status)
+
+        def _fail(self, endpoint: str, model: str) -> bool:
+            fault = standin.fault(model)
+            if fault is None:
+                return False
+            status, message = fault
+            headers = {"Retry-After": f"{standin.config.retry_after:g}"} if status == 429 else None
+            self._json(status, {"error": {"message": message, "code": status}}, endpoint, headers)
+            return True
+
+        def _chat(self, request: dict):
+            model = request.get("model") or "standin/model"
+            if self._fail("chat", model):
+                return
+            prompt = _message_text(request.get("messages") or [])
+            json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+            content = standin.chat_content(model, prompt, json_mode)
+            usage = {
+                "prompt_tokens": _count_tokens(prompt),
+                "completion_tokens": _count_tokens(content),
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            latency = standin.config.model_latency.get(model, standin.config.latency)
+            time.sleep(standin.delay(latency))
+            base = {"id": f"gen-standin-{time.time_ns()}", "created": int(time.time()), "model": model}
+            if not request.get("stream"):
+                self._json(200, {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                }, endpoint="chat")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            pieces = re.findall(r"\S+\s*", content) or [content]
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(standin.config.stream_chunk_ms / 1000.0)
+                self._event({**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            self._event({**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+            standin.record("chat_stream", 200)
+
+        def _event(self, payload: dict):
+            self._chunk(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+        def _chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _embeddings(self, request: dict):
+            model = request.get("model") or "standin/embedding"
+            if self._fail("embeddings", model):
+                return
+            inputs = request.get("input")
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dimensions = int(request.get("dimensions") or standin.config.embedding_dimensions)
+            time.sleep(standin.delay(standin.config.embedding_latency))
+            data = [
+                {"object": "embedding", "index": i, "embedding": embed_text(str(text), dimensions)}
+                for i, text in enumerate(inputs or [])
+            ]
+            tokens = sum(_count_tokens(str(text)) for text in inputs or [])
+            self._json(200, {
+                "object": "list",
+                "model": model,
+                "data": data,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }, endpoint="embeddings")
+
+        def _transcription(self, body: bytes):
+            # multipart/form-data: só os campos simples interessam
+            fields = dict(re.findall(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n', body))
+            model = fields.get(b"model", b"standin/whisper").decode("utf-8", "replace")
+            if self._fail("transcriptions", model):
+                return
+            time.sleep(standin.delay(standin.config.audio_latency))
+            text = standin.config.responses.get("transcription", "Tell me about a project you are proud of?")
+            if fields.get(b"response_format") == b"text":
+                data = text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                standin.record("transcriptions", 200)
+            else:
+                self._json(200, {"text": text}, endpoint="transcriptions")
+
+    return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="lognormal:300,0.5", help="distribuição do chat (ms)")
+    parser.add_argument(
+        "--model-latency", action="append", default=[], metavar="MODELO=DIST",
+        help="latência por modelo, ex.: x-ai/grok-4=lognormal:2000,0.3",
+    )
+    parser.add_argument("--embedding-latency", default="lognormal:80,0.4")
+    parser.add_argument("--audio-latency", default="lognormal:500,0.3")
+    parser.add_argument("--stream-chunk-ms", type=float, default=15.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fração de respostas 429")
+    parser.add_argument("--rpm", type=float, default=0.0, help="limite de requisições/min por modelo")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--responses", help="JSON com respostas fixas (chat, chat_json, transcription)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    model_latency = {}
+    for entry in args.model_latency:
+        model, _, spec = entry.rpartition("=")
+        if not model:
+            parser.error(f"--model-latency inválido: {entry!r} (use MODELO=DIST)")
+        model_latency[model] = LatencyModel.parse(spec)
+    responses = {}
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+    config = StandinConfig(
+        latency=LatencyModel.parse(args.latency),
+        model_latency=model_latency,
+        embedding_latency=LatencyModel.parse(args.embedding_latency),
+        audio_latency=LatencyModel.parse(args.audio_latency),
+        stream_chunk_ms=args.stream_chunk_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        retry_after=args.retry_after,
+        responses=responses,
+        seed=args.seed,
+    )
+    standin = OpenRouterStandin(config, args.host, args.port).start()
+    print(f"OPENROUTER_BASE_URL={standin.base_url}")
+    print(f"OPENAI_BASE_URL={standin.base_url}  # embedding_client")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        print(json.dumps(standin.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
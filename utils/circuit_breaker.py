@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from tenacity import RetryError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _root_error(exc: BaseException) -> BaseException:
+    # achat/achat_json retry through tenacity, which wraps the last error.
+    if isinstance(exc, RetryError) and exc.last_attempt is not None:
+        inner = exc.last_attempt.exception()
+        if inner is not None:
+            return inner
+    return exc
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    exc = _root_error(exc)
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a `Retry-After` header on the error's HTTP response, if any."""
+    headers = getattr(getattr(_root_error(exc), "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """
+    Whether an error says the model is unavailable. Client errors (bad request,
+    auth, context too long) and unusable output are not the model being down,
+    so they don't move the breaker; 408/429, 5xx, timeouts and anything without
+    a status code do.
+    """
+    code = status_code(exc)
+    if code is None:
+        return True
+    return code in (408, 429) or code >= 500
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    A model's circuit opens after `failure_threshold` consecutive failures, or
+    right away on a 429 (for `Retry-After` seconds when the provider sends it).
+    While open, `allow` refuses the model so callers skip it without waiting on
+    a timeout. Once `cooldown` has elapsed the circuit goes half-open and lets a
+    single probe through: success closes it, failure re-opens it. State changes
+    are reported through `on_change(model, state, info)`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        on_change: Optional[Callable[[str, str, dict], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_change = on_change
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, Dict[str, object]] = {}
+
+    def _circuit(self, model: str) -> Dict[str, object]:
+        return self._circuits.setdefault(
+            model, {"state": CLOSED, "failures": 0, "opened_at": 0.0, "cooldown": self.cooldown, "probing": False}
+        )
+
+    def state(self, model: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get(model)
+            if circuit is None:
+                return CLOSED
+            if circuit["state"] == OPEN and self.clock() - circuit["opened_at"] >= circuit["cooldown"]:
+                return HALF_OPEN
+            return circuit["state"]
+
+    def allow(self, model: str) -> bool:
+        """True if `model` may be called now; in half-open, only one probe at a time."""
+        changed = None
+        with self._lock:
+            circuit = self._circuit(model)
+            if circuit["state"] == CLOSED:
+                return True
+            if circuit["state"] == OPEN:
+                if self.clock() - circuit["opened_at"] < circuit["cooldown"]:
+                    return False
+                circuit["state"] = HALF_OPEN
+                changed = {"failures": circuit["failures"]}
+            if circuit["probing"]:
+                return False
+            circuit["probing"] = True
+        if changed is not None:
+            self._notify(model, HALF_OPEN, changed)
+        return True
+
+    def release(self, model: str) -> None:
+        """An admitted call ended without a verdict (e.g. cancelled hedge)."""
+        with self._lock:
+            circuit = self._circuits.get(model)
+            if circuit is not None:
+                circuit["probing"] = False
+
+    def record_success(self, model: str) -> None:
+        with self._lock:
+            circuit = self._circuit(model)
+            was = circuit["state"]
+            circuit.update(state=CLOSED, failures=0, probing=False, cooldown=self.cooldown)
+        if was != CLOSED:
+            self._notify(model, CLOSED, {"previous": was})
+
+    def record_failure(self, model: str, exc: Optional[BaseException] = None) -> None:
+        if exc is not None and not counts_as_failure(exc):
+            self.release(model)
+            return
+        code = status_code(exc) if exc is not None else None
+        with self._lock:
+            circuit = self._circuit(model)
+            circuit["failures"] += 1
+            circuit["probing"] = False
+            trip = (
+                circuit["state"] == HALF_OPEN
+                or code == 429
+                or circuit["failures"] >= self.failure_threshold
+            )
+            if not trip or circuit["state"] == OPEN:
+                return
+            wait = retry_after(exc) if exc is not None else None
+            circuit.update(state=OPEN, opened_at=self.clock(), cooldown=max(self.cooldown, wait or 0.0))
+            info = {"failures": circuit["failures"], "status": code, "cooldown_s": circuit["cooldown"]}
+        self._notify(model, OPEN, info)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            models = list(self._circuits)
+        return {
+            model: {"state": self.state(model), "failures": self._circuits[model]["failures"]}
+            for model in models
+        }
+
+    def _notify(self, model: str, state: str, info: dict) -> None:
+        if self.on_change:
+            self.on_change(model, state, info)
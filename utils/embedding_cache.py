@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.file_lock import lock_file, unlock_file
+
+# Shard files: `<dim>-<generation>.f32` (rows of float32) and `<dim>-<generation>.idx`
+# (`key row` lines). Compaction writes the next generation and drops the old one.
+_SHARD = re.compile(r"^(\d+)-(\d+)\.idx$")
+
+
+def embedding_key(model: str, text: str) -> str:
+    """SHA-256 of the model and the full text (texts sharing a prefix don't collide)."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors keyed by `embedding_key(model, text)`.
+
+    The memory tier is an LRU of up to `memory_entries` float32 vectors. The
+    disk tier under `root` keeps one append-only shard per dimension, read
+    through `np.memmap`, so a restarted process pays no API call for texts it
+    has seen before. Appends happen under an OS file lock and every lookup miss
+    picks up rows written by other processes. Once a shard passes `max_bytes`
+    it is compacted to its most recently used half, in a new generation, so
+    readers still mapping the old files keep seeing consistent rows. Recency is
+    what the compacting process has read or written; rows it never touched
+    rank by age.
+    """
+
+    def __init__(self, root: str | Path, memory_entries: int = 4096, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._index: Dict[str, Tuple[int, int]] = {}  # key -> (dim, row)
+        self._shards: Dict[int, Tuple[int, int]] = {}  # dim -> (generation, bytes of index read)
+        self._maps: Dict[int, np.memmap] = {}
+        self._used: Dict[str, int] = {}  # key -> tick of its last read or write
+        self._tick = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector per text (None on a miss), in input order."""
+        keys = [embedding_key(model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            refreshed = False
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._touch(key)
+                    self.memory_hits += 1
+                    results.append(vector)
+                    continue
+                if key not in self._index and not refreshed:
+                    self._refresh()
+                    refreshed = True
+                vector = self._read(key)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+                results.append(vector)
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        by_dim: Dict[int, List[Tuple[str, np.ndarray]]] = {}
+        with self._lock:
+            for text, values in zip(texts, vectors):
+                vector = np.array(values, dtype=np.float32)
+                key = embedding_key(model, text)
+                self._remember(key, vector)
+                by_dim.setdefault(vector.shape[0], []).append((key, vector))
+            for dim, entries in by_dim.items():
+                try:
+                    self._append(dim, entries)
+                except OSError:
+                    pass  # disco cheio ou sem permissão: segue só com a memória
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._index),
+            }
+
+    # ------------------------------------------------------------------
+    def _touch(self, key: str) -> None:
+        self._tick += 1
+        self._used[key] = self._tick
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._touch(key)
+        vector.setflags(write=False)
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _paths(self, dim: int, generation: int) -> Tuple[Path, Path]:
+        return self.root / f"{dim}-{generation}.idx", self.root / f"{dim}-{generation}.f32"
+
+    def _refresh(self) -> None:
+        generations: Dict[int, int] = {}
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            match = _SHARD.match(name)
+            if match:
+                dim, generation = int(match[1]), int(match[2])
+                generations[dim] = max(generation, generations.get(dim, -1))
+        for dim, generation in generations.items():
+            self._refresh_shard(dim, generation)
+
+    def _refresh_shard(self, dim: int, generation: int) -> None:
+        seen_generation, offset = self._shards.get(dim, (-1, 0))
+        if generation < seen_generation:
+            return
+        if generation != seen_generation:
+            # Compacted by someone else: the row numbers changed.
+            self._index = {key: loc for key, loc in self._index.items() if loc[0] != dim}
+            self._maps.pop(dim, None)
+            offset = 0
+        idx_path, _ = self._paths(dim, generation)
+        try:
+            with open(idx_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            key, _, row = line.decode("ascii").partition(" ")
+            self._index[key] = (dim, int(row))
+        self._shards[dim] = (generation, offset + len(complete))
+
+    def _read(self, key: str) -> Optional[np.ndarray]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        dim, row = location
+        rows = self._map(dim, row)
+        if rows is None:
+            return None
+        return np.array(rows[row], dtype=np.float32)
+
+    def _map(self, dim: int, row: int) -> Optional[np.memmap]:
+        rows = self._maps.get(dim)
+        if rows is not None and row < rows.shape[0]:
+            return rows
+        _, bin_path = self._paths(dim, self._shards[dim][0])
+        try:
+            count = bin_path.stat().st_size // (4 * dim)
+            if row >= count:
+                return None
+            rows = np.memmap(bin_path, dtype=np.float32, mode="r", shape=(count, dim))
+        except (OSError, ValueError):
+            return None
+        self._maps[dim] = rows
+        return rows
+
+    def _append(self, dim: int, entries: List[Tuple[str, np.ndarray]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / f"{dim}.lock", "a+") as lock:
+            lock_file(lock)
+            try:
+                self._refresh()
+                generation = self._shards.get(dim, (0, 0))[0]
+                fresh = {}
+                for key, vector in entries:
+                    if key not in self._index:
+                        fresh[key] = vector
+                if not fresh:
+                    return
+                idx_path, bin_path = self._paths(dim, generation)
+                row_bytes = 4 * dim
+                with open(bin_path, "ab") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    first = -(-size // row_bytes)
+                    f.write(b"\0" * (first * row_bytes - size))  # linha parcial de uma escrita interrompida
+                    f.write(np.stack(list(fresh.values())).astype(np.float32).tobytes())
+                with open(idx_path, "ab") as f:
+                    f.write("".join(f"{key} {first + i}\n" for i, key in enumerate(fresh)).encode("ascii"))
+                self._refresh_shard(dim, generation)
+                if (first + len(fresh)) * row_bytes > self.max_bytes:
+                    self._compact(dim, generation)
+            finally:
+                unlock_file(lock)
+
+    def _compact(self, dim: int, generation: int) -> None:
+        # Map up to the last indexed row: a map cached before this append would miss the new rows.
+        last = max((row for d, row in self._index.values() if d == dim), default=0)
+        rows = self._map(dim, last)
+        if rows is None:
+            return
+        entries = sorted(
+            (key for key, (d, row) in self._index.items() if d == dim and row < rows.shape[0]),
+            key=lambda key: (self._used.get(key, 0), self._index[key][1]),
+        )
+        dropped, kept = entries[: len(entries) // 2], entries[len(entries) // 2:]
+        keep = sorted((self._index[key][1], key) for key in kept)
+        for key in dropped:
+            self._used.pop(key, None)
+        idx_path, bin_path = self._paths(dim, generation + 1)
+        tmp_idx, tmp_bin = idx_path.with_suffix(".idx.tmp"), bin_path.with_suffix(".f32.tmp")
+        with open(tmp_bin, "wb") as f:
+            f.write(np.ascontiguousarray(rows[[row for row, _ in keep]], dtype=np.float32).tobytes())
+        with open(tmp_idx, "wb") as f:
+            f.write("".join(f"{key} {i}\n" for i, (_, key) in enumerate(keep)).encode("ascii"))
+        os.replace(tmp_bin, bin_path)
+        os.replace(tmp_idx, idx_path)
+        self._refresh_shard(dim, generation + 1)
+        for old in self._paths(dim, generation):
+            try:
+                old.unlink()
+            except OSError:
+                pass  # Windows: ainda mapeado por alguém
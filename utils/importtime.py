@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Dependencies the interview assistant must only import on the paths that use
+# them (retrieval, document parsing, generation, audio, GUI).
+HEAVY_MODULES = (
+    "numpy",
+    "sklearn",
+    "pdfplumber",
+    "docx",
+    "requests",
+    "tkinter",
+    "faster_whisper",
+    "torch",
+    "sounddevice",
+)
+
+# Import-time budget for `python -m src.interview_assistant` before argument
+# parsing (measured ~30 ms; the eager imports cost over 130 ms).
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "120"))
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+@dataclass
+class ImportProfile:
+    """What `python -X importtime -c <code>` reported for the statement, in microseconds."""
+
+    total_us: int
+    # module -> (self, cumulative), for everything imported by the statement
+    modules: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_us / 1000.0
+
+    def loaded(self, names: Sequence[str] = HEAVY_MODULES) -> List[str]:
+        return [name for name in names if name in self.modules]
+
+    def heaviest(self, n: int = 10) -> List[Tuple[str, int]]:
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, self_us) for name, (self_us, _) in ranked[:n]]
+
+
+def parse_importtime(stderr: str) -> ImportProfile:
+    """
+    Parse `-X importtime` output. Interpreter startup ends with `site`; the
+    top-level entries after it are what the `-c` statement imported.
+    """
+    total = 0
+    modules: Dict[str, Tuple[int, int]] = {}
+    pending: List[Tuple[str, int, int, int]] = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative, indent, name = int(match[1]), int(match[2]), len(match[3]), match[4]
+        pending.append((name, self_us, cumulative, indent))
+        if indent == 0 and name == "site":
+            pending = []
+    for name, self_us, cumulative, indent in pending:
+        modules[name] = (self_us, cumulative)
+        if indent == 0:
+            total += cumulative
+    return ImportProfile(total, modules)
+
+
+def profile_import(code: str, cwd: Optional[str | Path] = None, env: Optional[dict] = None) -> ImportProfile:
+    """Run `code` in a fresh interpreter with `-X importtime` and profile its imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(cwd) if cwd else None,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao executar {code!r}: {proc.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(proc.stderr)
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+# Names reported in `RepairResult.repairs`, in the order they were first applied.
+MARKDOWN_FENCE = "markdown_fence"
+SURROUNDING_TEXT = "surrounding_text"
+COMMENTS = "comments"
+TRAILING_COMMA = "trailing_comma"
+MISSING_COMMA = "missing_comma"
+SINGLE_QUOTES = "single_quotes"
+UNQUOTED_KEY = "unquoted_key"
+PYTHON_LITERAL = "python_literal"
+CONTROL_CHARACTER = "control_character"
+UNTERMINATED_STRING = "unterminated_string"
+UNTERMINATED_CONTAINER = "unterminated_container"
+
+# `repair_json` moves on to the next "{" when an object does not parse or lacks
+# the expected keys (e.g. "{placeholders}" in prose); this bounds how often.
+MAX_ATTEMPTS = 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$-]*")
+# A run of ordinary characters inside a string, per quote style.
+_STRING_RUN = {'"': re.compile(r'[^"\\\x00-\x1f]+'), "'": re.compile(r"[^'\\\x00-\x1f]+")}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "'": "'"}
+_FENCE = re.compile(r"```[\w-]*")
+_LITERALS = {"true": True, "false": False, "null": None}
+_PYTHON_LITERALS = {"True": True, "False": False, "None": None}
+
+_decoder = json.JSONDecoder()
+
+
+@dataclass
+class RepairResult:
+    """Parsed object plus the repairs needed to read it (empty if the JSON was valid)."""
+
+    value: Dict[str, Any]
+    repairs: List[str] = field(default_factory=list)
+    start: int = 0
+    end: int = 0
+
+
+class _EndOfInput(Exception):
+    pass
+
+
+class _Parser:
+    """
+    Tolerant recursive-descent JSON parser over a single position index.
+
+    Strings and numbers go through the stdlib's C scanners whenever they are
+    well-formed; only the broken parts take the slow path. Every deviation from
+    strict JSON that gets accepted is noted once in `repairs`.
+    """
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+        self.end = len(text)
+        self.repairs: List[str] = []
+
+    def note(self, repair: str) -> None:
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def skip(self) -> None:
+        """Whitespace plus `//` and `/* */` comments between tokens."""
+        text = self.text
+        while True:
+            self.pos = _WHITESPACE.match(text, self.pos).end()
+            if text.startswith("//", self.pos):
+                newline = text.find("\n", self.pos)
+                self.pos = self.end if newline < 0 else newline
+            elif text.startswith("/*", self.pos):
+                close = text.find("*/", self.pos + 2)
+                self.pos = self.end if close < 0 else close + 2
+            else:
+                return
+            self.note(COMMENTS)
+
+    def value(self) -> Any:
+        self.skip()
+        if self.pos >= self.end:
+            raise _EndOfInput()
+        ch = self.text[self.pos]
+        if ch == "{":
+            return self.object()
+        if ch == "[":
+            return self.array()
+        if ch == '"' or ch == "'":
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            return float(number) if "." in number or "e" in number or "E" in number else int(number)
+        match = _IDENTIFIER.match(self.text, self.pos)
+        if match:
+            word = match.group()
+            if word in _LITERALS:
+                self.pos = match.end()
+                return _LITERALS[word]
+            if word in _PYTHON_LITERALS:
+                self.pos = match.end()
+                self.note(PYTHON_LITERAL)
+                return _PYTHON_LITERALS[word]
+        raise ValueError(f"valor inesperado na posição {self.pos}: {self.text[self.pos:self.pos + 20]!r}")
+
+    def object(self) -> Dict[str, Any]:
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        after_comma = True
+        while True:
+            self.skip()
+            if self.pos >= self.end:
+                self.note(UNTERMINATED_CONTAINER)
+                return result
+            ch = self.text[self.pos]
+            if ch == "}":
+                self.pos += 1
+                return result
+            if ch == ",":
+                # A comma with no member after it (`{"a": 1,}` or `{,`).
+                self.pos += 1
+                self.note(TRAILING_COMMA)
+                continue
+            if not after_comma:
+                self.note(MISSING_COMMA)
+            key = self.key()
+            self.skip()
+            if self.pos >= self.end:
+                self.note(UNTERMINATED_CONTAINER)
+                return result
+            if self.text[self.pos] != ":":
+                raise ValueError(f"esperado ':' na posição {self.pos}")
+            self.pos += 1
+            try:
+                result[key] = self.value()
+            except _EndOfInput:
+                self.note(UNTERMINATED_CONTAINER)
+                return result
+            after_comma = self.separator("}")
+            if after_comma is None:
+                return result
+
+    def array(self) -> List[Any]:
+        self.pos += 1
+        result: List[Any] = []
+        after_comma = True
+        while True:
+            self.skip()
+            if self.pos >= self.end:
+                self.note(UNTERMINATED_CONTAINER)
+                return result
+            ch = self.text[self.pos]
+            if ch == "]":
+                self.pos += 1
+                return result
+            if ch == ",":
+                self.pos += 1
+                self.note(TRAILING_COMMA)
+                continue
+            if not after_comma:
+                self.note(MISSING_COMMA)
+            try:
+                result.append(self.value())
+            except _EndOfInput:
+                self.note(UNTERMINATED_CONTAINER)
+                return result
+            after_comma = self.separator("]")
+            if after_comma is None:
+                return result
+
+    def separator(self, close: str) -> Optional[bool]:
+        """
+        After a member: consume `,` (True), or the closing bracket (None, the
+        container is done; also at end of input), or nothing (False).
+        """
+        self.skip()
+        if self.pos >= self.end:
+            self.note(UNTERMINATED_CONTAINER)
+            return None
+        ch = self.text[self.pos]
+        if ch == ",":
+            self.pos += 1
+            self.skip()
+            if self.pos < self.end and self.text[self.pos] in "}]":
+                self.note(TRAILING_COMMA)
+            return True
+        if ch == close:
+            self.pos += 1
+            return None
+        if ch in "}]":
+            # A bracket of the wrong kind: treat it as ours so the outer parse
+            # can carry on (`{"a": [1, 2}`).
+            self.note(UNTERMINATED_CONTAINER)
+            return None
+        return False
+
+    def key(self) -> str:
+        ch = self.text[self.pos]
+        if ch == '"' or ch == "'":
+            return self.string()
+        match = _IDENTIFIER.match(self.text, self.pos)
+        if match is None:
+            raise ValueError(f"chave inesperada na posição {self.pos}: {self.text[self.pos:self.pos + 20]!r}")
+        self.pos = match.end()
+        self.note(UNQUOTED_KEY)
+        return match.group()
+
+    def string(self) -> str:
+        quote = self.text[self.pos]
+        if quote == '"':
+            try:
+                value, self.pos = json.decoder.scanstring(self.text, self.pos + 1, True)
+                return value
+            except ValueError:
+                pass
+        else:
+            self.note(SINGLE_QUOTES)
+        return self._tolerant_string(quote)
+
+    def _tolerant_string(self, quote: str) -> str:
+        text = self.text
+        run = _STRING_RUN[quote]
+        parts: List[str] = []
+        i = self.pos + 1
+        while True:
+            match = run.match(text, i)
+            if match:
+                parts.append(match.group())
+                i = match.end()
+            if i >= self.end:
+                self.note(UNTERMINATED_STRING)
+                break
+            ch = text[i]
+            if ch == quote:
+                i += 1
+                break
+            if ch == "\\":
+                escape = text[i + 1 : i + 2]
+                if escape == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[i + 2 : i + 6]):
+                    parts.append(chr(int(text[i + 2 : i + 6], 16)))
+                    i += 6
+                else:
+                    parts.append(_ESCAPES.get(escape, escape))
+                    i += 2
+                continue
+            # Raw newline/tab inside a string (file contents pasted verbatim).
+            self.note(CONTROL_CHARACTER)
+            parts.append(ch)
+            i += 1
+        self.pos = min(i, self.end)
+        return "".join(parts)
+
+
+def _note_surroundings(text: str, start: int, end: int, repairs: List[str]) -> None:
+    before = text[:start]
+    after = text[end:]
+    found = []
+    if "```" in before or after.lstrip().startswith("```"):
+        found.append(MARKDOWN_FENCE)
+    if _FENCE.sub("", before).strip() or _FENCE.sub("", after).strip():
+        found.append(SURROUNDING_TEXT)
+    repairs[:0] = [r for r in found if r not in repairs]
+
+
+def _has_keys(value: Any, expected_keys: Optional[Sequence[str]]) -> bool:
+    return isinstance(value, dict) and all(key in value for key in (expected_keys or ()))
+
+
+def repair_json(text: str, expected_keys: Optional[Sequence[str]] = None) -> RepairResult:
+    """
+    First JSON object in `text` containing `expected_keys`, repairing it if needed.
+
+    Valid JSON takes the stdlib fast path. Otherwise a single tolerant pass
+    reads from the first "{": markdown fences and prose around the object,
+    `//` and `/* */` comments, trailing or missing commas, single-quoted or
+    bare keys and strings, Python's True/False/None, raw control characters in
+    strings and unterminated strings/containers (truncated answers) are all
+    accepted, and each kind of fix is listed in `RepairResult.repairs`.
+    Comment markers inside strings (URLs, code) are left alone.
+
+    Raises ValueError when no usable object is found.
+    """
+    try:
+        value = json.loads(text)
+        if _has_keys(value, expected_keys):
+            return RepairResult(value, [], 0, len(text))
+    except ValueError:
+        pass
+
+    pos = 0
+    last_error = "nenhum objeto JSON encontrado"
+    for _ in range(MAX_ATTEMPTS):
+        start = text.find("{", pos)
+        if start < 0:
+            break
+        try:
+            value, end = _decoder.raw_decode(text, start)
+            repairs: List[str] = []
+        except ValueError:
+            parser = _Parser(text, start)
+            try:
+                value = parser.object()
+            except ValueError as exc:
+                last_error = str(exc)
+                pos = start + 1
+                continue
+            end, repairs = parser.pos, parser.repairs
+        if _has_keys(value, expected_keys):
+            _note_surroundings(text, start, end, repairs)
+            return RepairResult(value, repairs, start, end)
+        last_error = f"objeto sem as chaves esperadas {list(expected_keys or [])}"
+        pos = end
+    raise ValueError(f"JSON irrecuperável: {last_error}")
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Inside an object: a complete string literal (consumed in one C-level match,
+# however many braces or escapes it holds), a brace, or a lone quote opening a
+# string that continues in the next chunk.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}"]', re.S)
+# Rest of a string that began in an earlier chunk, up to its closing quote...
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# ...or as far as this chunk goes (a trailing lone backslash escapes the next chunk).
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+
+# `find_json_object` restarts after an opening brace that never closes (e.g. a
+# stray "{" in prose before the payload); this bounds how often.
+MAX_RESTARTS = 8
+
+
+class JSONObjectScanner:
+    """
+    Single-pass, string-aware scanner for the first top-level JSON object in text.
+
+    Text can be fed in arbitrary chunks (e.g. deltas from `chat_stream`); the
+    scanner tracks brace depth and string/escape state across chunks, keeps
+    only the text of the object currently being read, and calls `json.loads`
+    once per complete top-level candidate. Braces inside strings are ignored.
+    Scanning stops at the first object that parses and contains every key in
+    `expected_keys`; `feed` returns it (and keeps returning it) from then on.
+    Quotes outside objects are prose and are not tracked.
+    """
+
+    def __init__(self, expected_keys: Optional[Sequence[str]] = None):
+        self.expected_keys = list(expected_keys or [])
+        self.result: Optional[Dict[str, Any]] = None
+        self.candidates = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts: List[str] = []
+        self._consumed = 0
+        self._open_at: Optional[int] = None
+
+    @property
+    def open_at(self) -> Optional[int]:
+        """Offset of the opening brace of an object still being read, if any."""
+        return self._open_at if self._depth else None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        if self.result is not None or not chunk:
+            return self.result
+        offset = self._consumed
+        self._consumed += len(chunk)
+        pos = 0
+        start = 0 if self._depth else None
+        end = len(chunk)
+
+        while pos < end:
+            if not self._depth:
+                pos = chunk.find("{", pos)
+                if pos < 0:
+                    break
+                self._depth = 1
+                self._in_string = False
+                self._open_at = offset + pos
+                start = pos
+                pos += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    # The previous chunk ended on a backslash inside a string.
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_END.match(chunk, pos)
+                if match is None:
+                    pos = _STRING_BODY.match(chunk, pos).end()
+                    self._escape = pos < end  # only a lone trailing backslash is left
+                    pos = end
+                    break
+                self._in_string = False
+                pos = match.end()
+                continue
+            match = _TOKEN.search(chunk, pos)
+            if match is None:
+                break
+            pos = match.end()
+            token = match.group()
+            if token == '"':
+                self._in_string = True
+            elif token == "{":
+                self._depth += 1
+            elif token == "}":
+                self._depth -= 1
+                if not self._depth:
+                    self._parts.append(chunk[start:pos])
+                    candidate = "".join(self._parts)
+                    self._parts = []
+                    start = None
+                    if self._accept(candidate):
+                        return self.result
+
+        if self._depth and start is not None:
+            self._parts.append(chunk[start:])
+        return None
+
+    def _accept(self, candidate: str) -> bool:
+        self.candidates += 1
+        try:
+            obj = json.loads(candidate)
+        except ValueError:
+            return False
+        if not isinstance(obj, dict) or any(key not in obj for key in self.expected_keys):
+            return False
+        self.result = obj
+        return True
+
+
+def find_json_object(text: str, expected_keys: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """First top-level JSON object in `text` with `expected_keys`, or None."""
+    offset = 0
+    for _ in range(MAX_RESTARTS + 1):
+        scanner = JSONObjectScanner(expected_keys)
+        found = scanner.feed(text[offset:] if offset else text)
+        if found is not None:
+            return found
+        if scanner.open_at is None:
+            return None
+        offset += scanner.open_at + 1
+    return None
+
+
+def scan_stream(
+    chunks: Iterable[str], expected_keys: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Feed `chunks` (e.g. `Router.stream(...)`) until the first matching object.
+
+    The iterator is closed as soon as the object is complete, so a streaming
+    call stops generating (and billing) the rest of the answer.
+    """
+    scanner = JSONObjectScanner(expected_keys)
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            if scanner.feed(chunk) is not None:
+                return scanner.result
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+    return None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Floor for the probability of a valid answer, so a model that failed a few
+# times gets ranked last instead of dividing by zero.
+MIN_VALID_PROBABILITY = 0.05
+
+# Minimum seconds between two writes of the stats file; records in between only
+# mark the data dirty and are flushed by the next write, `flush()` or exit.
+SAVE_INTERVAL = float(os.getenv("ROUTER_STATS_SAVE_INTERVAL", "5"))
+
+_instances: "weakref.WeakSet[ModelStats]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for stats in list(_instances):
+        stats.flush()
+
+
+class ModelStats:
+    """
+    Per-role, per-model EWMA statistics used to rank committee members.
+
+    For each (role, model) we keep an exponentially weighted latency, success
+    rate and JSON-validity rate. `expected_cost` combines them into the expected
+    seconds to a valid answer (`latency / P(valid)`), and `rank` orders a
+    committee by that cost. Statistics are persisted as JSON at `path` (atomic
+    replace) so the ranking carries over between runs. Writes are debounced to
+    one per `save_interval` seconds; `flush()` (also run at exit) writes any
+    pending records.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        alpha: float = 0.3,
+        save_interval: float = SAVE_INTERVAL,
+    ):
+        self.path = Path(path) if path else None
+        self.alpha = alpha
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.data: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._load()
+        if self.path:
+            _instances.add(self)
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            loaded = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(loaded, dict):
+            self.data = loaded
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def flush(self) -> None:
+        """Write pending records now, if any."""
+        if self._dirty:
+            self.save()
+
+    def _touch(self) -> None:
+        """Mark the data dirty and save if the last write is old enough."""
+        with self._lock:
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    def _update(self, entry: Dict[str, float], field: str, value: float) -> None:
+        previous = entry.get(field)
+        entry[field] = value if previous is None else (1 - self.alpha) * previous + self.alpha * value
+
+    def record(
+        self,
+        role: str,
+        model: str,
+        success: Optional[bool],
+        latency: Optional[float] = None,
+        json_valid: Optional[bool] = None,
+    ) -> None:
+        """Record one attempt. `success=None` records only latency."""
+        with self._lock:
+            entry = self.data.setdefault(role, {}).setdefault(model, {"samples": 0})
+            entry["samples"] += 1
+            if success is not None:
+                self._update(entry, "success_rate", 1.0 if success else 0.0)
+            if latency is not None:
+                self._update(entry, "latency_s", latency)
+            if json_valid is not None:
+                self._update(entry, "json_valid_rate", 1.0 if json_valid else 0.0)
+        self._touch()
+
+    def record_censored(self, role: str, model: str, elapsed: float) -> None:
+        """
+        Record a cancelled attempt that ran for `elapsed` seconds without
+        answering. That is only a lower bound on its latency, so it can raise
+        the latency EWMA but never lower it.
+        """
+        with self._lock:
+            entry = self.data.setdefault(role, {}).setdefault(model, {"samples": 0})
+            previous = entry.get("latency_s")
+            if previous is not None and elapsed <= previous:
+                return
+            entry["samples"] += 1
+            self._update(entry, "latency_s", elapsed)
+        self._touch()
+
+    def record_json_validity(self, role: str, model: str, valid: bool) -> None:
+        with self._lock:
+            entry = self.data.setdefault(role, {}).setdefault(model, {"samples": 0})
+            self._update(entry, "json_valid_rate", 1.0 if valid else 0.0)
+        self._touch()
+
+    def expected_cost(self, role: str, model: str) -> Optional[float]:
+        """Expected seconds to a valid answer, or None if the model has no history."""
+        with self._lock:
+            entry = self.data.get(role, {}).get(model)
+            if not entry or entry.get("latency_s") is None:
+                return None
+            p_valid = entry.get("success_rate", 1.0) * entry.get("json_valid_rate", 1.0)
+            return entry["latency_s"] / max(p_valid, MIN_VALID_PROBABILITY)
+
+    def rank(self, role: str, models: List[str]) -> List[str]:
+        """
+        Order `models` by expected cost. Models without history are treated as
+        tied with the current best, so they keep their configured position and
+        still get explored.
+        """
+        costs = {model: self.expected_cost(role, model) for model in models}
+        known = [cost for cost in costs.values() if cost is not None]
+        default = min(known) if known else 0.0
+        return sorted(models, key=lambda m: costs[m] if costs[m] is not None else default)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            return copy.deepcopy(self.data)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.file_lock import lock_file, unlock_file
+
+# OpenRouter's free tier allows ~20 requests/min per `:free` model.
+FREE_TIER_RPM = float(os.getenv("LLM_FREE_RPM", "20"))
+# Back-off when a 429 arrives without `Retry-After`.
+DEFAULT_RETRY_AFTER = float(os.getenv("LLM_DEFAULT_RETRY_AFTER", "5"))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Requests and tokens per minute for one scope (0 = unlimited)."""
+
+    rpm: float = 0.0
+    tpm: float = 0.0
+
+
+def parse_limits(spec: str) -> Dict[str, RateLimit]:
+    """
+    Parse `LLM_RATE_LIMITS`, e.g. `*=120,deepseek=20/40000,google/gemma-2-9b-it:free=10`.
+
+    Each entry is `scope=RPM[/TPM]`. A scope is `*` (every call), a provider
+    (the model prefix before `/`) or a full model id.
+    """
+    limits: Dict[str, RateLimit] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        scope, _, values = entry.rpartition("=")
+        if not scope:
+            raise ValueError(f"LLM_RATE_LIMITS inválido: {entry!r} (use escopo=RPM[/TPM])")
+        rpm, _, tpm = values.partition("/")
+        limits[scope.strip()] = RateLimit(float(rpm or 0), float(tpm or 0))
+    return limits
+
+
+def provider_of(model: str) -> str:
+    return model.split("/", 1)[0] if "/" in model else model
+
+
+@dataclass
+class Ticket:
+    """What a call reserved, so the token part can be settled with real usage."""
+
+    token_buckets: List[str]
+    tokens: int
+    wait: float
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter keyed by provider and model, shared across processes.
+
+    Each scope has a requests bucket and a tokens bucket that refill linearly
+    up to one minute's allowance. A call reserves one request and its projected
+    tokens from every matching scope (`*`, provider, model) and gets back how
+    long to wait; balances may go negative, so waiting callers queue in order
+    instead of all retrying at once. Bucket state lives in small JSON files
+    under `state_dir`, guarded by an OS file lock, so threads and processes on
+    the same host see one budget. A 429 pauses the scope until `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, RateLimit],
+        state_dir: Optional[str | Path] = None,
+        free_rpm: float = FREE_TIER_RPM,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.limits = limits
+        self.free_rpm = free_rpm
+        # Wall clock (not monotonic): bucket timestamps are shared between processes.
+        self.clock = clock
+        self.state_dir = Path(state_dir or Path(tempfile.gettempdir()) / "flashsoft-ratelimit")
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "wait_s": 0.0, "rate_limited": 0}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(parse_limits(os.getenv("LLM_RATE_LIMITS", "")), os.getenv("LLM_RATE_LIMIT_DIR"))
+
+    def scopes(self, model: str) -> List[Tuple[str, RateLimit]]:
+        found = []
+        for scope in ("*", provider_of(model), model):
+            limit = self.limits.get(scope)
+            if limit is None and scope == model and model.endswith(":free") and self.free_rpm:
+                limit = RateLimit(rpm=self.free_rpm)
+            if limit is not None and (scope, limit) not in found:
+                found.append((scope, limit))
+        return found
+
+    def reserve(self, model: str, tokens: int = 0) -> Ticket:
+        """Reserve one request and `tokens` for `model`; returns the wait before sending."""
+        wait = 0.0
+        token_buckets = []
+        scopes = self.scopes(model)
+        if all(scope != model for scope, _ in scopes):
+            # An unlimited model can still be paused by a 429 (see `penalize`).
+            wait = self._blocked_for(f"{model}|rpm")
+        for scope, limit in scopes:
+            if limit.rpm:
+                wait = max(wait, self._take(f"{scope}|rpm", limit.rpm, 1))
+            else:
+                wait = max(wait, self._blocked_for(f"{scope}|rpm"))
+            if limit.tpm and tokens:
+                # A call bigger than the whole allowance still has to go through.
+                wait = max(wait, self._take(f"{scope}|tpm", limit.tpm, min(tokens, limit.tpm)))
+                token_buckets.append(f"{scope}|tpm")
+        with self._lock:
+            self.stats["requests"] += 1
+            if wait > 0:
+                self.stats["throttled"] += 1
+                self.stats["wait_s"] += wait
+        return Ticket(token_buckets, tokens, wait)
+
+    def settle(self, ticket: Ticket, used_tokens: Optional[int]) -> None:
+        """Return the unused part of a token reservation (all of it if nothing was used)."""
+        refund = ticket.tokens - (used_tokens or 0)
+        if refund <= 0:
+            return
+        for bucket in ticket.token_buckets:
+            scope = bucket.rsplit("|", 1)[0]
+            limit = self._limit(scope)
+            if limit is not None and limit.tpm:
+                self._take(bucket, limit.tpm, -min(refund, limit.tpm))
+
+    def penalize(self, model: str, retry_after: Optional[float] = None) -> None:
+        """A 429 came back: pause every matching scope until `Retry-After`."""
+        delay = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+        until = self.clock() + delay
+        scopes = {scope for scope, _ in self.scopes(model)} | {model}
+        for scope in scopes:
+            with self._state(f"{scope}|rpm") as state:
+                state["blocked_until"] = max(state.get("blocked_until", 0.0), until)
+                state["level"] = min(state.get("level", 0.0), 0.0)
+        with self._lock:
+            self.stats["rate_limited"] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _limit(self, scope: str) -> Optional[RateLimit]:
+        if scope in self.limits:
+            return self.limits[scope]
+        if scope.endswith(":free") and self.free_rpm:
+            return RateLimit(rpm=self.free_rpm)
+        return None
+
+    def _take(self, bucket: str, per_minute: float, amount: float) -> float:
+        rate = per_minute / 60.0
+        with self._state(bucket) as state:
+            now = self.clock()
+            level = state.get("level", per_minute)
+            level = min(per_minute, level + (now - state.get("ts", now)) * rate)
+            level -= amount
+            state["level"] = level
+            state["ts"] = now
+            wait = max(0.0, -level / rate, state.get("blocked_until", 0.0) - now)
+        return wait
+
+    def _blocked_for(self, bucket: str) -> float:
+        path = self._path(bucket)
+        if not path.exists():
+            return 0.0
+        with self._state(bucket) as state:
+            return max(0.0, state.get("blocked_until", 0.0) - self.clock())
+
+    def _path(self, bucket: str) -> Path:
+        return self.state_dir / (hashlib.sha1(bucket.encode("utf-8")).hexdigest()[:20] + ".json")
+
+    @contextmanager
+    def _state(self, bucket: str) -> Iterator[dict]:
+        path = self._path(bucket)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(path, "a+", encoding="utf-8") as f:
+            lock_file(f)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                unlock_file(f)
+
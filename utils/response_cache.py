@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def cache_key(**parts: Any) -> str:
+    """Content-addressed key: SHA-256 of the canonical JSON of `parts`."""
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk store of LLM responses, one JSON file per key under `root/<key[:2]>/`.
+
+    Recency is tracked through file mtimes (touched on every hit), so eviction
+    removes the least recently used entries once the store exceeds `max_bytes`.
+    Writes go to a temp file first and are renamed into place, so concurrent
+    readers never see a partial entry.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for path in self.root.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            yield path, stat
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the cap so we don't rescan on every put.
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, stat in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+                size -= stat.st_size
+            except OSError:
+                continue
+        self._size = size
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from typing import List
+
+# Words and individual punctuation marks; code and JSON are punctuation-heavy,
+# and most BPE vocabularies spend roughly one token on each symbol.
+_PIECES = re.compile(r"\w+|[^\w\s]")
+TOKENIZER = os.getenv("TOKEN_ESTIMATOR", "auto").strip().lower()
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    if TOKENIZER == "heuristic":
+        return None
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken is optional and downloads its vocabulary on first use.
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Fast local estimate of the token count of `text`.
+
+    Uses tiktoken's cl100k_base when it is installed. Otherwise it falls back to
+    a heuristic: about 1.3 tokens per word plus one per punctuation mark, and
+    never less than len/4. Provider-reported usage should be preferred when it
+    is available; this is for pre-flight budgeting and responses without usage.
+    """
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    words, symbols = _heuristic_counts(text)
+    return max(int(words * 1.3) + symbols, len(text) // 4)
+
+
+def _heuristic_counts(text: str):
+    words = 0
+    symbols = 0
+    for piece in _PIECES.findall(text):
+        if piece[0].isalnum() or piece[0] == "_":
+            words += 1
+        else:
+            symbols += 1
+    return words, symbols
+
+
+def split_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    Split `text` into consecutive pieces of at most `max_tokens` tokens.
+
+    With tiktoken the cut falls on token boundaries; with the heuristic it falls
+    on whitespace, and a single run longer than the budget is cut by characters.
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens deve ser positivo")
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        ids = encoding.encode(text, disallowed_special=())
+        return [encoding.decode(ids[i : i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+    pieces: List[str] = []
+    start = 0
+    words = symbols = 0
+    for match in re.finditer(r"\S+\s*|\s+", text):
+        word = match.group()
+        w, sym = _heuristic_counts(word)
+        # The heuristic is additive over whitespace-separated runs, so the
+        # piece's count can be kept incrementally.
+        if max(int((words + w) * 1.3) + symbols + sym, (match.end() - start) // 4) <= max_tokens:
+            words += w
+            symbols += sym
+            continue
+        if match.start() > start:
+            pieces.append(text[start : match.start()])
+        start, words, symbols = match.start(), w, sym
+        if count_tokens(word) > max_tokens:
+            step = max_tokens * 4  # count_tokens never reports less than len/4
+            while count_tokens(word) > max_tokens:
+                while step > 1 and count_tokens(word[:step]) > max_tokens:
+                    step //= 2
+                pieces.append(word[:step])
+                word = word[step:]
+            start = match.end() - len(word)
+            words, symbols = _heuristic_counts(word)
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces